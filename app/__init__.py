@@ -77,8 +77,15 @@ def create_app():
     
     app.logger.info("Flask configuration loaded successfully")
     
+    from .models.base import engine_options
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(app.config))
     db.init_app(app)
     
+    from .models.routing import init_replicas
+    init_replicas(app)
+    from .services.response_cache import init_response_cache
+    init_response_cache(app)
+    
     with app.app_context():
         try:
             app.logger.info("Initializing database connection...")
@@ -86,6 +93,10 @@ def create_app():
             
             app.logger.info("Checking database tables...")
             from .models.family import Samaj, Member
+            # Imported so create_all() and the member write events see them
+            from .models import stats, tags, broadcast, greeting
+            from .services import member_stats, member_tags
+            from .migrations import migrate, pending, stamp
             
             inspector = inspect(db.engine)
             existing_tables = inspector.get_table_names()
@@ -94,6 +105,7 @@ def create_app():
             if not existing_tables:
                 app.logger.info("Creating database tables...")
                 db.create_all()
+                stamp(db.engine)
                 app.logger.info("Database tables created successfully")
                 
                 # Check if there's any data
@@ -155,6 +167,10 @@ def create_app():
                     app.logger.info(f"Using existing data: {samaj_count} samaj records found")
             else:
                 app.logger.info(f"Using existing tables: {existing_tables}")
+                if app.config.get("MIGRATE_ON_STARTUP", True):
+                    migrate(db.engine, log=app.logger.info, batch_size=app.config.get("MIGRATION_BATCH_SIZE", 1000))
+                elif pending(db.engine):
+                    app.logger.warning("Database schema is out of date; run 'flask migrate'")
             
             if db.session.query(Samaj).first() is None:
                 app.logger.info("Generating sample data...")
@@ -209,6 +225,9 @@ def create_app():
                         db.session.rollback()
                         continue
                 app.logger.info("Sample data generation completed")
+            
+            from .services.samaj_cache import samaj_cache
+            app.logger.info(f"Cached {samaj_cache.warm(db.session)} samaj ids")
         except Exception as e:
             app.logger.error(f"Error during database initialization: {str(e)}")
             raise
@@ -228,8 +247,18 @@ def create_app():
     app.register_blueprint(admin_bp, url_prefix="/api/v1/admin")
     app.register_blueprint(auth_bp, url_prefix="/api/v1/auth")
     
+    from .services.write_behind import init_registration_writer
+    init_registration_writer(app)
+    
+    from .services.broadcast import init_broadcasts, resume_when_serving
+    resume_when_serving(app, init_broadcasts(app))
+    
     # Register CLI commands
-    from .cli import check_db
+    from .cli import check_db, rebuild_stats_command, backfill_tags_command, migrate_command, send_greetings_command
     app.cli.add_command(check_db)
+    app.cli.add_command(migrate_command)
+    app.cli.add_command(rebuild_stats_command)
+    app.cli.add_command(backfill_tags_command)
+    app.cli.add_command(send_greetings_command)
     
     return app
@@ -1,8 +1,13 @@
 # Author: SANJAY KR
 import click
+from flask import current_app
 from flask.cli import with_appcontext
 from . import db
 from .models.family import Samaj, Member
+from .services.member_stats import rebuild_stats
+from .services.member_tags import backfill_tags
+from .services.greetings import send_greetings
+from .migrations import MIGRATIONS, applied_versions, migrate
 
 @click.command('check-db')
 @with_appcontext
@@ -16,5 +21,62 @@ def check_db():
     except Exception as e:
         click.echo(f'Error checking database: {str(e)}')
 
+@click.command('rebuild-stats')
+@with_appcontext
+def rebuild_stats_command():
+    """Recompute the per-samaj statistics from the member table."""
+    try:
+        with db.engine.begin() as connection:
+            members = rebuild_stats(connection)
+        click.echo(f'Rebuilt statistics for {members} members')
+    except Exception as e:
+        click.echo(f'Error rebuilding statistics: {str(e)}')
+
+@click.command('backfill-tags')
+@with_appcontext
+def backfill_tags_command():
+    """Rebuild the tag index from the members' comma-separated fields."""
+    try:
+        with db.engine.begin() as connection:
+            links = backfill_tags(connection)
+        click.echo(f'Indexed {links} member tags')
+    except Exception as e:
+        click.echo(f'Error backfilling tags: {str(e)}')
+
+@click.command('migrate')
+@click.option('--status', is_flag=True, help='List migrations without applying them.')
+@click.option('--batch-size', default=1000, show_default=True, help='Rows per backfill transaction.')
+@with_appcontext
+def migrate_command(status, batch_size):
+    """Apply pending schema migrations."""
+    try:
+        if status:
+            applied = applied_versions(db.engine)
+            for migration in MIGRATIONS:
+                state = 'applied' if migration.version in applied else 'pending'
+                click.echo(f'{migration.version:04d} {migration.name}: {state}')
+            return
+        done = migrate(db.engine, log=click.echo, batch_size=batch_size)
+        click.echo(f'Applied {len(done)} migrations')
+    except Exception as e:
+        click.echo(f'Error applying migrations: {str(e)}')
+
+@click.command('send-greetings')
+@click.option('--date', 'day', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Day to send greetings for (default today).')
+@with_appcontext
+def send_greetings_command(day):
+    """Send today's birthday and anniversary greetings; safe to rerun."""
+    try:
+        results = send_greetings(day.date() if day else None, batch_size=current_app.config['GREETING_BATCH_SIZE'])
+        for kind, counts in results.items():
+            click.echo(f"{kind}: {counts['sent']} sent, {counts['failed']} failed, {counts['skipped']} skipped")
+    except Exception as e:
+        click.echo(f'Error sending greetings: {str(e)}')
+
 def init_app(app):
     app.cli.add_command(check_db)
+    app.cli.add_command(migrate_command)
+    app.cli.add_command(rebuild_stats_command)
+    app.cli.add_command(backfill_tags_command)
+    app.cli.add_command(send_greetings_command)
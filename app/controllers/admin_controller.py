@@ -1,50 +1,154 @@
 # Author: SANJAY KR
 from sqlalchemy.orm import Session
 from ..models.family import Samaj, Member
+from ..services.whatsapp_service import get_whatsapp_service
 import csv
+from datetime import date
+from functools import lru_cache
 from io import StringIO
-from typing import List, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from sqlalchemy import Select, case, func, select
 
-def get_members(db: Session, samaj_name: Optional[str] = None) -> List[Member]:
-    query = db.query(Member)
+# *_mmdd are lookup keys derived from the dates, not member data
+MEMBER_FIELDS = tuple(column.name for column in Member.__table__.columns if not column.name.endswith("_mmdd"))
+
+def members_query(samaj_name: Optional[str] = None, *columns) -> Select:
+    """SELECT of members (or just columns) with the admin filters applied."""
+    query = select(*columns) if columns else select(Member)
     if samaj_name:
-        query = query.join(Samaj).filter(Samaj.name == samaj_name)
-    return query.all()
+        query = query.join(Samaj, Samaj.id == Member.samaj_id).where(Samaj.name == samaj_name)
+    return query
+
+def get_members(db: Session, samaj_name: Optional[str] = None) -> List[Member]:
+    return db.execute(members_query(samaj_name)).scalars().all()
 
 def get_samaj_list(db: Session) -> List[Samaj]:
     return db.query(Samaj).all()
 
+def get_samaj_summary(db: Session) -> List[Dict[str, Any]]:
+    """Member count, gender split and age range for every samaj, in one grouped query."""
+    # Registrations store the words, imported sample data the letters
+    gender = func.lower(func.trim(Member.gender))
+    query = (
+        select(
+            Samaj.id,
+            Samaj.name,
+            func.count(Member.id).label("members"),
+            func.count(case((gender.in_(("m", "male")), 1))).label("male"),
+            func.count(case((gender.in_(("f", "female")), 1))).label("female"),
+            func.min(Member.current_age).label("min_age"),
+            func.max(Member.current_age).label("max_age")
+        )
+        .outerjoin(Member, Member.samaj_id == Samaj.id)
+        .group_by(Samaj.id, Samaj.name)
+        .order_by(Samaj.name)
+    )
+    return [
+        {
+            "id": row.id,
+            "name": row.name,
+            "members": row.members,
+            "gender": {"male": row.male, "female": row.female, "other": row.members - row.male - row.female},
+            "age_range": {"min": row.min_age, "max": row.max_age}
+        }
+        for row in db.execute(query)
+    ]
+
 def get_member(db: Session, member_id: int) -> Optional[Member]:
     return db.query(Member).filter(Member.id == member_id).first()
 
-def export_members_csv(db: Session, samaj_name: Optional[str] = None) -> tuple[str, str]:
-    members = get_members(db, samaj_name)
-    
-    output = StringIO()
-    writer = csv.writer(output)
-    
-    headers = ["Name", "Gender", "Age", "Blood Group", "Mobile 1", "Mobile 2",
-               "Education", "Occupation", "Marital Status", "Address", "Email",
-               "Birth Date", "Anniversary Date", "Native Place", "Current City",
-               "Languages Known", "Skills", "Hobbies", "Emergency Contact",
-               "Relationship Status", "Family Role", "Medical Conditions",
-               "Dietary Preferences", "Social Media Handles", "Profession Category",
-               "Volunteer Interests"]
-    writer.writerow(headers)
-    
-    for member in members:
-        writer.writerow([
-            member.name, member.gender, member.age, member.blood_group,
-            member.mobile_1, member.mobile_2, member.education,
-            member.occupation, member.marital_status, member.address,
-            member.email, member.birth_date, member.anniversary_date,
-            member.native_place, member.current_city, member.languages_known,
-            member.skills, member.hobbies, member.emergency_contact,
-            member.relationship_status, member.family_role, member.medical_conditions,
-            member.dietary_preferences, member.social_media_handles,
-            member.profession_category, member.volunteer_interests
-        ])
+def parse_member_fields(raw: Optional[str]) -> Tuple[str, ...]:
+    """Turn a fields= query value into a column tuple; id is always included."""
+    if not raw:
+        return MEMBER_FIELDS
+    requested = [field.strip() for field in raw.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in MEMBER_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return tuple(["id"] + [field for field in dict.fromkeys(requested) if field != "id"])
+
+def _member_column(field: str):
+    # Age is served as of today, from birth_date where one is known
+    if field == "age":
+        return Member.current_age.label("age")
+    return Member.__table__.columns[field]
+
+def _is_date_column(field: str) -> bool:
+    try:
+        return issubclass(Member.__table__.columns[field].type.python_type, date)
+    except NotImplementedError:
+        return False
+
+@lru_cache(maxsize=128)
+def member_serializer(fields: Tuple[str, ...]) -> Callable[[Sequence[Any]], Dict[str, Any]]:
+    """Build (once per field tuple) a function turning a row tuple into a JSON-ready dict."""
+    dated = [index for index, field in enumerate(fields) if _is_date_column(field)]
+    if not dated:
+        return lambda row: dict(zip(fields, row))
+
+    def serialize(row: Sequence[Any]) -> Dict[str, Any]:
+        values = list(row)
+        for index in dated:
+            if values[index] is not None:
+                values[index] = values[index].isoformat()
+        return dict(zip(fields, values))
+    return serialize
+
+def list_member_rows(db: Session, samaj_name: Optional[str] = None, fields: Tuple[str, ...] = MEMBER_FIELDS,
+                     after: Optional[int] = None, limit: int = 100) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """One keyset page of members ordered by id, with only the requested columns.
+
+    Returns the rows and the cursor for the next page (None on the last page).
+    """
+    query = select(*[_member_column(field) for field in fields]).order_by(Member.id)
+    if samaj_name:
+        query = query.join(Samaj).where(Samaj.name == samaj_name)
+    if after is not None:
+        query = query.where(Member.id > after)
+    rows = db.execute(query.limit(limit + 1)).all()
+    serialize = member_serializer(fields)
+    page = [serialize(row) for row in rows[:limit]]
+    next_cursor = page[-1]["id"] if len(rows) > limit else None
+    return page, next_cursor
+
+def get_member_row(db: Session, member_id: int) -> Optional[Dict[str, Any]]:
+    row = db.execute(select(*[_member_column(field) for field in MEMBER_FIELDS]).where(Member.id == member_id)).first()
+    return member_serializer(MEMBER_FIELDS)(row) if row is not None else None
+
+def get_session_stats() -> Dict[str, int]:
+    return get_whatsapp_service().sessions.stats()
+
+EXPORT_COLUMNS = (
+    ("Name", Member.name), ("Gender", Member.gender), ("Age", Member.current_age),
+    ("Blood Group", Member.blood_group), ("Mobile 1", Member.mobile_1), ("Mobile 2", Member.mobile_2),
+    ("Education", Member.education), ("Occupation", Member.occupation),
+    ("Marital Status", Member.marital_status), ("Address", Member.address), ("Email", Member.email),
+    ("Birth Date", Member.birth_date), ("Anniversary Date", Member.anniversary_date),
+    ("Native Place", Member.native_place), ("Current City", Member.current_city),
+    ("Languages Known", Member.languages_known), ("Skills", Member.skills), ("Hobbies", Member.hobbies),
+    ("Emergency Contact", Member.emergency_contact), ("Relationship Status", Member.relationship_status),
+    ("Family Role", Member.family_role), ("Medical Conditions", Member.medical_conditions),
+    ("Dietary Preferences", Member.dietary_preferences), ("Social Media Handles", Member.social_media_handles),
+    ("Profession Category", Member.profession_category), ("Volunteer Interests", Member.volunteer_interests)
+)
+
+def _csv_chunks(db: Session, samaj_name: Optional[str], chunk_size: int) -> Iterator[bytes]:
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([header for header, _ in EXPORT_COLUMNS])
+    yield buffer.getvalue().encode("utf-8")
     
-    output.seek(0)
+    query = select(*[column for _, column in EXPORT_COLUMNS]).order_by(Member.id)
+    if samaj_name:
+        query = query.join(Samaj).where(Samaj.name == samaj_name)
+    # Plain column tuples read through a server-side cursor, chunk_size rows at a time
+    result = db.execute(query.execution_options(yield_per=chunk_size))
+    for rows in result.partitions():
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+
+def export_members_csv(db: Session, samaj_name: Optional[str] = None, chunk_size: int = 1000) -> tuple[Iterator[bytes], str]:
     filename = f"members_{samaj_name or 'all'}.csv"
-    return output.getvalue(), filename
+    return _csv_chunks(db, samaj_name, chunk_size), filename
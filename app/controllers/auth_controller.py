@@ -3,8 +3,13 @@ from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from flask import current_app
 from passlib.context import CryptContext
+import hashlib
 import os
-from typing import Optional, Dict
+import time
+import uuid
+from typing import Optional, Dict, Tuple
+from ..services.revocation import RevocationList, create_revocation_list
+from ..utils.ttl_cache import TTLCache
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -12,13 +17,12 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     try:
         to_encode = data.copy()
         expire = datetime.utcnow() + (expires_delta or timedelta(minutes=15))
-        to_encode.update({"exp": expire})
+        # jti identifies the token on the revocation list after logout
+        to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
         
-        secret_key = os.environ.get("JWT_SECRET_KEY", current_app.config.get("JWT_SECRET_KEY"))
-        algorithm = os.environ.get("JWT_ALGORITHM", current_app.config.get("JWT_ALGORITHM", "HS256"))
-        
-        current_app.logger.info(f"Using algorithm: {algorithm}")
-        current_app.logger.info(f"Secret key is set: {bool(secret_key)}")
+        # Both were read from the environment into the config at startup
+        secret_key = current_app.config.get("JWT_SECRET_KEY")
+        algorithm = current_app.config.get("JWT_ALGORITHM", "HS256")
         
         if not secret_key:
             raise ValueError("JWT_SECRET_KEY must be set")
@@ -33,19 +37,61 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         current_app.logger.error(f"Token creation error: {str(e)}")
         raise
 
-def verify_token(token: str) -> Optional[str]:
+def get_token_cache() -> TTLCache:
+    """Tokens whose signature was already checked: token -> (username, token id, exp)."""
+    cache = current_app.extensions.get("token_cache")
+    if cache is None:
+        cache = current_app.extensions["token_cache"] = TTLCache(
+            max_entries=int(current_app.config.get("TOKEN_CACHE_MAX_ENTRIES", 1024)),
+            clock=time.time
+        )
+    return cache
+
+def get_revocation_list() -> RevocationList:
+    revoked = current_app.extensions.get("revoked_tokens")
+    if revoked is None:
+        revoked = current_app.extensions["revoked_tokens"] = create_revocation_list(current_app.config)
+    return revoked
+
+def _decode_token(token: str) -> Optional[Tuple[str, str, float]]:
+    """Verify token and return (username, token id, exp), or None."""
+    cache = get_token_cache()
+    verified = cache.get(token)
+    if verified is not None:
+        return verified
     try:
         payload = jwt.decode(
             token,
             current_app.config["JWT_SECRET_KEY"],
             algorithms=[current_app.config["JWT_ALGORITHM"]]
         )
-        username = payload.get("sub")
-        if not isinstance(username, str) or username is None:
-            return None
-        return username
     except JWTError:
         return None
+    username = payload.get("sub")
+    if not isinstance(username, str) or username is None:
+        return None
+    # Tokens issued before jti was added are revoked by their hash
+    token_id = payload.get("jti") or hashlib.sha256(token.encode()).hexdigest()
+    expires_at = float(payload["exp"]) if "exp" in payload else time.time() + 3600
+    verified = (username, token_id, expires_at)
+    # Cached until the second the token expires, never longer
+    cache.set(token, verified, expires_at=expires_at)
+    return verified
+
+def verify_token(token: str) -> Optional[str]:
+    verified = _decode_token(token)
+    if verified is None or get_revocation_list().is_revoked(verified[1]):
+        return None
+    return verified[0]
+
+def revoke_token(token: str) -> bool:
+    """Log a token out; returns False if it was not a valid token."""
+    verified = _decode_token(token)
+    if verified is None:
+        return False
+    get_revocation_list().revoke(verified[1], verified[2])
+    get_token_cache().pop(token)
+    return True
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -2,9 +2,12 @@
 import os
 from sqlalchemy.orm import Session
 from flask import current_app
-from ..models.family import Samaj, Member
+from ..models.family import Member
 from ..services.whatsapp_service import get_whatsapp_service
-from twilio.base.exceptions import TwilioRestException
+from ..services.flows import FLOWS
+from ..services.write_behind import get_registration_writer, member_errors, member_values
+from ..services.samaj_cache import samaj_cache
+from typing import Any, Callable, Dict
 
 def get_service():
     try:
@@ -13,7 +16,27 @@ def get_service():
         current_app.logger.error("WhatsApp service not initialized")
         return None
 
-def handle_webhook(phone_number: str, message: str, db: Session):
+def save_registration(db: Session, data: Dict[str, Any]) -> None:
+    errors = member_errors(data)
+    if errors:
+        # Rejected here rather than by the database, where it would fail a whole batch
+        raise ValueError(f"Registration cannot be saved: {errors}")
+    writer = get_registration_writer()
+    if writer is not None:
+        # Saved with the next group commit; durable once submit returns
+        writer.submit(data)
+        return
+        
+    member = Member(**member_values(data, samaj_cache.resolve(db, data["samaj"])))
+    db.add(member)
+    db.commit()
+
+# Completed flows are handed to the handler registered under their name
+COMPLETION_HANDLERS: Dict[str, Callable[[Session, Dict[str, Any]], None]] = {
+    "registration": save_registration
+}
+
+def handle_webhook(phone_number: str, message: str, db: Session, send_reply: bool = True):
     try:
         whatsapp_service = get_service()
         if whatsapp_service is None:
@@ -50,96 +73,33 @@ def handle_webhook(phone_number: str, message: str, db: Session):
             current_app.logger.error(f"Failed to process message from {phone_number}")
             return "Failed to process your message. Please try again later.", False
             
-        return response, True
-            
-        current_app.logger.info(f"Received webhook for {phone_number}: {message}")
-        phone_number = phone_number.replace("whatsapp:", "")
-        whatsapp_service = get_service()
-        response, success = whatsapp_service.handle_message(phone_number, message)
-        
-        if not success:
-            current_app.logger.error(f"Failed to process message for {phone_number}")
-            return response, False
-        
-        session = whatsapp_service.current_sessions.get(phone_number)
-        if not session:
+        session = whatsapp_service.sessions.get(phone_number)
+        flow = FLOWS.get(session.flow) if session is not None else None
+        if flow is not None and session.step >= len(flow.steps):
             try:
-                if not whatsapp_service.send_message(phone_number, response):
-                    current_app.logger.error(f"Failed to send WhatsApp message to {phone_number}")
-                    return "Failed to send response message", False
-                return response, True
-            except Exception as e:
-                current_app.logger.error(f"Error sending message to {phone_number}: {str(e)}")
-                return "Failed to send response message", False
-            
-        if session["step"] >= 26:
-            try:
-                data = session["data"]
-                samaj = db.query(Samaj).filter(Samaj.name == data["samaj"]).first()
-                if not samaj:
-                    samaj = Samaj(name=data["samaj"])
-                    db.add(samaj)
-                    db.flush()
-
-                member = Member(
-                    samaj_id=samaj.id,
-                    name=data["name"],
-                    gender=data["gender"],
-                    age=int(data["age"]),
-                    blood_group=data["blood_group"],
-                    mobile_1=data["mobile_1"],
-                    mobile_2=data["mobile_2"],
-                    education=data["education"],
-                    occupation=data["occupation"],
-                    marital_status=data["marital_status"],
-                    address=data["address"],
-                    email=data["email"],
-                    birth_date=data["birth_date"],
-                    anniversary_date=data.get("anniversary_date"),
-                    native_place=data["native_place"],
-                    current_city=data["current_city"],
-                    languages_known=data["languages_known"],
-                    skills=data["skills"],
-                    hobbies=data["hobbies"],
-                    emergency_contact=data["emergency_contact"],
-                    relationship_status=data["relationship_status"],
-                    family_role=data["family_role"],
-                    medical_conditions=data.get("medical_conditions"),
-                    dietary_preferences=data["dietary_preferences"],
-                    social_media_handles=data.get("social_media_handles"),
-                    profession_category=data["profession_category"],
-                    volunteer_interests=data.get("volunteer_interests")
-                )
-                db.add(member)
-                db.commit()
-                del whatsapp_service.current_sessions[phone_number]
+                data = session.as_dict(flow.fields)
+                handler = COMPLETION_HANDLERS.get(flow.name)
+                if handler is not None:
+                    handler(db, data)
+                else:
+                    current_app.logger.info(f"Completed {flow.name} for {phone_number}: {data}")
+                whatsapp_service.sessions.delete(phone_number)
                 current_app.logger.info(f"Successfully saved data for {phone_number}")
             except Exception as e:
                 current_app.logger.error(f"Database error for {phone_number}: {str(e)}")
                 db.rollback()
                 return "An error occurred while saving your information. Please try again.", False
         
-        try:
-            if not whatsapp_service.send_message(phone_number, response):
-                current_app.logger.error(f"Failed to send WhatsApp message to {phone_number}")
-                return "Failed to send response message", False
+        if not send_reply:
+            # Caller returns the reply inline (TwiML)
             return response, True
-        except Exception as e:
-            current_app.logger.error(f"Error sending message to {phone_number}: {str(e)}")
-            return "Failed to send response message", False
-    except Exception as e:
-        current_app.logger.error(f"Unexpected error processing webhook: {str(e)}")
-        return "An unexpected error occurred", False
-    
-    try:
-        if not whatsapp_service.send_message(phone_number, response):
+            
+        # Reply from the background sender so the webhook returns without
+        # waiting on the Twilio API
+        if not whatsapp_service.queue_message(phone_number, response):
             current_app.logger.error(f"Failed to send WhatsApp message to {phone_number}")
             return "Failed to send response message", False
-        current_app.logger.info(f"Successfully sent message to {phone_number}")
         return response, True
-    except TwilioRestException as e:
-        current_app.logger.error(f"Twilio error for {phone_number}: {str(e)}")
-        return "Failed to send response message", False
     except Exception as e:
-        current_app.logger.error(f"Unexpected error for {phone_number}: {str(e)}")
+        current_app.logger.error(f"Unexpected error processing webhook: {str(e)}")
         return "An unexpected error occurred", False
@@ -0,0 +1,77 @@
+# Author: SANJAY KR
+"""Versioned schema migrations.
+
+Each migration is a function upgrade(engine, log, batch_size) that brings
+an existing database forward one step and can be re-run safely if it was
+interrupted. Applied versions are recorded in schema_version; a database
+created from the current models with create_all() is stamped as up to date.
+"""
+from typing import Callable, List, NamedTuple, Optional, Set
+from sqlalchemy import insert, select
+from sqlalchemy.engine import Engine
+from ..models.schema_version import SchemaVersion
+from . import v0001_derived_tables, v0002_typed_dates, v0003_broadcasts, v0004_greetings, v0005_greeting_owner
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    upgrade: Callable[[Engine, Callable[[str], None], int], None]
+
+MIGRATIONS = (
+    Migration(1, "derived_tables", v0001_derived_tables.upgrade),
+    Migration(2, "typed_dates", v0002_typed_dates.upgrade),
+    Migration(3, "broadcasts", v0003_broadcasts.upgrade),
+    Migration(4, "greetings", v0004_greetings.upgrade),
+    Migration(5, "greeting_owner", v0005_greeting_owner.upgrade)
+)
+
+HEAD = MIGRATIONS[-1].version
+
+# Arbitrary key for the PostgreSQL advisory lock held while migrating
+_LOCK_KEY = 80217
+
+def applied_versions(engine: Engine) -> Set[int]:
+    SchemaVersion.__table__.create(engine, checkfirst=True)
+    with engine.connect() as connection:
+        return set(connection.execute(select(SchemaVersion.version)).scalars())
+
+def pending(engine: Engine) -> List[Migration]:
+    applied = applied_versions(engine)
+    return [migration for migration in MIGRATIONS if migration.version not in applied]
+
+def stamp(engine: Engine, version: int = HEAD) -> None:
+    """Record every migration up to version as applied without running it."""
+    applied = applied_versions(engine)
+    rows = [{"version": migration.version, "name": migration.name}
+            for migration in MIGRATIONS if migration.version <= version and migration.version not in applied]
+    if rows:
+        with engine.begin() as connection:
+            connection.execute(insert(SchemaVersion), rows)
+
+def migrate(engine: Engine, log: Callable[[str], None] = print, batch_size: int = 1000,
+            target: Optional[int] = None) -> List[Migration]:
+    """Apply pending migrations in order; returns the ones applied.
+
+    Concurrent callers (e.g. several workers starting at once) are
+    serialized on PostgreSQL with an advisory lock and skip what the first
+    one applied.
+    """
+    lock = None
+    if engine.dialect.name == "postgresql":
+        lock = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        lock.exec_driver_sql(f"SELECT pg_advisory_lock({_LOCK_KEY})")
+    try:
+        applied = []
+        for migration in pending(engine):
+            if target is not None and migration.version > target:
+                break
+            log(f"Applying migration {migration.version} {migration.name}")
+            migration.upgrade(engine, log, batch_size)
+            with engine.begin() as connection:
+                connection.execute(insert(SchemaVersion), {"version": migration.version, "name": migration.name})
+            applied.append(migration)
+        return applied
+    finally:
+        if lock is not None:
+            lock.exec_driver_sql(f"SELECT pg_advisory_unlock({_LOCK_KEY})")
+            lock.close()
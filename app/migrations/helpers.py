@@ -0,0 +1,27 @@
+# Author: SANJAY KR
+from sqlalchemy import Index, inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateIndex
+
+def column_names(engine: Engine, table: str):
+    return {column["name"] for column in inspect(engine).get_columns(table)}
+
+def create_index(engine: Engine, index: Index) -> None:
+    """Create index if it is missing without blocking writes.
+
+    PostgreSQL builds it CONCURRENTLY, which has to run outside a
+    transaction; other databases use a plain CREATE INDEX.
+    """
+    statement = str(CreateIndex(index).compile(dialect=engine.dialect))
+    if engine.dialect.name == "postgresql":
+        statement = statement.replace("CREATE INDEX", "CREATE INDEX CONCURRENTLY IF NOT EXISTS", 1)
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.exec_driver_sql(statement)
+    else:
+        statement = statement.replace("CREATE INDEX", "CREATE INDEX IF NOT EXISTS", 1)
+        with engine.begin() as connection:
+            connection.exec_driver_sql(statement)
+
+def member_index(name: str) -> Index:
+    from ..models.family import Member
+    return next(index for index in Member.__table__.indexes if index.name == name)
@@ -0,0 +1,25 @@
+# Author: SANJAY KR
+"""Summary tables built from member: samaj_stat, tag and member_tag, plus
+the blood donor lookup index."""
+from typing import Callable
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+from .helpers import create_index, member_index
+
+def upgrade(engine: Engine, log: Callable[[str], None], batch_size: int) -> None:
+    from ..models.stats import SamajStat
+    from ..models.tags import Tag, MemberTag
+    from ..services.member_stats import rebuild_stats
+    from ..services.member_tags import backfill_tags
+
+    tables = set(inspect(engine).get_table_names())
+    create_index(engine, member_index("ix_member_donor"))
+    if SamajStat.__tablename__ not in tables:
+        SamajStat.__table__.create(engine)
+        with engine.begin() as connection:
+            log(f"Counted {rebuild_stats(connection, batch_size)} members into samaj statistics")
+    if MemberTag.__tablename__ not in tables:
+        Tag.__table__.create(engine, checkfirst=True)
+        MemberTag.__table__.create(engine)
+        with engine.begin() as connection:
+            log(f"Indexed {backfill_tags(connection, batch_size)} member tags")
@@ -0,0 +1,106 @@
+# Author: SANJAY KR
+"""Convert member.birth_date and anniversary_date from text to DATE, add
+their MMDD lookup columns and the samaj_id, mobile_1 and email indexes.
+
+Expand, backfill, swap: the typed columns are added next to the text ones
+(a metadata-only change), filled in short batches by id so no transaction
+holds locks for long, and then swapped in with one brief transaction that
+also converts rows inserted during the backfill. Text values that cannot
+be parsed are kept in <column>_text for review; otherwise the text columns
+are dropped.
+"""
+from typing import Any, Callable, Dict, List, Sequence
+from sqlalchemy import Date, SmallInteger, bindparam, column, inspect, select, table, update
+from sqlalchemy.engine import Connection, Engine
+from .helpers import column_names, create_index, member_index
+from ..utils.dates import month_day, parse_date
+
+DATE_COLUMNS = ("birth_date", "anniversary_date")
+INDEXES = ("ix_member_samaj_id", "ix_member_mobile_1", "ix_member_email",
+           "ix_member_birth_mmdd", "ix_member_anniversary_mmdd")
+
+member = table(
+    "member",
+    column("id"),
+    column("birth_date"),
+    column("anniversary_date"),
+    column("birth_date_typed", Date),
+    column("anniversary_date_typed", Date),
+    column("birth_mmdd", SmallInteger),
+    column("anniversary_mmdd", SmallInteger)
+)
+
+_convert_statement = update(member).where(member.c.id == bindparam("member_id")).values(
+    birth_date_typed=bindparam("birth"),
+    anniversary_date_typed=bindparam("anniversary"),
+    birth_mmdd=bindparam("birth_md"),
+    anniversary_mmdd=bindparam("anniversary_md")
+)
+
+def _is_typed(engine: Engine) -> bool:
+    types = {info["name"]: info["type"] for info in inspect(engine).get_columns("member")}
+    return isinstance(types["birth_date"], Date)
+
+def _convert(connection: Connection, rows: Sequence[Any]) -> int:
+    """Write the typed values for rows of (id, birth_date, anniversary_date);
+    returns how many non-empty values could not be parsed."""
+    unparsed = 0
+    updates: List[Dict[str, Any]] = []
+    for member_id, birth_text, anniversary_text in rows:
+        birth, anniversary = parse_date(birth_text), parse_date(anniversary_text)
+        unparsed += sum(1 for text, value in ((birth_text, birth), (anniversary_text, anniversary))
+                        if text and text.strip() and value is None)
+        updates.append({
+            "member_id": member_id,
+            "birth": birth,
+            "anniversary": anniversary,
+            "birth_md": month_day(birth),
+            "anniversary_md": month_day(anniversary)
+        })
+    if updates:
+        connection.execute(_convert_statement, updates)
+    return unparsed
+
+def upgrade(engine: Engine, log: Callable[[str], None], batch_size: int) -> None:
+    if not _is_typed(engine):
+        existing = column_names(engine, "member")
+        with engine.begin() as connection:
+            for name, sql_type in (("birth_date_typed", "DATE"), ("anniversary_date_typed", "DATE"),
+                                   ("birth_mmdd", "SMALLINT"), ("anniversary_mmdd", "SMALLINT")):
+                if name not in existing:
+                    connection.exec_driver_sql(f"ALTER TABLE member ADD COLUMN {name} {sql_type}")
+
+        last_id, converted, unparsed = 0, 0, 0
+        while True:
+            with engine.begin() as connection:
+                rows = connection.execute(
+                    select(member.c.id, member.c.birth_date, member.c.anniversary_date)
+                    .where(member.c.id > last_id).order_by(member.c.id).limit(batch_size)
+                ).all()
+                unparsed += _convert(connection, rows)
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            converted += len(rows)
+            log(f"Converted dates for {converted} members")
+
+        with engine.begin() as connection:
+            if engine.dialect.name == "postgresql":
+                # Blocks writes for the catch-up; the renames below then take ACCESS
+                # EXCLUSIVE, which blocks reads too until this transaction commits
+                connection.exec_driver_sql("LOCK TABLE member IN SHARE ROW EXCLUSIVE MODE")
+            # Members registered while the batches ran
+            unparsed += _convert(connection, connection.execute(
+                select(member.c.id, member.c.birth_date, member.c.anniversary_date).where(member.c.id > last_id)
+            ).all())
+            for name in DATE_COLUMNS:
+                if unparsed:
+                    connection.exec_driver_sql(f"ALTER TABLE member RENAME COLUMN {name} TO {name}_text")
+                else:
+                    connection.exec_driver_sql(f"ALTER TABLE member DROP COLUMN {name}")
+                connection.exec_driver_sql(f"ALTER TABLE member RENAME COLUMN {name}_typed TO {name}")
+        if unparsed:
+            log(f"{unparsed} dates could not be parsed; the original text is kept in birth_date_text/anniversary_date_text")
+
+    for name in INDEXES:
+        create_index(engine, member_index(name))
@@ -0,0 +1,9 @@
+# Author: SANJAY KR
+"""Job and recipient tables for admin broadcasts."""
+from typing import Callable
+from sqlalchemy.engine import Engine
+
+def upgrade(engine: Engine, log: Callable[[str], None], batch_size: int) -> None:
+    from ..models.broadcast import Broadcast, BroadcastRecipient
+    Broadcast.__table__.create(engine, checkfirst=True)
+    BroadcastRecipient.__table__.create(engine, checkfirst=True)
@@ -0,0 +1,8 @@
+# Author: SANJAY KR
+"""Log of sent birthday and anniversary greetings."""
+from typing import Callable
+from sqlalchemy.engine import Engine
+
+def upgrade(engine: Engine, log: Callable[[str], None], batch_size: int) -> None:
+    from ..models.greeting import Greeting
+    Greeting.__table__.create(engine, checkfirst=True)
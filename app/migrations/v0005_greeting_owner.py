@@ -0,0 +1,11 @@
+# Author: SANJAY KR
+"""Owner column on greetings, so overlapping runs of the daily job claim each greeting once."""
+from typing import Callable
+from sqlalchemy.engine import Engine
+from .helpers import column_names
+
+def upgrade(engine: Engine, log: Callable[[str], None], batch_size: int) -> None:
+    # Databases that reached migration 4 with this model already have it
+    if "owner" not in column_names(engine, "greeting"):
+        with engine.begin() as connection:
+            connection.exec_driver_sql("ALTER TABLE greeting ADD COLUMN owner VARCHAR(32)")
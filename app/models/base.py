@@ -1,7 +1,11 @@
 # Author: SANJAY KR
-from flask import current_app
-from sqlalchemy import create_engine, inspect
-from sqlalchemy.orm import scoped_session, sessionmaker
+from functools import wraps
+from typing import Any, Callable, Dict, List, Mapping, Sequence, Union
+from flask import current_app, g, has_request_context
+from sqlalchemy import event, insert, inspect
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
 from .. import db
 
 def init_db():
@@ -15,7 +19,7 @@ def init_db():
             current_app.logger.info("Models imported")
             
             # Test database connection
-            engine = db.get_engine()
+            engine = db.engine
             current_app.logger.info("Testing database connection...")
             conn = engine.connect()
             conn.close()
@@ -41,13 +45,74 @@ def init_db():
         current_app.logger.error(f"Database initialization error: {str(e)}")
         raise
 
-def get_db():
-    try:
-        if not hasattr(db, 'session'):
-            engine = create_engine(current_app.config['SQLALCHEMY_DATABASE_URI'])
-            db.session = scoped_session(sessionmaker(bind=engine))
-            current_app.logger.info("Created new database session")
-        return db.session
-    except Exception as e:
-        current_app.logger.error(f"Database session error: {str(e)}")
-        raise
+def engine_options(config: Mapping[str, Any]) -> Dict[str, Any]:
+    """SQLALCHEMY_ENGINE_OPTIONS for the one Flask-SQLAlchemy engine per process."""
+    uri = config["SQLALCHEMY_DATABASE_URI"]
+    options: Dict[str, Any] = {"pool_pre_ping": config.get("DB_POOL_PRE_PING", True)}
+    if not uri.startswith("sqlite"):
+        options.update(
+            pool_size=config.get("DB_POOL_SIZE", 10),
+            max_overflow=config.get("DB_MAX_OVERFLOW", 5),
+            pool_timeout=config.get("DB_POOL_TIMEOUT", 10),
+            pool_recycle=config.get("DB_POOL_RECYCLE", 1800)
+        )
+    timeout = config.get("DB_STATEMENT_TIMEOUT_MS", 0)
+    if timeout and uri.startswith("postgresql"):
+        options["connect_args"] = {"options": f"-c statement_timeout={int(timeout)}"}
+    return options
+
+def get_db() -> Session:
+    """The request's session. Flask-SQLAlchemy scopes it to the app context
+    and closes it (returning its connection to the pool) on teardown."""
+    return db.session
+
+def dialect_insert(executor: Union[Session, Connection], model):
+    """INSERT for model supporting ON CONFLICT on PostgreSQL and SQLite, else None."""
+    dialect_name = (executor if isinstance(executor, Connection) else executor.get_bind()).dialect.name
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as on_conflict_insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as on_conflict_insert
+    else:
+        return None
+    return on_conflict_insert(model)
+
+def insert_ignoring_duplicates(executor: Union[Session, Connection], model, rows: List[Dict[str, Any]],
+                               index_elements: Sequence[str]) -> None:
+    """Insert rows, skipping those that collide on index_elements.
+
+    One ON CONFLICT DO NOTHING statement where supported; elsewhere each
+    row is inserted in its own savepoint. The caller commits.
+    """
+    if not rows:
+        return
+    statement = dialect_insert(executor, model)
+    if statement is not None:
+        executor.execute(statement.on_conflict_do_nothing(index_elements=list(index_elements)), rows)
+        return
+    for row in rows:
+        try:
+            with executor.begin_nested():
+                executor.execute(insert(model), row)
+        except IntegrityError:
+            pass
+
+def statement_timeout(milliseconds: Union[int, str]) -> Callable:
+    """Cap how long each query in a view may run; milliseconds is a number
+    or the name of a config key holding one. PostgreSQL only.
+    """
+    def decorator(view: Callable) -> Callable:
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            limit = current_app.config.get(milliseconds, 0) if isinstance(milliseconds, str) else milliseconds
+            g.statement_timeout = int(limit or 0)
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+@event.listens_for(Session, "after_begin")
+def _apply_statement_timeout(session, transaction, connection):
+    # Applied as each transaction starts, so views that never touch the
+    # database never check out a connection for it
+    if has_request_context() and g.get("statement_timeout") and connection.dialect.name == "postgresql":
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {g.statement_timeout}")
@@ -0,0 +1,54 @@
+# Author: SANJAY KR
+from datetime import datetime
+from .. import db
+
+class Broadcast(db.Model):
+    """A message sent to every member matching samaj_name (all when empty).
+
+    Members are walked in id order and last_member_id is checkpointed after
+    every batch, so an interrupted broadcast resumes where it stopped.
+    """
+    __tablename__ = "broadcast"
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    message = db.Column(db.Text, nullable=False)
+    samaj_name = db.Column(db.String(100))
+    # pending, running, completed, cancelled or failed
+    status = db.Column(db.String(20), nullable=False, default="pending", index=True)
+    # hostname:instance id of the process sending it while running; see utils/process.py
+    owner = db.Column(db.String(50))
+    last_member_id = db.Column(db.Integer, nullable=False, default=0)
+    sent = db.Column(db.Integer, nullable=False, default=0)
+    failed = db.Column(db.Integer, nullable=False, default=0)
+    skipped = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.String(500))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def as_dict(self):
+        return {
+            "id": self.id,
+            "samaj_name": self.samaj_name,
+            "status": self.status,
+            "sent": self.sent,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "last_member_id": self.last_member_id,
+            "error": self.error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    def __repr__(self):
+        return f"<Broadcast {self.id} {self.status}>"
+
+class BroadcastRecipient(db.Model):
+    """Each number a broadcast has reached for; the primary key dedupes
+    members sharing a number and survives a resume."""
+    __tablename__ = "broadcast_recipient"
+    broadcast_id = db.Column(db.Integer, db.ForeignKey("broadcast.id", ondelete="CASCADE"), primary_key=True)
+    phone = db.Column(db.String(20), primary_key=True)
+    # pending until the send finishes, then sent or failed
+    status = db.Column(db.String(10), nullable=False, default="pending")
+
+    def __repr__(self):
+        return f"<BroadcastRecipient {self.broadcast_id} {self.phone} {self.status}>"
@@ -1,13 +1,19 @@
 # Author: SANJAY KR
 from .. import db
-from sqlalchemy.orm import relationship
-from datetime import datetime
+from sqlalchemy import Integer, case, cast, extract, func
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import relationship, validates
+from datetime import date, datetime
+from ..utils.dates import age_on, month_day, parse_date
 
 class Samaj(db.Model):
     __tablename__ = "samaj"
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     name = db.Column(db.String(100), unique=True, nullable=False)
-    members = relationship("Member", back_populates="samaj", cascade="all, delete-orphan")
+    # Never loaded implicitly: a samaj can have thousands of members, so list
+    # views aggregate them in SQL instead. Deletes cascade in the database.
+    members = relationship("Member", back_populates="samaj", cascade="all, delete-orphan",
+                           passive_deletes=True, lazy="raise_on_sql")
 
     def __repr__(self):
         return f"<Samaj {self.name}>"
@@ -15,20 +21,20 @@ class Samaj(db.Model):
 class Member(db.Model):
     __tablename__ = "member"
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    samaj_id = db.Column(db.Integer, db.ForeignKey("samaj.id", ondelete="CASCADE"), nullable=False)
+    samaj_id = db.Column(db.Integer, db.ForeignKey("samaj.id", ondelete="CASCADE"), nullable=False, index=True)
     name = db.Column(db.String(100), nullable=False)
     gender = db.Column(db.String(10))
     age = db.Column(db.Integer)
     blood_group = db.Column(db.String(5))
-    mobile_1 = db.Column(db.String(15))
+    mobile_1 = db.Column(db.String(15), index=True)
     mobile_2 = db.Column(db.String(15))
     education = db.Column(db.String(100))
     occupation = db.Column(db.String(100))
     marital_status = db.Column(db.String(20))
     address = db.Column(db.String(200))
-    email = db.Column(db.String(100))
-    birth_date = db.Column(db.String(10))
-    anniversary_date = db.Column(db.String(10))
+    email = db.Column(db.String(100), index=True)
+    birth_date = db.Column(db.Date)
+    anniversary_date = db.Column(db.Date)
     native_place = db.Column(db.String(100))
     current_city = db.Column(db.String(100))
     languages_known = db.Column(db.String(200))
@@ -42,8 +48,37 @@ class Member(db.Model):
     social_media_handles = db.Column(db.String(200))
     profession_category = db.Column(db.String(100))
     volunteer_interests = db.Column(db.String(200))
+    # Month and day (MMDD) of the dates above, so "birthdays this week" is an index range scan
+    birth_mmdd = db.Column(db.SmallInteger, index=True)
+    anniversary_mmdd = db.Column(db.SmallInteger, index=True)
 
-    samaj = relationship("Samaj", back_populates="members")
+    # Joined so __repr__ and per-member views never issue a query per row
+    samaj = relationship("Samaj", back_populates="members", lazy="joined", innerjoin=True)
+
+    __table_args__ = (
+        # Donor lookups match blood group and city case- and space-insensitively
+        db.Index("ix_member_donor", func.upper(func.trim(blood_group)), func.lower(func.trim(current_city))),
+    )
+
+    @validates("birth_date", "anniversary_date")
+    def _parse_date(self, key, value):
+        value = parse_date(value)
+        setattr(self, key.replace("_date", "_mmdd"), month_day(value))
+        return value
+
+    @hybrid_property
+    def current_age(self):
+        """Age today from birth_date; the age given at registration if there is no birth date."""
+        return age_on(self.birth_date) if self.birth_date else self.age
+
+    @current_age.expression
+    def current_age(cls):
+        today = date.today()
+        before_birthday = case((cls.birth_mmdd > month_day(today), 1), else_=0)
+        return case(
+            (cls.birth_date.isnot(None), today.year - cast(extract("year", cls.birth_date), Integer) - before_birthday),
+            else_=cls.age
+        )
 
     def __repr__(self):
         return f"<Member {self.name} of {self.samaj.name if self.samaj else 'Unknown Samaj'}>"
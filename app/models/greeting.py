@@ -0,0 +1,20 @@
+# Author: SANJAY KR
+from datetime import datetime
+from .. import db
+
+class Greeting(db.Model):
+    """A birthday or anniversary greeting for one member on one day; the
+    primary key makes reruns of the daily job send each greeting once."""
+    __tablename__ = "greeting"
+    member_id = db.Column(db.Integer, db.ForeignKey("member.id", ondelete="CASCADE"), primary_key=True)
+    # birthday or anniversary
+    kind = db.Column(db.String(12), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    # pending, sending once a run has claimed it, then sent or failed (retried on the next run)
+    status = db.Column(db.String(10), nullable=False, default="pending")
+    # Id of the run that claimed it
+    owner = db.Column(db.String(32))
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<Greeting {self.kind} {self.member_id} {self.day} {self.status}>"
@@ -0,0 +1,91 @@
+# Author: SANJAY KR
+import itertools
+import threading
+import time
+from typing import List, Optional, Sequence
+from flask import current_app, g
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from .. import db
+from .base import engine_options
+
+class ReplicaRouter:
+    """Hands out connections to read replicas in round-robin order.
+
+    A replica that fails to connect is skipped for retry_after seconds;
+    when none is available, reads fall back to the primary.
+    """
+
+    def __init__(self, urls: Sequence[str], options: Optional[dict] = None, retry_after: float = 30,
+                 clock=time.monotonic, logger=None):
+        self.urls = list(urls)
+        self.engines: List[Engine] = [
+            create_engine(url, **(options if options is not None else {"pool_pre_ping": True}))
+            for url in self.urls
+        ]
+        self.retry_after = retry_after
+        self.clock = clock
+        self.logger = logger
+        self._down_until = [0.0] * len(self.engines)
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+
+    def healthy(self) -> List[str]:
+        now = self.clock()
+        return [url for url, down_until in zip(self.urls, self._down_until) if down_until <= now]
+
+    def connect(self, primary: Engine) -> Connection:
+        with self._lock:
+            start = next(self._turn)
+        for offset in range(len(self.engines)):
+            index = (start + offset) % len(self.engines)
+            if self._down_until[index] > self.clock():
+                continue
+            try:
+                return self.engines[index].connect()
+            except DBAPIError as e:
+                self._down_until[index] = self.clock() + self.retry_after
+                if self.logger is not None:
+                    self.logger.warning(f"Read replica {index} unavailable, skipping for {self.retry_after}s: {str(e)}")
+        return primary.connect()
+
+    def dispose(self) -> None:
+        for engine in self.engines:
+            engine.dispose()
+
+def read_from_primary() -> None:
+    """Make get_read_db() use the primary for the rest of this request."""
+    g.read_primary = True
+
+def get_read_db() -> Session:
+    """Session for read-only work such as admin listings and exports.
+
+    Bound to a replica connection when DATABASE_REPLICA_URLS is set and
+    otherwise the normal request session; never use it to write.
+    """
+    router: Optional[ReplicaRouter] = current_app.extensions.get("replica_router")
+    if router is None or g.get("read_primary"):
+        return db.session
+    if "read_db" not in g:
+        g.read_connection = router.connect(db.engine)
+        g.read_db = Session(bind=g.read_connection)
+    return g.read_db
+
+def _close_read_db(exception=None) -> None:
+    session = g.pop("read_db", None)
+    if session is not None:
+        session.close()
+        g.pop("read_connection").close()
+
+def init_replicas(app) -> Optional[ReplicaRouter]:
+    urls = [url.strip() for url in (app.config.get("DATABASE_REPLICA_URLS") or "").split(",") if url.strip()]
+    if not urls:
+        return None
+    options = engine_options(dict(app.config, SQLALCHEMY_DATABASE_URI=urls[0]))
+    router = ReplicaRouter(urls, options, float(app.config.get("REPLICA_RETRY_SECONDS", 30)), logger=app.logger)
+    app.extensions["replica_router"] = router
+    app.teardown_appcontext(_close_read_db)
+    app.logger.info(f"Routing admin reads to {len(urls)} read replicas")
+    return router
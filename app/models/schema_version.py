@@ -0,0 +1,13 @@
+# Author: SANJAY KR
+from datetime import datetime
+from .. import db
+
+class SchemaVersion(db.Model):
+    """One row per migration from app.migrations that has been applied."""
+    __tablename__ = "schema_version"
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(100), nullable=False)
+    applied_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<SchemaVersion {self.version} {self.name}>"
@@ -0,0 +1,17 @@
+# Author: SANJAY KR
+from .. import db
+
+class SamajStat(db.Model):
+    """Running member count for one (samaj, dimension, bucket).
+
+    Kept up to date by app.services.member_stats as members are written,
+    e.g. ("blood_group", "O+") or ("age", "30-39").
+    """
+    __tablename__ = "samaj_stat"
+    samaj_id = db.Column(db.Integer, db.ForeignKey("samaj.id", ondelete="CASCADE"), primary_key=True)
+    dimension = db.Column(db.String(20), primary_key=True)
+    bucket = db.Column(db.String(100), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<SamajStat {self.samaj_id} {self.dimension}={self.bucket}: {self.count}>"
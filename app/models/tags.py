@@ -0,0 +1,24 @@
+# Author: SANJAY KR
+from .. import db
+
+class Tag(db.Model):
+    """One value of a multi-valued member field, e.g. ("languages", "Gujarati")."""
+    __tablename__ = "tag"
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    facet = db.Column(db.String(20), nullable=False)
+    name = db.Column(db.String(100), nullable=False)
+
+    __table_args__ = (db.UniqueConstraint("facet", "name", name="uq_tag_facet_name"),)
+
+    def __repr__(self):
+        return f"<Tag {self.facet}={self.name}>"
+
+class MemberTag(db.Model):
+    """Inverted index from tag to member; the primary key leads with tag_id
+    so "members with this tag" is a range scan."""
+    __tablename__ = "member_tag"
+    tag_id = db.Column(db.Integer, db.ForeignKey("tag.id", ondelete="CASCADE"), primary_key=True)
+    member_id = db.Column(db.Integer, db.ForeignKey("member.id", ondelete="CASCADE"), primary_key=True, index=True)
+
+    def __repr__(self):
+        return f"<MemberTag {self.tag_id} {self.member_id}>"
@@ -1,55 +1,190 @@
 # Author: SANJAY KR
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, current_app, request, jsonify, Response, stream_with_context
 from sqlalchemy.orm import Session
-from ..models.base import get_db
+from ..models.base import get_db, statement_timeout
+from ..models.routing import get_read_db
 from ..controllers.admin_controller import (
-    get_members, get_samaj_list, get_member,
-    export_members_csv
+    get_samaj_list, get_samaj_summary, get_member_row, list_member_rows, parse_member_fields,
+    export_members_csv, get_session_stats
 )
+from ..services.member_stats import get_samaj_stats
+from ..services.donors import find_donors_cached
+from ..services.member_tags import parse_filters, search_members
+from ..services.broadcast import get_broadcast_runner
+from ..services.member_import import FORMATS, detect_format, get_import_pool, import_members, read_lines
+from ..models.broadcast import Broadcast
 from ..controllers.auth_controller import verify_token
-from io import StringIO
 from ..utils.auth import login_required
+from ..utils.compression import gzip_response
+from ..utils.downloads import content_disposition
+from ..utils.http_cache import cached_response
 
 admin_bp = Blueprint("admin", __name__)
 
+admin_bp.after_request(gzip_response)
+
 @admin_bp.route("/members", methods=["GET"])
 @login_required
+@statement_timeout("ADMIN_STATEMENT_TIMEOUT_MS")
+@cached_response
 def list_members():
-    db = next(get_db())
+    db = get_read_db()
     samaj_name = request.args.get("samaj_name")
-    members = get_members(db, samaj_name)
-    return jsonify([member.__dict__ for member in members])
+    try:
+        fields = parse_member_fields(request.args.get("fields"))
+        after = request.args.get("after", type=int)
+        limit = min(max(request.args.get("limit", 100, type=int), 1), 1000)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    members, next_cursor = list_member_rows(db, samaj_name, fields, after, limit)
+    
+    response = jsonify(members)
+    if next_cursor is not None:
+        # Keyset cursor: pass it back as ?after= to get the next page
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    return response
+
+@admin_bp.route("/members/search", methods=["GET"])
+@login_required
+@statement_timeout("ADMIN_STATEMENT_TIMEOUT_MS")
+@cached_response
+def search_members_by_tags():
+    db = get_read_db()
+    try:
+        result = search_members(
+            db.connection(),
+            parse_filters(request.args),
+            match=request.args.get("match", "any").lower(),
+            limit=min(max(request.args.get("limit", 50, type=int), 1), 1000),
+            after=request.args.get("after", type=int)
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(result)
 
 @admin_bp.route("/samaj", methods=["GET"])
 @login_required
+@statement_timeout("ADMIN_STATEMENT_TIMEOUT_MS")
+@cached_response
 def list_samaj():
-    db = next(get_db())
+    db = get_read_db()
     samaj_list = get_samaj_list(db)
-    return jsonify([samaj.__dict__ for samaj in samaj_list])
+    return jsonify([{"id": samaj.id, "name": samaj.name} for samaj in samaj_list])
+
+@admin_bp.route("/samaj/summary", methods=["GET"])
+@login_required
+@statement_timeout("ADMIN_STATEMENT_TIMEOUT_MS")
+@cached_response
+def samaj_summary():
+    db = get_read_db()
+    return jsonify(get_samaj_summary(db))
+
+@admin_bp.route("/stats", methods=["GET"])
+@login_required
+@statement_timeout("ADMIN_STATEMENT_TIMEOUT_MS")
+@cached_response
+def samaj_stats():
+    db = get_read_db()
+    # Reads only the incrementally maintained summaries, never the member table
+    return jsonify(get_samaj_stats(db.connection(), request.args.get("samaj_name")))
+
+@admin_bp.route("/donors", methods=["GET"])
+@login_required
+@statement_timeout("ADMIN_STATEMENT_TIMEOUT_MS")
+def find_blood_donors():
+    db = get_read_db()
+    blood_group = request.args.get("blood_group", "")
+    city = request.args.get("city", "")
+    if not blood_group or not city:
+        return jsonify({"error": "blood_group and city are required"}), 400
+    compatible = request.args.get("compatible", "true").lower() == "true"
+    limit = min(max(request.args.get("limit", 50, type=int), 1), 500)
+    try:
+        donors = find_donors_cached(db, blood_group, city, compatible, limit)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(donors)
 
 @admin_bp.route("/members/<int:member_id>", methods=["GET"])
 @login_required
+@statement_timeout("ADMIN_STATEMENT_TIMEOUT_MS")
+@cached_response
 def get_member_details(member_id: int):
-    db = next(get_db())
-    member = get_member(db, member_id)
+    db = get_read_db()
+    member = get_member_row(db, member_id)
     if not member:
         return jsonify({"error": "Member not found"}), 404
-    return jsonify(member.__dict__)
+    return jsonify(member)
 
 @admin_bp.route("/export/csv", methods=["GET"])
 @login_required
 def export_csv():
-    db = next(get_db())
+    db = get_read_db()
     samaj_name = request.args.get("samaj_name")
-    csv_data, filename = export_members_csv(db, samaj_name)
-    
-    output = StringIO()
-    output.write(csv_data)
-    output.seek(0)
+    chunks, filename = export_members_csv(db, samaj_name)
     
-    return send_file(
-        output,
-        mimetype="text/csv",
-        as_attachment=True,
-        download_name=filename
+    # Streamed so the first rows go out before the whole table is read
+    return Response(
+        stream_with_context(chunks),
+        content_type="text/csv",
+        headers={"Content-Disposition": content_disposition(filename)}
     )
+
+@admin_bp.route("/members/import", methods=["POST"])
+@login_required
+@statement_timeout("ADMIN_STATEMENT_TIMEOUT_MS")
+def import_members_file():
+    upload = request.files.get("file")
+    # A multipart upload is spooled to disk by Werkzeug; a raw body is read straight off the socket
+    stream = upload.stream if upload else request.stream
+    fmt = request.args.get("format") or detect_format(
+        upload.filename if upload else None, upload.content_type if upload else request.content_type
+    )
+    if fmt not in FORMATS:
+        return jsonify({"error": "format must be csv or ndjson"}), 400
+    config = current_app.config
+    report = import_members(
+        get_db(),
+        read_lines(stream, fmt),
+        default_samaj=request.args.get("samaj_name"),
+        pool=get_import_pool(),
+        chunk_size=config.get("IMPORT_CHUNK_SIZE", 1000),
+        batch_size=config.get("IMPORT_BATCH_SIZE", 5000),
+        max_errors=config.get("IMPORT_MAX_ERRORS", 1000)
+    )
+    return jsonify(report)
+
+@admin_bp.route("/broadcasts", methods=["POST"])
+@login_required
+def create_broadcast():
+    data = request.get_json(silent=True) or request.form
+    message = (data.get("message") or "").strip()
+    if not message:
+        return jsonify({"error": "Missing message"}), 400
+    runner = get_broadcast_runner()
+    if runner is None:
+        return jsonify({"error": "Broadcasts are not available"}), 503
+    broadcast = runner.create(message, data.get("samaj_name"))
+    runner.start(broadcast.id)
+    return jsonify(broadcast.as_dict()), 202
+
+@admin_bp.route("/broadcasts/<int:broadcast_id>", methods=["GET"])
+@login_required
+def broadcast_status(broadcast_id: int):
+    broadcast = get_db().get(Broadcast, broadcast_id)
+    if not broadcast:
+        return jsonify({"error": "Broadcast not found"}), 404
+    return jsonify(broadcast.as_dict())
+
+@admin_bp.route("/broadcasts/<int:broadcast_id>/cancel", methods=["POST"])
+@login_required
+def cancel_broadcast(broadcast_id: int):
+    runner = get_broadcast_runner()
+    if runner is None or not runner.cancel(broadcast_id):
+        return jsonify({"error": "Broadcast not found or already finished"}), 404
+    return jsonify({"success": True})
+
+@admin_bp.route("/sessions/stats", methods=["GET"])
+@login_required
+def session_stats():
+    return jsonify(get_session_stats())
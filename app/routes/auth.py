@@ -1,6 +1,7 @@
 # Author: SANJAY KR
 from flask import Blueprint, request, jsonify
-from ..controllers.auth_controller import authenticate_user
+from ..controllers.auth_controller import authenticate_user, revoke_token
+from ..utils.auth import login_required
 
 auth_bp = Blueprint("auth", __name__)
 
@@ -21,3 +22,10 @@ def login():
         return jsonify({"error": "Invalid credentials"}), 401
     
     return jsonify(token_data)
+
+@auth_bp.route("/logout", methods=["POST"])
+@login_required
+def logout():
+    token = request.headers["Authorization"].split(" ")[1]
+    revoke_token(token)
+    return jsonify({"success": True})
@@ -1,17 +1,45 @@
 # Author: SANJAY KR
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app, Response
+from twilio.twiml.messaging_response import MessagingResponse
 from sqlalchemy.orm import Session
-from ..models.base import get_db
+from ..models.base import get_db, statement_timeout
 from ..controllers.whatsapp_controller import handle_webhook
+from ..services.whatsapp_service import get_whatsapp_service
 
 whatsapp_bp = Blueprint("whatsapp", __name__)
 
+def twiml_reply(message: str) -> Response:
+    reply = MessagingResponse()
+    reply.message(message)
+    return Response(str(reply), mimetype="application/xml")
+
 @whatsapp_bp.route("/webhook", methods=["POST"])
+@statement_timeout("WEBHOOK_STATEMENT_TIMEOUT_MS")
 def webhook():
+    # In TwiML mode the reply goes back in the webhook response itself
+    # instead of a separate Twilio API call
+    inline = current_app.config.get("WEBHOOK_REPLY_MODE", "rest") == "twiml"
+    
+    message_sid = request.form.get("MessageSid")
+    # Set once this request has recorded message_sid as seen
+    dedup = None
     db = get_db()
     try:
+        # Twilio retries webhooks it thinks timed out; answer repeats without
+        # touching the session or the database
+        if message_sid:
+            cache = get_whatsapp_service().dedup
+            if cache is not None and cache.seen(message_sid):
+                current_app.logger.info(f"Ignoring duplicate webhook for {message_sid}")
+                if inline:
+                    return Response(str(MessagingResponse()), mimetype="application/xml")
+                return jsonify({"success": True, "duplicate": True})
+            dedup = cache
+        
         request_data = request.form
         if 'NumMedia' in request_data and int(request_data['NumMedia']) > 0:
+            if inline:
+                return twiml_reply("Media attachments are not supported. Please send text messages only.")
             return jsonify({
                 "success": False,
                 "message": "Media attachments are not supported. Please send text messages only."
@@ -22,8 +50,13 @@ def webhook():
         response, success = handle_webhook(
             phone_number=phone_number,
             message=request_data["Body"],
-            db=db
+            db=db,
+            send_reply=not inline
         )
+        if inline:
+            return twiml_reply(response)
         return jsonify({"success": success, "message": response})
     except Exception as e:
+        if dedup is not None:
+            dedup.forget(message_sid)
         return jsonify({"error": str(e)}), 500
@@ -0,0 +1,284 @@
+# Author: SANJAY KR
+import random
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from flask import current_app, has_app_context
+from sqlalchemy import select, update
+from .. import db
+from ..models.base import insert_ignoring_duplicates
+from ..models.family import Member
+from ..models.broadcast import Broadcast, BroadcastRecipient
+from ..controllers.admin_controller import members_query
+from ..utils.process import hold_instance_lock, instance_alive
+from ..utils.rate_limit import RateLimiter
+
+# Bare numbers with at most this many digits are taken as local, without a country code
+LOCAL_DIGITS = 10
+
+def normalize_number(raw: Optional[str], default_country_code: str = "") -> Optional[str]:
+    """E.164 form of a stored mobile number, or None if it is not one.
+
+    Numbers starting with "+" or "00" carry their country code, as do bare
+    numbers longer than LOCAL_DIGITS without a leading 0. Local numbers
+    (e.g. the 10 digits the bot asks for) get default_country_code; without
+    one they are None, since their country cannot be known.
+    """
+    if not raw:
+        return None
+    number = raw.strip().replace(" ", "").replace("-", "").replace("whatsapp:", "")
+    if number.startswith("00"):
+        number = "+" + number[2:]
+    elif not number.startswith("+"):
+        # A leading 0 is a trunk prefix, e.g. 09876543210: local as well
+        if number.startswith("0") or len(number) <= LOCAL_DIGITS:
+            if not default_country_code:
+                return None
+            number = default_country_code.lstrip("+") + number.lstrip("0")
+        number = "+" + number
+    return number if number[1:].isdigit() and 8 <= len(number) <= 16 else None
+
+class BroadcastRunner:
+    """Sends broadcasts from background threads.
+
+    Members are read batch_size at a time in id order. Each batch's numbers
+    are recorded as broadcast recipients before sending (so numbers shared
+    by several members, or already reached before a restart, are sent
+    once), then fanned out over a pool of workers threads that together
+    send at most rate messages per second. Progress is committed after
+    every batch; after a crash at most one batch is sent again.
+    """
+
+    def __init__(self, app, send: Callable[[str, str], bool], workers: int = 8, rate: float = 10.0,
+                 batch_size: int = 100, max_retries: int = 3, backoff: float = 1.0,
+                 lock_dir: str = "spool/broadcasts", default_country_code: str = ""):
+        self.app = app
+        self.send = send
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.default_country_code = default_country_code
+        self.limiter = RateLimiter(rate)
+        # Shared by all broadcasts: the provider's rate limit is per account
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="broadcast")
+        self._threads: Dict[int, threading.Thread] = {}
+        self._lock = threading.Lock()
+        # hostname:instance id of this process start, whose flock in lock_dir
+        # is held until it exits: a job is only taken over from an owner known
+        # to be dead, even when a restarted container runs with the same pid
+        self.lock_dir = lock_dir
+        self.owner = f"{socket.gethostname()}:{hold_instance_lock(lock_dir)}"
+
+    def create(self, message: str, samaj_name: Optional[str] = None) -> Broadcast:
+        broadcast = Broadcast(message=message, samaj_name=samaj_name or None, status="pending")
+        db.session.add(broadcast)
+        db.session.commit()
+        return broadcast
+
+    def _claim(self, broadcast_id: int, current_owner: Optional[str]) -> bool:
+        """Atomically take the job over from current_owner."""
+        owner_matches = Broadcast.owner.is_(None) if current_owner is None else Broadcast.owner == current_owner
+        result = db.session.execute(
+            update(Broadcast)
+            .where(Broadcast.id == broadcast_id, owner_matches, Broadcast.status.in_(("pending", "running")))
+            .values(owner=self.owner, status="running")
+        )
+        db.session.commit()
+        return result.rowcount == 1
+
+    def start(self, broadcast_id: int) -> bool:
+        if not self._claim(broadcast_id, None):
+            return False
+        self._spawn(broadcast_id)
+        return True
+
+    def _spawn(self, broadcast_id: int) -> None:
+        thread = threading.Thread(target=self._run, args=(broadcast_id,), name=f"broadcast-{broadcast_id}", daemon=True)
+        with self._lock:
+            self._threads[broadcast_id] = thread
+        thread.start()
+
+    def resume_interrupted(self) -> List[int]:
+        """Restart broadcasts left running by processes on this host that have exited."""
+        host = socket.gethostname()
+        resumed = []
+        jobs = db.session.execute(
+            select(Broadcast.id, Broadcast.owner).where(Broadcast.status.in_(("pending", "running")))
+        ).all()
+        for broadcast_id, owner in jobs:
+            if owner is not None:
+                owner_host, _, instance = owner.rpartition(":")
+                if owner == self.owner or owner_host != host or not instance or instance_alive(self.lock_dir, instance):
+                    continue
+            if self._claim(broadcast_id, owner):
+                self._spawn(broadcast_id)
+                resumed.append(broadcast_id)
+        return resumed
+
+    def cancel(self, broadcast_id: int) -> bool:
+        result = db.session.execute(
+            update(Broadcast)
+            .where(Broadcast.id == broadcast_id, Broadcast.status.in_(("pending", "running")))
+            .values(status="cancelled")
+        )
+        db.session.commit()
+        return result.rowcount == 1
+
+    def join(self, broadcast_id: int, timeout: Optional[float] = None) -> None:
+        with self._lock:
+            thread = self._threads.get(broadcast_id)
+        if thread is not None:
+            thread.join(timeout)
+
+    def stop(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _deliver(self, phone: str, message: str) -> bool:
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            try:
+                with self.app.app_context():
+                    return self.send(phone, message)
+            except Exception as e:
+                if getattr(e, "status", None) == 429:
+                    # The provider is throttling us: slow every worker down
+                    self.limiter.penalize(self.backoff * 2 ** attempt)
+                if attempt == self.max_retries:
+                    self.app.logger.error(f"Broadcast to {phone} failed: {str(e)}")
+                    return False
+                time.sleep(self.backoff * 2 ** attempt * (0.5 + random.random() / 2))
+        return False
+
+    def send_all(self, messages: Sequence[Tuple[str, str]]) -> List[bool]:
+        """Send (phone, message) pairs over the shared pool and rate limit."""
+        return list(self._pool.map(lambda item: self._deliver(*item), messages))
+
+    def _record_recipients(self, broadcast_id: int, numbers: Sequence[str]) -> List[str]:
+        """Record numbers for the broadcast; returns those still to be sent."""
+        rows = [{"broadcast_id": broadcast_id, "phone": number} for number in numbers]
+        insert_ignoring_duplicates(db.session, BroadcastRecipient, rows, ["broadcast_id", "phone"])
+        return list(db.session.execute(
+            select(BroadcastRecipient.phone).where(
+                BroadcastRecipient.broadcast_id == broadcast_id,
+                BroadcastRecipient.phone.in_(numbers),
+                BroadcastRecipient.status == "pending"
+            )
+        ).scalars())
+
+    def _run(self, broadcast_id: int) -> None:
+        with self.app.app_context():
+            try:
+                self._send_batches(broadcast_id)
+            except Exception as e:
+                db.session.rollback()
+                self.app.logger.error(f"Broadcast {broadcast_id} failed: {str(e)}")
+                db.session.execute(
+                    update(Broadcast).where(Broadcast.id == broadcast_id, Broadcast.owner == self.owner)
+                    .values(status="failed", error=str(e)[:500])
+                )
+                db.session.commit()
+            finally:
+                db.session.remove()
+                with self._lock:
+                    self._threads.pop(broadcast_id, None)
+
+    def _send_batches(self, broadcast_id: int) -> None:
+        while True:
+            broadcast = db.session.get(Broadcast, broadcast_id, populate_existing=True)
+            if broadcast is None or broadcast.status != "running" or broadcast.owner != self.owner:
+                return
+            rows = db.session.execute(
+                members_query(broadcast.samaj_name, Member.id, Member.mobile_1)
+                .where(Member.id > broadcast.last_member_id)
+                .order_by(Member.id)
+                .limit(self.batch_size)
+            ).all()
+            if not rows:
+                broadcast.status = "completed"
+                db.session.commit()
+                self.app.logger.info(f"Broadcast {broadcast_id} completed: {broadcast.sent} sent, {broadcast.failed} failed")
+                return
+
+            # Members without a usable number are counted as skipped below
+            numbers = list(dict.fromkeys(filter(None, (
+                normalize_number(mobile, self.default_country_code) for _, mobile in rows
+            ))))
+            pending = self._record_recipients(broadcast_id, numbers) if numbers else []
+            message = broadcast.message
+            db.session.commit()
+
+            results = self.send_all([(phone, message) for phone in pending])
+            sent = [phone for phone, ok in zip(pending, results) if ok]
+            failed = [phone for phone, ok in zip(pending, results) if not ok]
+            for status, phones in (("sent", sent), ("failed", failed)):
+                if phones:
+                    db.session.execute(
+                        update(BroadcastRecipient)
+                        .where(BroadcastRecipient.broadcast_id == broadcast_id, BroadcastRecipient.phone.in_(phones))
+                        .values(status=status)
+                    )
+            db.session.execute(
+                update(Broadcast).where(Broadcast.id == broadcast_id).values(
+                    sent=Broadcast.sent + len(sent),
+                    failed=Broadcast.failed + len(failed),
+                    skipped=Broadcast.skipped + len(rows) - len(pending),
+                    last_member_id=rows[-1][0]
+                )
+            )
+            db.session.commit()
+
+def get_broadcast_runner() -> Optional[BroadcastRunner]:
+    if not has_app_context():
+        return None
+    return current_app.extensions.get("broadcast_runner")
+
+def init_broadcasts(app, send: Optional[Callable[[str, str], bool]] = None) -> BroadcastRunner:
+    if send is None:
+        from .whatsapp_service import get_whatsapp_service
+
+        def send(to: str, message: str) -> bool:
+            return get_whatsapp_service().deliver(to, message)
+    runner = BroadcastRunner(
+        app,
+        send,
+        workers=app.config.get("BROADCAST_WORKERS", 8),
+        rate=app.config.get("BROADCAST_RATE_PER_SECOND", 10.0),
+        batch_size=app.config.get("BROADCAST_BATCH_SIZE", 100),
+        max_retries=app.config.get("BROADCAST_MAX_RETRIES", 3),
+        lock_dir=app.config.get("BROADCAST_LOCK_DIR", "spool/broadcasts"),
+        default_country_code=app.config.get("DEFAULT_COUNTRY_CODE", "")
+    )
+    app.extensions["broadcast_runner"] = runner
+    return runner
+
+def resume_when_serving(app, runner: BroadcastRunner) -> None:
+    """Resume interrupted broadcasts once this process handles its first request.
+
+    CLI commands build the app too, but exit before a resumed broadcast
+    could finish and would take its sender threads with them; only a
+    process serving requests takes interrupted broadcasts over.
+    """
+    waiting = threading.Event()
+    waiting.set()
+    lock = threading.Lock()
+
+    @app.before_request
+    def resume_interrupted_broadcasts():
+        if not waiting.is_set():
+            return
+        with lock:
+            if not waiting.is_set():
+                return
+            waiting.clear()
+        # Its own context, so the claims never share the request's session
+        with app.app_context():
+            try:
+                resumed = runner.resume_interrupted()
+            except Exception as e:
+                app.logger.error(f"Failed to resume interrupted broadcasts: {str(e)}")
+                return
+        if resumed:
+            app.logger.info(f"Resumed interrupted broadcasts: {resumed}")
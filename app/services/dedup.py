@@ -0,0 +1,82 @@
+# Author: SANJAY KR
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+class MessageDeduplicator:
+    """Remembers recently seen Twilio MessageSids so retried webhooks are
+    processed only once. Entries are kept for ttl seconds.
+    """
+
+    def __init__(self, ttl: float = 3600, clock=time.time):
+        self.ttl = ttl
+        self.clock = clock
+
+    def seen(self, sid: str) -> bool:
+        """Atomically record sid; returns True if it was already recorded."""
+        raise NotImplementedError
+
+    def forget(self, sid: str) -> None:
+        """Drop sid so a retry of a message that failed is processed again."""
+        raise NotImplementedError
+
+class MemoryDeduplicator(MessageDeduplicator):
+    """Per-process cache holding at most max_entries sids."""
+
+    def __init__(self, ttl: float = 3600, max_entries: int = 100000, clock=time.time):
+        super().__init__(ttl, clock)
+        self.max_entries = max_entries
+        # sid -> time first seen, oldest first
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def seen(self, sid: str) -> bool:
+        now = self.clock()
+        with self._lock:
+            while self._seen:
+                oldest, first_seen = next(iter(self._seen.items()))
+                if now - first_seen <= self.ttl:
+                    break
+                del self._seen[oldest]
+            if sid in self._seen:
+                return True
+            self._seen[sid] = now
+            while len(self._seen) > self.max_entries:
+                self._seen.popitem(last=False)
+            return False
+
+    def forget(self, sid: str) -> None:
+        with self._lock:
+            self._seen.pop(sid, None)
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+class RedisDeduplicator(MessageDeduplicator):
+    """Cache shared by every worker through a Redis-protocol server."""
+
+    def __init__(self, url: Optional[str] = None, client=None, prefix: str = "wa:sid:",
+                 ttl: float = 3600, clock=time.time):
+        super().__init__(ttl, clock)
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url or "redis://localhost:6379/0")
+        self.client = client
+        self.prefix = prefix
+
+    def seen(self, sid: str) -> bool:
+        # SET NX succeeds only for the first worker to record the sid
+        return not self.client.set(self.prefix + sid, 1, nx=True, ex=max(1, int(self.ttl)))
+
+    def forget(self, sid: str) -> None:
+        self.client.delete(self.prefix + sid)
+
+def create_deduplicator(config) -> MessageDeduplicator:
+    backend = (config.get("DEDUP_BACKEND") or "memory").lower()
+    ttl = float(config.get("DEDUP_TTL_SECONDS", 3600))
+    if backend == "memory":
+        return MemoryDeduplicator(ttl=ttl, max_entries=int(config.get("DEDUP_MAX_ENTRIES", 100000)))
+    if backend == "redis":
+        return RedisDeduplicator(url=config.get("REDIS_URL"), ttl=ttl)
+    raise ValueError(f"Unknown dedup backend: {backend}")
@@ -0,0 +1,79 @@
+# Author: SANJAY KR
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+from flask import current_app
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from ..models.family import Samaj, Member
+from ..utils.ttl_cache import TTLCache
+
+# Recipient blood group -> groups that can donate to it, best match first
+COMPATIBLE_DONORS: Mapping[str, Tuple[str, ...]] = {
+    "O-": ("O-",),
+    "O+": ("O+", "O-"),
+    "A-": ("A-", "O-"),
+    "A+": ("A+", "A-", "O+", "O-"),
+    "B-": ("B-", "O-"),
+    "B+": ("B+", "B-", "O+", "O-"),
+    "AB-": ("AB-", "A-", "B-", "O-"),
+    "AB+": ("AB+", "AB-", "A+", "A-", "B+", "B-", "O+", "O-")
+}
+
+# Free-text columns are matched through the same expressions the
+# ix_member_donor index is built on, so lookups are index range scans
+BLOOD_GROUP_KEY = func.upper(func.trim(Member.blood_group))
+CITY_KEY = func.lower(func.trim(Member.current_city))
+
+def normalize_blood_group(value: str) -> str:
+    group = value.strip().upper()
+    # An unescaped "+" in a query string arrives as a space
+    if group not in COMPATIBLE_DONORS and value.endswith(" "):
+        group += "+"
+    return group
+
+def normalize_city(value: str) -> str:
+    return value.strip().lower()
+
+def find_donors(db: Session, blood_group: str, city: str, compatible: bool = True,
+                limit: int = 50) -> List[Dict[str, Any]]:
+    """Members in city who can donate to blood_group, exact matches first."""
+    blood_group = normalize_blood_group(blood_group)
+    if blood_group not in COMPATIBLE_DONORS:
+        raise ValueError(f"Unknown blood group: {blood_group}")
+    city = normalize_city(city)
+    groups = COMPATIBLE_DONORS[blood_group] if compatible else (blood_group,)
+    donors: List[Dict[str, Any]] = []
+    # One indexed probe per donor group, stopping once the page is full
+    for group in groups:
+        rows = db.execute(
+            select(Member.id, Member.name, Member.blood_group, Member.current_city,
+                   Member.mobile_1, Samaj.name.label("samaj"))
+            .join(Samaj, Samaj.id == Member.samaj_id)
+            .where(BLOOD_GROUP_KEY == group, CITY_KEY == city)
+            .order_by(Member.id)
+            .limit(limit - len(donors))
+        ).mappings().all()
+        donors.extend(dict(row, blood_group=group) for row in rows)
+        if len(donors) >= limit:
+            break
+    return donors
+
+def get_donor_cache() -> TTLCache:
+    cache = current_app.extensions.get("donor_cache")
+    if cache is None:
+        cache = current_app.extensions["donor_cache"] = TTLCache(
+            ttl=float(current_app.config.get("DONOR_CACHE_SECONDS", 30))
+        )
+    return cache
+
+def find_donors_cached(db: Session, blood_group: str, city: str, compatible: bool = True,
+                       limit: int = 50) -> List[Dict[str, Any]]:
+    """find_donors() behind a short-lived cache; repeated emergency searches
+    for the same group and city are answered without touching the database.
+    """
+    key = (normalize_blood_group(blood_group), normalize_city(city), compatible, limit)
+    cache = get_donor_cache()
+    donors: Optional[List[Dict[str, Any]]] = cache.get(key)
+    if donors is None:
+        donors = find_donors(db, blood_group, city, compatible, limit)
+        cache.set(key, donors)
+    return donors
@@ -0,0 +1,182 @@
+# Author: SANJAY KR
+import json
+import os
+from ..utils.dates import parse_date
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+# Questionnaires are declared as JSON files; every *.json in this directory
+# (and in FLOWS_DIR, if set) is compiled once at import.
+FLOWS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "flows")
+
+def _choice(spec: Dict[str, Any]) -> Callable[[str], bool]:
+    choices = frozenset(choice.lower() for choice in spec["choices"])
+    return lambda x: x.lower() in choices
+
+def _integer(spec: Dict[str, Any]) -> Callable[[str], bool]:
+    low, high = spec.get("min", 0), spec.get("max")
+    return lambda x: x.isdigit() and int(x) >= low and (high is None or int(x) <= high)
+
+def _digits(spec: Dict[str, Any]) -> Callable[[str], bool]:
+    length = spec["length"]
+    return lambda x: x.isdigit() and len(x) == length
+
+def _email(spec: Dict[str, Any]) -> Callable[[str], bool]:
+    return lambda x: "@" in x and "." in x.split("@")[1]
+
+def _date(spec: Dict[str, Any]) -> Callable[[str], bool]:
+    return lambda x: parse_date(x) is not None
+
+VALIDATORS: Mapping[str, Callable[[Dict[str, Any]], Callable[[str], bool]]] = MappingProxyType({
+    "choice": _choice,
+    "integer": _integer,
+    "digits": _digits,
+    "email": _email,
+    "date": _date
+})
+
+class Step(NamedTuple):
+    field: str
+    prompt: str
+    check: Optional[Callable[[str], bool]]
+    error: str
+    optional: bool
+    # (index of an earlier step, accepted answers): only ask this step when
+    # that earlier answer is one of the accepted values
+    ask_if: Optional[Tuple[int, frozenset]]
+    # Longest answer that fits the column it is saved to
+    max_length: Optional[int] = None
+
+    def parse(self, message: str) -> Tuple[bool, Any]:
+        """Return (True, value to store) or (False, error message)."""
+        if self.optional and message.lower() == "skip":
+            return True, None
+        if self.max_length is not None and len(message) > self.max_length:
+            return False, f"Please keep your {self.field.replace('_', ' ')} to {self.max_length} characters or fewer"
+        if self.check is not None and not self.check(message):
+            return False, self.error
+        return True, message
+
+class Flow(NamedTuple):
+    name: str
+    trigger: str
+    welcome: str
+    complete: str
+    steps: Tuple[Step, ...]
+    fields: Tuple[str, ...]
+    index: Mapping[str, int]
+    # Keyword that starts the flow as a single fill-in form, if any
+    form_trigger: Optional[str] = None
+
+    def first_prompt(self) -> str:
+        return f"{self.welcome}\n{self.steps[0].prompt}" if self.welcome else self.steps[0].prompt
+
+    def next_step(self, step: int, answers: Sequence[Any]) -> int:
+        """Index of the next step to ask once answers covers steps 0..step."""
+        step += 1
+        while step < len(self.steps) and self.steps[step].ask_if is not None:
+            position, accepted = self.steps[step].ask_if
+            answer = answers[position]
+            if answer is not None and answer.lower() in accepted:
+                break
+            step += 1
+        return step
+
+    def parse_all(self, record: Mapping[str, Any]) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """Check every answer in record at once, as if sent one by one.
+
+        Returns (values to store, error per field). Missing required answers
+        are errors; steps the flow would not ask, given the other answers,
+        are left out of both.
+        """
+        values: Dict[str, Any] = {}
+        errors: Dict[str, str] = {}
+        answers: List[Any] = [None] * len(self.steps)
+        step = 0
+        while step < len(self.steps):
+            spec = self.steps[step]
+            raw = record.get(spec.field)
+            raw = "" if raw is None else str(raw).strip()
+            if raw:
+                ok, value = spec.parse(raw)
+                if ok:
+                    values[spec.field] = answers[step] = value
+                else:
+                    errors[spec.field] = value
+            elif not spec.optional:
+                errors[spec.field] = f"Missing {spec.field.replace('_', ' ')}"
+            step = self.next_step(step, answers)
+        return values, errors
+
+def compile_flow(definition: Dict[str, Any]) -> Flow:
+    name = definition["name"]
+    steps: List[Step] = []
+    index: Dict[str, int] = {}
+    for position, spec in enumerate(definition["steps"]):
+        field = spec["field"]
+        if field in index:
+            raise ValueError(f"Flow '{name}' declares field '{field}' twice")
+        check = None
+        if "validate" in spec:
+            kind = spec["validate"]["type"]
+            if kind not in VALIDATORS:
+                raise ValueError(f"Flow '{name}' uses unknown validator '{kind}' for '{field}'")
+            check = VALIDATORS[kind](spec["validate"])
+        ask_if = None
+        if "ask_if" in spec:
+            depends_on = spec["ask_if"]["field"]
+            if depends_on not in index:
+                raise ValueError(f"Flow '{name}' step '{field}' depends on later or unknown field '{depends_on}'")
+            if position == 0:
+                raise ValueError(f"Flow '{name}' must always ask its first step")
+            ask_if = (index[depends_on], frozenset(value.lower() for value in spec["ask_if"]["in"]))
+        max_length = spec.get("max_length")
+        if max_length is not None and (not isinstance(max_length, int) or max_length <= 0):
+            raise ValueError(f"Flow '{name}' step '{field}' has an invalid max_length")
+        steps.append(Step(
+            field=field,
+            prompt=spec["prompt"],
+            check=check,
+            error=spec.get("error", f"Please enter a valid {field.replace('_', ' ')}"),
+            optional=spec.get("optional", False),
+            ask_if=ask_if,
+            max_length=max_length
+        ))
+        index[field] = position
+    if not steps:
+        raise ValueError(f"Flow '{name}' has no steps")
+    return Flow(
+        name=name,
+        trigger=definition.get("trigger", name).lower(),
+        welcome=definition.get("welcome", ""),
+        complete=definition.get("complete", "Thank you! Your answers have been recorded."),
+        steps=tuple(steps),
+        fields=tuple(step.field for step in steps),
+        index=MappingProxyType(index),
+        form_trigger=definition["form_trigger"].lower() if definition.get("form_trigger") else None
+    )
+
+def load_flows(*directories: Optional[str]) -> Mapping[str, Flow]:
+    flows: Dict[str, Flow] = {}
+    for directory in directories:
+        if not directory or not os.path.isdir(directory):
+            continue
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith(".json"):
+                continue
+            with open(os.path.join(directory, filename)) as f:
+                flow = compile_flow(json.load(f))
+            flows[flow.name] = flow
+    return MappingProxyType(flows)
+
+FLOWS = load_flows(FLOWS_PATH, os.getenv("FLOWS_DIR"))
+
+# Keyword that starts each flow, e.g. "start" for registration
+TRIGGERS: Mapping[str, Flow] = MappingProxyType({flow.trigger: flow for flow in FLOWS.values()})
+
+# Keyword that starts each flow as a form, e.g. "form" for registration
+FORM_TRIGGERS: Mapping[str, Flow] = MappingProxyType(
+    {flow.form_trigger: flow for flow in FLOWS.values() if flow.form_trigger}
+)
+
+REGISTRATION = FLOWS["registration"]
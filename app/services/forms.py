@@ -0,0 +1,109 @@
+# Author: SANJAY KR
+"""Single-message "form" mode for flows.
+
+Instead of one question per message, the bot sends every question as a
+numbered fill-in template and the user answers them all in one reply, as
+"Field: value" lines or numbered answers ("3. Male"). All answers are
+validated at once and only the missing or invalid ones are asked again.
+
+A form session is stored under the flow name plus FORM_SUFFIX and keeps one
+dict of raw answers per reply; later replies override earlier answers. Once
+every answer is valid the session is rewritten as a completed run of the
+flow, so it is saved exactly like a registration made step by step.
+"""
+import re
+from typing import Dict, Mapping, Optional, Sequence
+from .flows import FLOWS, Flow
+
+FORM_SUFFIX = ":form"
+
+_NUMBERED = re.compile(r"(\d{1,2})\s*[.)]\s*(.*)")
+# Hints such as "(optional)" copied from the template along with the label
+_HINT = re.compile(r"\(.*?\)")
+
+def form_session_name(flow: Flow) -> str:
+    return flow.name + FORM_SUFFIX
+
+def form_flow(session_flow: str) -> Optional[Flow]:
+    """The flow a form session fills in, or None for a step-by-step session."""
+    if not session_flow.endswith(FORM_SUFFIX):
+        return None
+    return FLOWS.get(session_flow[:-len(FORM_SUFFIX)])
+
+def _label(field: str) -> str:
+    return field.replace("_", " ").capitalize()
+
+def _key(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", _HINT.sub("", text).lower()).strip("_")
+
+def _lines(flow: Flow, fields: Optional[Sequence[str]] = None) -> str:
+    lines = []
+    for position, step in enumerate(flow.steps, 1):
+        if fields is not None and step.field not in fields:
+            continue
+        hint = ""
+        if step.ask_if is not None:
+            depends_on, accepted = step.ask_if
+            hint = f" (only if {_label(flow.steps[depends_on].field).lower()} is {'/'.join(sorted(accepted))})"
+        elif step.optional:
+            hint = " (optional)"
+        lines.append(f"{position}. {_label(step.field)}{hint}: ")
+    return "\n".join(lines)
+
+def form_template(flow: Flow) -> str:
+    """The first message of a form session: every question of flow."""
+    intro = (
+        "Copy this message, write your answers after the colons and send it back in one message. "
+        "Numbered answers like \"3. Male\" work too; optional fields can be left empty."
+    )
+    header = f"{flow.welcome}\n{intro}" if flow.welcome else intro
+    return f"{header}\n\n{_lines(flow)}"
+
+def form_corrections(flow: Flow, errors: Mapping[str, str]) -> str:
+    """Ask again for the answers that are missing or invalid."""
+    if len(errors) == 1:
+        field, error = next(iter(errors.items()))
+        prompt = flow.steps[flow.index[field]].prompt
+        return prompt if error.startswith("Missing") else f"{error}\n{prompt}"
+    problems = "\n".join(f"- {_label(field)}: {error}" for field, error in errors.items())
+    return (
+        f"Almost done! Please send these answers again:\n{problems}\n\n"
+        f"{_lines(flow, list(errors))}"
+    )
+
+def parse_form(flow: Flow, message: str, expected: Sequence[str] = ()) -> Dict[str, str]:
+    """Raw answers by field from a filled-in form.
+
+    Lines are matched by label ("Blood group: O+"), by number ("5. O+"), or
+    both. A line without either continues the previous answer (e.g. a
+    multi-line address). When a single answer is expected, a bare reply is
+    taken as that answer.
+    """
+    fields = {_key(_label(field)): field for field in flow.fields}
+    fields.update({field: field for field in flow.fields})
+    lines = [line.strip() for line in message.splitlines() if line.strip()]
+    if len(expected) == 1 and len(lines) == 1 and ":" not in lines[0] and not _NUMBERED.fullmatch(lines[0]):
+        return {expected[0]: lines[0]}
+
+    answers: Dict[str, str] = {}
+    last = None
+    for line in lines:
+        by_number = None
+        numbered = _NUMBERED.fullmatch(line)
+        if numbered and 1 <= int(numbered.group(1)) <= len(flow.steps):
+            by_number = flow.steps[int(numbered.group(1)) - 1].field
+            line = numbered.group(2)
+        label, colon, value = line.partition(":")
+        field = fields.get(_key(label)) if colon else None
+        if field is None and by_number is not None:
+            # No known label: the number says which answer this is
+            field, value = by_number, line
+        if field is None:
+            if not colon and last is not None:
+                answers[last] = f"{answers[last]}, {line}" if answers.get(last) else line
+            continue
+        value = value.strip()
+        if value:
+            answers[field] = value
+        last = field
+    return answers
@@ -0,0 +1,136 @@
+# Author: SANJAY KR
+"""Daily birthday and anniversary greetings.
+
+Celebrants are found through the indexed birth_mmdd / anniversary_mmdd
+columns, so a day's run reads only that day's members however large the
+member table is. Each greeting is recorded in the greeting table and
+claimed by one run before it is sent: rerunning the job for the same day,
+even while another run is still going, only retries greetings that failed
+and never resends one that went out. A greeting claimed by a run that then
+crashed is not sent again either, since it may already have gone out.
+"""
+import calendar
+import uuid
+from datetime import date
+from typing import Dict, List, Optional
+from flask import current_app
+from sqlalchemy import select, update
+from .. import db
+from ..models.base import insert_ignoring_duplicates
+from ..models.family import Samaj, Member
+from ..models.greeting import Greeting
+from ..utils.dates import month_day
+from .broadcast import get_broadcast_runner, normalize_number
+
+# kind -> (month-day column, config key of the message template)
+KINDS = {
+    "birthday": (Member.birth_mmdd, "GREETING_BIRTHDAY_MESSAGE"),
+    "anniversary": (Member.anniversary_mmdd, "GREETING_ANNIVERSARY_MESSAGE")
+}
+
+def celebrated_on(day: date) -> List[int]:
+    """Month-days celebrated on day; 29 February is marked on the 28th in other years."""
+    days = [month_day(day)]
+    if day.month == 2 and day.day == 28 and not calendar.isleap(day.year):
+        days.append(229)
+    return days
+
+def check_template(template: str, key: str) -> str:
+    """Return template, or raise ValueError if it uses more than {name} and {samaj}."""
+    try:
+        template.format(name="", samaj="")
+    except (KeyError, IndexError, ValueError) as e:
+        raise ValueError(
+            f"{key} may only use {{name}} and {{samaj}}; write {{{{ and }}}} for literal braces ({e!r})"
+        ) from None
+    return template
+
+def _claim(member_ids: List[int], kind: str, day: date, run: str) -> List[int]:
+    """Record greetings for the members and claim the unsent ones for run; returns those claimed."""
+    if not member_ids:
+        return []
+    rows = [{"member_id": member_id, "kind": kind, "day": day} for member_id in member_ids]
+    insert_ignoring_duplicates(db.session, Greeting, rows, ["member_id", "kind", "day"])
+    # A single UPDATE, so of two overlapping runs only one gets each row
+    db.session.execute(
+        update(Greeting)
+        .where(
+            Greeting.member_id.in_(member_ids),
+            Greeting.kind == kind,
+            Greeting.day == day,
+            Greeting.status.in_(("pending", "failed"))
+        )
+        .values(status="sending", owner=run)
+    )
+    return list(db.session.execute(
+        select(Greeting.member_id).where(
+            Greeting.member_id.in_(member_ids),
+            Greeting.kind == kind,
+            Greeting.day == day,
+            Greeting.status == "sending",
+            Greeting.owner == run
+        )
+    ).scalars())
+
+def send_greetings(day: Optional[date] = None, batch_size: int = 500) -> Dict[str, Dict[str, int]]:
+    """Greet everyone with a birthday or anniversary on day (default today).
+
+    Returns sent/failed/skipped counts per kind; skipped members have no
+    valid number (numbers without a country code count as invalid unless
+    DEFAULT_COUNTRY_CODE is set) or were already claimed by another run.
+    """
+    day = day or date.today()
+    runner = get_broadcast_runner()
+    if runner is None:
+        raise RuntimeError("Broadcasts are not initialised")
+    # Before anything is claimed, so a bad template cannot strand claimed greetings
+    templates = {kind: check_template(current_app.config[key], key) for kind, (_, key) in KINDS.items()}
+    run = uuid.uuid4().hex
+    results = {}
+    for kind, (column, _) in KINDS.items():
+        template = templates[kind]
+        counts = results[kind] = {"sent": 0, "failed": 0, "skipped": 0}
+        after = 0
+        while True:
+            rows = db.session.execute(
+                select(Member.id, Member.name, Member.mobile_1, Samaj.name)
+                .join(Samaj, Samaj.id == Member.samaj_id)
+                .where(column.in_(celebrated_on(day)), Member.id > after)
+                .order_by(Member.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            after = rows[-1][0]
+            numbers = {
+                member_id: normalize_number(mobile, runner.default_country_code)
+                for member_id, _, mobile, _ in rows
+            }
+            pending = set(_claim([member_id for member_id, number in numbers.items() if number], kind, day, run))
+            # Commit the claims before sending, so a crash never loses track of a sent greeting
+            db.session.commit()
+
+            messages = [
+                (member_id, numbers[member_id], template.format(name=name, samaj=samaj))
+                for member_id, name, _, samaj in rows if member_id in pending
+            ]
+            sent_ok = runner.send_all([(phone, message) for _, phone, message in messages])
+            sent = [member_id for (member_id, _, _), ok in zip(messages, sent_ok) if ok]
+            failed = [member_id for (member_id, _, _), ok in zip(messages, sent_ok) if not ok]
+            for status, member_ids in (("sent", sent), ("failed", failed)):
+                if member_ids:
+                    db.session.execute(
+                        update(Greeting)
+                        .where(Greeting.member_id.in_(member_ids), Greeting.kind == kind, Greeting.day == day,
+                               Greeting.owner == run)
+                        .values(status=status)
+                    )
+            db.session.commit()
+            counts["sent"] += len(sent)
+            counts["failed"] += len(failed)
+            counts["skipped"] += len(rows) - len(messages)
+        current_app.logger.info(
+            f"{kind.capitalize()} greetings for {day}: {counts['sent']} sent, "
+            f"{counts['failed']} failed, {counts['skipped']} skipped"
+        )
+    return results
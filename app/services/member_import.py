@@ -0,0 +1,208 @@
+# Author: SANJAY KR
+"""Bulk member import from CSV or NDJSON files.
+
+The upload is read as a stream and cut into chunks that are validated, with
+the same flow rules as WhatsApp answers and against the sizes of the member columns, in
+a pool of worker processes. Valid rows are inserted batch_size at a time,
+one committed multi-row insert per batch, so memory use does not grow with
+the size of the file. A batch the database rejects is inserted again row by
+row and the failing rows are reported. Only a bounded number of chunks is in
+flight at once, and the error report is capped.
+"""
+import csv
+import io
+import json
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import Any, Dict, IO, Iterator, List, Optional, Tuple
+from flask import current_app, has_app_context
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from .flows import FLOWS, Flow
+from .write_behind import database_unavailable, insert_members, member_errors
+
+FORMATS = ("csv", "ndjson")
+
+# (line number, record, or None with the reason the line could not be read)
+Line = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+# (line number, values to insert or None, errors by field)
+Checked = Tuple[int, Optional[Dict[str, Any]], Dict[str, str]]
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> str:
+    name = (filename or "").lower()
+    kind = (content_type or "").split(";")[0].strip().lower()
+    if name.endswith((".ndjson", ".jsonl")) or kind in ("application/x-ndjson", "application/jsonl"):
+        return "ndjson"
+    return "csv"
+
+def _column(name: Optional[str]) -> str:
+    """Spreadsheet header to field name, e.g. "Blood Group" -> blood_group."""
+    return (name or "").strip().lower().replace(" ", "_").replace("-", "_")
+
+def read_lines(stream: IO[bytes], fmt: str) -> Iterator[Line]:
+    """Records of a CSV (with a header row) or NDJSON byte stream, one at a time."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}', expected csv or ndjson")
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", errors="replace", newline="")
+    if fmt == "ndjson":
+        for number, line in enumerate(text, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield number, None, "Invalid JSON"
+                continue
+            if isinstance(record, dict):
+                yield number, {_column(key): value for key, value in record.items()}, None
+            else:
+                yield number, None, "Expected a JSON object"
+        return
+    reader = csv.reader(text)
+    try:
+        columns = [_column(name) for name in next(reader, [])]
+        for row in reader:
+            if any(value.strip() for value in row):
+                yield reader.line_num, dict(zip(columns, row)), None
+    except csv.Error as e:
+        # The rest of the file cannot be split into rows reliably
+        yield reader.line_num, None, f"Malformed CSV: {str(e)}"
+
+def validate_record(flow: Flow, record: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Dict[str, str]]:
+    """Check a record as if its values were sent as answers to flow.
+
+    Returns (values, {}) or (None, errors by field). Fields of steps the
+    flow would not ask (e.g. anniversary date of an unmarried member) are
+    dropped, as in a WhatsApp registration. Values that would not fit their
+    member column are errors too, rather than failing a whole batch.
+    """
+    values, errors = flow.parse_all(record)
+    for field, error in member_errors(values).items():
+        errors.setdefault(field, error)
+    return (None, errors) if errors else (values, {})
+
+def validate_chunk(flow_name: str, lines: List[Line]) -> List[Checked]:
+    """Validate a chunk of lines; runs in a worker process."""
+    flow = FLOWS[flow_name]
+    checked = []
+    for number, record, problem in lines:
+        if record is None:
+            checked.append((number, None, {"line": problem}))
+        else:
+            values, errors = validate_record(flow, record)
+            checked.append((number, values, errors))
+    return checked
+
+class _Inline(Executor):
+    """Validates chunks in the calling thread when no pool is configured."""
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+def _chunks(lines: Iterator[Line], size: int, default_samaj: Optional[str]) -> Iterator[List[Line]]:
+    chunk = []
+    for number, record, problem in lines:
+        if record is not None and default_samaj and not str(record.get("samaj") or "").strip():
+            record["samaj"] = default_samaj
+        chunk.append((number, record, problem))
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def import_members(session: Session, lines: Iterator[Line], flow_name: str = "registration",
+                   default_samaj: Optional[str] = None, pool: Optional[Executor] = None,
+                   chunk_size: int = 1000, batch_size: int = 5000, max_errors: int = 1000,
+                   queued_chunks: int = 8) -> Dict[str, Any]:
+    """Validate and insert lines; returns counts and the rejected lines.
+
+    Each batch of valid rows is committed on its own, so rows before a
+    failure are kept. A batch the database rejects is retried one row at a
+    time and the rows that still fail are reported; if the database is
+    unavailable the import stops. Samaj names are resolved and created as
+    for registrations.
+    """
+    pool = pool or _Inline()
+    report = {"inserted": 0, "rejected": 0, "errors": [], "errors_truncated": False}
+    pending: deque = deque()
+    # (line number, values) of rows waiting to be inserted
+    batch: List[Tuple[int, Dict[str, Any]]] = []
+
+    def reject(number: int, errors: Dict[str, str]) -> None:
+        report["rejected"] += 1
+        if len(report["errors"]) < max_errors:
+            report["errors"].append({"line": number, "errors": errors})
+        else:
+            report["errors_truncated"] = True
+
+    def collect(future: Future) -> None:
+        for number, values, errors in future.result():
+            if values is not None:
+                batch.append((number, values))
+            else:
+                reject(number, errors)
+        if len(batch) >= batch_size:
+            flush()
+
+    def insert(rows: List[Dict[str, Any]]) -> Optional[Exception]:
+        """Insert and commit rows; returns the error if the database rejected them."""
+        try:
+            insert_members(session, rows)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            if database_unavailable(e):
+                raise
+            return e
+        report["inserted"] += len(rows)
+        return None
+
+    def flush() -> None:
+        if batch and insert([values for _, values in batch]) is not None:
+            for number, values in batch:
+                error = insert([values])
+                if error is not None:
+                    reason = error.orig if isinstance(error, DBAPIError) else error
+                    reject(number, {"row": str(reason)[:200]})
+        batch.clear()
+
+    try:
+        for chunk in _chunks(lines, chunk_size, default_samaj):
+            pending.append(pool.submit(validate_chunk, flow_name, chunk))
+            # Keep the workers busy without reading the whole file ahead
+            if len(pending) >= queued_chunks:
+                collect(pending.popleft())
+        while pending:
+            collect(pending.popleft())
+        flush()
+    except Exception:
+        session.rollback()
+        for future in pending:
+            future.cancel()
+        raise
+    return report
+
+_pool_lock = threading.Lock()
+
+def get_import_pool() -> Optional[Executor]:
+    """The app's validation process pool, started on first use; None validates inline."""
+    if not has_app_context():
+        return None
+    workers = current_app.config.get("IMPORT_WORKERS", 4)
+    if workers <= 0:
+        return None
+    with _pool_lock:
+        pool = current_app.extensions.get("import_pool")
+        if pool is None:
+            # spawn rather than fork: forking a threaded server can copy held locks
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            current_app.extensions["import_pool"] = pool
+        return pool
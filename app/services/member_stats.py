@@ -0,0 +1,152 @@
+# Author: SANJAY KR
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+from sqlalchemy import delete, event, insert, inspect, select, update
+from sqlalchemy.engine import Connection
+from ..models.base import dialect_insert
+from ..models.family import Samaj, Member
+from ..models.stats import SamajStat
+
+UNKNOWN = "Unknown"
+
+def _label(value: Optional[str]) -> str:
+    value = (value or "").strip()
+    return value.title() if value else UNKNOWN
+
+def _age_bucket(age: Optional[int]) -> str:
+    if age is None:
+        return UNKNOWN
+    low = age // 10 * 10
+    return f"{low}-{low + 9}"
+
+# dimension -> (member column it is derived from, bucket function)
+DIMENSIONS: Mapping[str, Tuple[str, Callable[[Any], str]]] = {
+    "total": ("id", lambda value: ""),
+    "gender": ("gender", _label),
+    "blood_group": ("blood_group", lambda value: (value or "").strip().upper() or UNKNOWN),
+    "age": ("age", _age_bucket),
+    "city": ("current_city", _label),
+    "diet": ("dietary_preferences", _label)
+}
+
+STAT_COLUMNS = tuple(dict.fromkeys(["samaj_id"] + [column for column, _ in DIMENSIONS.values()]))
+
+Key = Tuple[int, str, str]
+
+def member_buckets(values: Mapping[str, Any]) -> List[Key]:
+    """Every (samaj_id, dimension, bucket) a member counts towards."""
+    return [
+        (values["samaj_id"], dimension, bucket(values.get(column)))
+        for dimension, (column, bucket) in DIMENSIONS.items()
+    ]
+
+def _upsert(connection: Connection):
+    statement = dialect_insert(connection, SamajStat)
+    if statement is None:
+        return None
+    return statement.on_conflict_do_update(
+        index_elements=["samaj_id", "dimension", "bucket"],
+        set_={"count": SamajStat.count + statement.excluded["count"]}
+    )
+
+def apply_deltas(connection: Connection, deltas: Mapping[Key, int]) -> None:
+    rows = [
+        {"samaj_id": samaj_id, "dimension": dimension, "bucket": bucket, "count": delta}
+        for (samaj_id, dimension, bucket), delta in sorted(deltas.items()) if delta
+    ]
+    if not rows:
+        return
+    statement = _upsert(connection)
+    if statement is not None:
+        connection.execute(statement, rows)
+        return
+    for row in rows:
+        result = connection.execute(
+            update(SamajStat)
+            .where(SamajStat.samaj_id == row["samaj_id"], SamajStat.dimension == row["dimension"],
+                   SamajStat.bucket == row["bucket"])
+            .values(count=SamajStat.count + row["count"])
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(SamajStat), row)
+
+def record_members(connection: Connection, rows: Iterable[Mapping[str, Any]], sign: int = 1) -> None:
+    """Count (sign=1) or uncount (sign=-1) members, e.g. after a bulk insert."""
+    deltas: Counter = Counter()
+    for values in rows:
+        for key in member_buckets(values):
+            deltas[key] += sign
+    apply_deltas(connection, deltas)
+
+def _current(target: Member) -> Dict[str, Any]:
+    return {column: getattr(target, column) for column in STAT_COLUMNS}
+
+def _previous(target: Member) -> Dict[str, Any]:
+    state = inspect(target)
+    values = {}
+    for column in STAT_COLUMNS:
+        history = state.attrs[column].history
+        values[column] = history.deleted[0] if history.deleted else getattr(target, column)
+    return values
+
+def _keep_previous(target, value, oldvalue, initiator):
+    return value
+
+# active_history loads the old value of an expired attribute before it is
+# overwritten, so after_update always knows which buckets to decrement
+for _column in STAT_COLUMNS:
+    event.listen(getattr(Member, _column), "set", _keep_previous, active_history=True, retval=True)
+
+# ORM writes keep the summaries current in the same transaction. Bulk
+# inserts bypass mapper events, so those call record_members() themselves.
+@event.listens_for(Member, "after_insert")
+def _count_inserted(mapper, connection, target):
+    record_members(connection, [_current(target)])
+
+@event.listens_for(Member, "after_update")
+def _count_updated(mapper, connection, target):
+    deltas: Counter = Counter()
+    for key in member_buckets(_previous(target)):
+        deltas[key] -= 1
+    for key in member_buckets(_current(target)):
+        deltas[key] += 1
+    apply_deltas(connection, deltas)
+
+@event.listens_for(Member, "after_delete")
+def _count_deleted(mapper, connection, target):
+    record_members(connection, [_current(target)], -1)
+
+def rebuild_stats(connection: Connection, chunk_size: int = 1000) -> int:
+    """Recompute every summary from the member table; returns the members counted."""
+    deltas: Counter = Counter()
+    members = 0
+    result = connection.execution_options(yield_per=chunk_size).execute(
+        select(*[Member.__table__.columns[column] for column in STAT_COLUMNS])
+    )
+    for partition in result.mappings().partitions():
+        for values in partition:
+            members += 1
+            for key in member_buckets(values):
+                deltas[key] += 1
+    connection.execute(delete(SamajStat))
+    apply_deltas(connection, deltas)
+    return members
+
+def get_samaj_stats(connection: Connection, samaj_name: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """Read the summaries as {samaj: {"members": n, dimension: {bucket: count}}}."""
+    query = (
+        select(Samaj.name, SamajStat.dimension, SamajStat.bucket, SamajStat.count)
+        .join(Samaj, Samaj.id == SamajStat.samaj_id)
+        .where(SamajStat.count > 0)
+        .order_by(Samaj.name, SamajStat.dimension, SamajStat.bucket)
+    )
+    if samaj_name:
+        query = query.where(Samaj.name == samaj_name)
+    stats: Dict[str, Dict[str, Any]] = {}
+    for name, dimension, bucket, count in connection.execute(query):
+        samaj = stats.setdefault(name, {"members": 0})
+        if dimension == "total":
+            samaj["members"] = count
+        else:
+            samaj.setdefault(dimension, {})[bucket] = count
+    return stats
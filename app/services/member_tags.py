@@ -0,0 +1,141 @@
+# Author: SANJAY KR
+from typing import Any, Dict, Iterable, Mapping, Optional, Set, Tuple
+from sqlalchemy import and_, delete, event, func, insert, intersect, inspect, or_, select
+from sqlalchemy.engine import Connection
+from ..models.base import insert_ignoring_duplicates
+from ..models.family import Member
+from ..models.tags import Tag, MemberTag
+
+# facet name -> comma-separated Member column it is parsed from
+FACETS: Mapping[str, str] = {
+    "languages": "languages_known",
+    "skills": "skills",
+    "hobbies": "hobbies",
+    "volunteer": "volunteer_interests"
+}
+
+def split_tags(value: Optional[str]) -> Set[str]:
+    """"gujarati, Hindi ,," -> {"Gujarati", "Hindi"}"""
+    if not value:
+        return set()
+    return {tag.strip().title()[:100] for tag in value.split(",") if tag.strip()}
+
+def member_tags(values: Mapping[str, Any]) -> Set[Tuple[str, str]]:
+    return {(facet, name) for facet, column in FACETS.items() for name in split_tags(values.get(column))}
+
+def _tag_condition(tags: Iterable[Tuple[str, str]]):
+    return or_(*[and_(Tag.facet == facet, Tag.name == name) for facet, name in tags])
+
+def tag_ids(connection: Connection, tags: Set[Tuple[str, str]]) -> Dict[Tuple[str, str], int]:
+    """Insert-or-get the ids of tags."""
+    if not tags:
+        return {}
+    query = select(Tag.facet, Tag.name, Tag.id).where(_tag_condition(tags))
+    ids = {(facet, name): tag_id for facet, name, tag_id in connection.execute(query)}
+    missing = sorted(tags - ids.keys())
+    if missing:
+        rows = [{"facet": facet, "name": name} for facet, name in missing]
+        insert_ignoring_duplicates(connection, Tag, rows, ["facet", "name"])
+        ids.update({(facet, name): tag_id for facet, name, tag_id in connection.execute(query)})
+    return ids
+
+def tag_members(connection: Connection, rows: Iterable[Mapping[str, Any]]) -> int:
+    """Index the tags of members (rows need id plus the facet columns);
+    returns the number of member-tag links written."""
+    wanted = [(values["id"], member_tags(values)) for values in rows]
+    ids = tag_ids(connection, set().union(*[tags for _, tags in wanted]) if wanted else set())
+    links = [{"tag_id": ids[tag], "member_id": member_id} for member_id, tags in wanted for tag in sorted(tags)]
+    if links:
+        connection.execute(insert(MemberTag), links)
+    return len(links)
+
+def _facet_values(target: Member) -> Dict[str, Any]:
+    values = {column: getattr(target, column) for column in FACETS.values()}
+    values["id"] = target.id
+    return values
+
+# Mapper events index members written through the ORM; bulk inserts call
+# tag_members() themselves.
+@event.listens_for(Member, "after_insert")
+def _tag_inserted(mapper, connection, target):
+    tag_members(connection, [_facet_values(target)])
+
+@event.listens_for(Member, "after_update")
+def _retag_updated(mapper, connection, target):
+    state = inspect(target)
+    if not any(state.attrs[column].history.has_changes() for column in FACETS.values()):
+        return
+    connection.execute(delete(MemberTag).where(MemberTag.member_id == target.id))
+    tag_members(connection, [_facet_values(target)])
+
+@event.listens_for(Member, "after_delete")
+def _untag_deleted(mapper, connection, target):
+    # The foreign key cascades too, but SQLite only enforces it when asked
+    connection.execute(delete(MemberTag).where(MemberTag.member_id == target.id))
+
+def backfill_tags(connection: Connection, chunk_size: int = 1000) -> int:
+    """Rebuild the tag index from the member table; returns the links written."""
+    connection.execute(delete(MemberTag))
+    columns = [Member.id] + [Member.__table__.columns[column] for column in FACETS.values()]
+    result = connection.execution_options(yield_per=chunk_size).execute(select(*columns))
+    links = 0
+    for partition in result.mappings().partitions():
+        links += tag_members(connection, partition)
+    return links
+
+def parse_filters(args: Mapping[str, str]) -> Dict[str, Set[str]]:
+    """{facet: tag names} from query arguments like languages=Gujarati,Hindi."""
+    return {facet: split_tags(args[facet]) for facet in FACETS if args.get(facet)}
+
+def search_members(connection: Connection, filters: Mapping[str, Set[str]], match: str = "any",
+                   limit: int = 50, after: Optional[int] = None) -> Dict[str, Any]:
+    """Members matching every filtered facet, with tag counts over the matches.
+
+    Within a facet, match="any" accepts members with at least one of the
+    names and match="all" requires all of them.
+    """
+    if match not in ("any", "all"):
+        raise ValueError("match must be 'any' or 'all'")
+    wanted = {(facet, name) for facet, names in filters.items() for name in names}
+    known = {}
+    if wanted:
+        known = {
+            (facet, name): tag_id for facet, name, tag_id in
+            connection.execute(select(Tag.facet, Tag.name, Tag.id).where(_tag_condition(wanted)))
+        }
+    per_facet = []
+    for facet, names in filters.items():
+        ids = [known[(facet, name)] for name in names if (facet, name) in known]
+        if not ids or (match == "all" and len(ids) < len(names)):
+            # A tag nobody has: nothing can match
+            return {"total": 0, "members": [], "facets": {}, "next_cursor": None}
+        query = select(MemberTag.member_id).where(MemberTag.tag_id.in_(ids))
+        if match == "all":
+            query = query.group_by(MemberTag.member_id).having(func.count() == len(ids))
+        per_facet.append(query)
+
+    matched = None
+    if per_facet:
+        matched = (per_facet[0] if len(per_facet) == 1 else intersect(*per_facet)).subquery()
+
+    counts = select(Tag.facet, Tag.name, func.count()).join(MemberTag, MemberTag.tag_id == Tag.id)
+    total = select(func.count()).select_from(Member)
+    page = select(Member.id, Member.name).order_by(Member.id)
+    if matched is not None:
+        member_ids = select(matched.c.member_id)
+        counts = counts.where(MemberTag.member_id.in_(member_ids))
+        total = select(func.count()).select_from(matched)
+        page = page.where(Member.id.in_(member_ids))
+    if after is not None:
+        page = page.where(Member.id > after)
+
+    facets: Dict[str, Dict[str, int]] = {facet: {} for facet in FACETS}
+    for facet, name, count in connection.execute(counts.group_by(Tag.id, Tag.facet, Tag.name)):
+        facets[facet][name] = count
+    members = [dict(row) for row in connection.execute(page.limit(limit + 1)).mappings()]
+    return {
+        "total": connection.execute(total).scalar(),
+        "members": members[:limit],
+        "facets": facets,
+        "next_cursor": members[limit - 1]["id"] if len(members) > limit else None
+    }
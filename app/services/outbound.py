@@ -0,0 +1,229 @@
+# Author: SANJAY KR
+import heapq
+import itertools
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+from ..utils.process import hold_instance_lock, instance_id, owned_by_dead_process
+
+class OutboundQueue:
+    """Background sender for outbound messages.
+
+    Messages are written to the spool directory before they are queued, so
+    anything still pending survives a restart and is picked up again by
+    recover(). A fixed pool of worker threads calls send(to, body), which
+    returns True when delivered, False when the message can never be
+    delivered, and raises on transient failures; those are retried with
+    exponential backoff up to max_retries times.
+    """
+
+    def __init__(self, send: Callable[[str, str], bool], app=None, workers: int = 4,
+                 max_retries: int = 5, backoff: float = 1.0, backoff_max: float = 60.0,
+                 spool_dir: Optional[str] = None, maxsize: int = 10000):
+        self.send = send
+        self.app = app
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.spool_dir = spool_dir
+        self.maxsize = maxsize
+        # Heap of (due time, sequence, message) so retries wait their turn
+        self._heap: List[Any] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+        self._active = 0
+        # Messages let in by enqueue() whose spool file is still being written
+        self._reserved = 0
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self._lock_dir = os.path.join(spool_dir, "locks") if spool_dir else None
+        if spool_dir:
+            os.makedirs(os.path.join(spool_dir, "failed"), exist_ok=True)
+            # Held until this process exits; recover() only takes files of
+            # instances whose lock is free
+            hold_instance_lock(self._lock_dir)
+
+    def _log(self, level: str, message: str) -> None:
+        if self.app is not None:
+            getattr(self.app.logger, level)(message)
+
+    def _spool_path(self, name: str) -> str:
+        return os.path.join(self.spool_dir, name)
+
+    def _write_spool(self, message: Dict[str, Any]) -> None:
+        if not self.spool_dir:
+            return
+        path = self._spool_path(message["id"])
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(message, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _remove_spool(self, message: Dict[str, Any], failed: bool = False) -> None:
+        if not self.spool_dir:
+            return
+        path = self._spool_path(message["id"])
+        try:
+            if failed:
+                os.replace(path, os.path.join(self.spool_dir, "failed", message["id"]))
+            else:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _push(self, message: Dict[str, Any], due: float) -> None:
+        heapq.heappush(self._heap, (due, next(self._seq), message))
+        self._cond.notify()
+
+    def enqueue(self, to: str, body: str) -> bool:
+        """Queue a message; returns False if the queue is full."""
+        message = {
+            # Spool files are named after the owning process start so that
+            # recover() never steals messages from a live worker.
+            "id": f"{instance_id()}-{uuid.uuid4().hex}.json",
+            "to": to,
+            "body": body,
+            "attempts": 0
+        }
+        with self._cond:
+            if len(self._heap) + self._active + self._reserved >= self.maxsize:
+                return False
+            self._reserved += 1
+        # The fsync happens outside the lock so webhook threads and the
+        # workers do not wait on each other's disk flushes
+        try:
+            self._write_spool(message)
+        except Exception:
+            with self._cond:
+                self._reserved -= 1
+                self._cond.notify_all()
+            raise
+        with self._cond:
+            self._reserved -= 1
+            self._push(message, time.monotonic())
+        return True
+
+    def recover(self) -> int:
+        """Re-queue spooled messages left behind by processes that have exited."""
+        if not self.spool_dir:
+            return 0
+        recovered = 0
+        for name in sorted(os.listdir(self.spool_dir)):
+            if not name.endswith(".json") or not owned_by_dead_process(self._lock_dir, name):
+                continue
+            claimed = f"{instance_id()}-{uuid.uuid4().hex}.json"
+            try:
+                # Atomic claim; loses cleanly if another worker renamed it first
+                os.rename(self._spool_path(name), self._spool_path(claimed))
+                with open(self._spool_path(claimed)) as f:
+                    message = json.load(f)
+            except (FileNotFoundError, ValueError):
+                continue
+            message["id"] = claimed
+            with self._cond:
+                self._push(message, time.monotonic())
+            recovered += 1
+        if recovered:
+            self._log("info", f"Recovered {recovered} spooled outbound messages")
+        return recovered
+
+    def start(self) -> "OutboundQueue":
+        with self._cond:
+            self._stopping = False
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"outbound-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the workers once everything that is due has been sent.
+
+        Messages still waiting for a retry stay in the spool.
+        """
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the queue is empty; returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._heap or self._active or self._reserved:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._heap) + self._active + self._reserved
+
+    def _next(self) -> Optional[Dict[str, Any]]:
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if self._heap and self._heap[0][0] <= now:
+                    self._active += 1
+                    return heapq.heappop(self._heap)[2]
+                if self._stopping:
+                    return None
+                self._cond.wait(self._heap[0][0] - now if self._heap else None)
+
+    def _run(self) -> None:
+        if self.app is not None:
+            with self.app.app_context():
+                self._work()
+        else:
+            self._work()
+
+    def _work(self) -> None:
+        while True:
+            message = self._next()
+            if message is None:
+                return
+            try:
+                self._deliver(message)
+            finally:
+                with self._cond:
+                    self._active -= 1
+                    self._cond.notify_all()
+
+    def _deliver(self, message: Dict[str, Any]) -> None:
+        try:
+            delivered = self.send(message["to"], message["body"])
+        except Exception as e:
+            message["attempts"] += 1
+            if message["attempts"] > self.max_retries:
+                self._log("error", f"Giving up on message to {message['to']} after {message['attempts']} attempts: {str(e)}")
+                self.failed += 1
+                self._remove_spool(message, failed=True)
+                return
+            delay = min(self.backoff_max, self.backoff * 2 ** (message["attempts"] - 1))
+            delay *= 0.5 + random.random() / 2
+            self._log("warning", f"Send to {message['to']} failed ({str(e)}), retrying in {delay:.1f}s")
+            self.retried += 1
+            self._write_spool(message)
+            with self._cond:
+                self._push(message, time.monotonic() + delay)
+            return
+        if delivered:
+            self.sent += 1
+            self._remove_spool(message)
+        else:
+            self.failed += 1
+            self._remove_spool(message, failed=True)
@@ -0,0 +1,216 @@
+# Author: SANJAY KR
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from ..models.family import Samaj, Member
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    mimetype: str
+    etag: str
+    # Extra response headers worth replaying, e.g. X-Next-Cursor
+    headers: Tuple[Tuple[str, str], ...]
+
+class ResponseCache:
+    """Rendered admin responses keyed by data version, route and query.
+
+    Writes to members or samaj bump the data version, which changes every
+    key at once, so stale entries are never served and simply age out.
+    Entries larger than max_entry_bytes are not cached.
+    """
+
+    def __init__(self, max_entry_bytes: int = 2 * 1024 * 1024):
+        self.max_entry_bytes = max_entry_bytes
+
+    def version(self) -> int:
+        raise NotImplementedError
+
+    def bump(self) -> int:
+        raise NotImplementedError
+
+    def bumped_at(self) -> float:
+        """Wall-clock time of the last bump, or 0 if there was none."""
+        raise NotImplementedError
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        raise NotImplementedError
+
+    def set(self, key: str, entry: CachedResponse) -> None:
+        raise NotImplementedError
+
+class MemoryResponseCache(ResponseCache):
+    """Per-process LRU bounded by entry count and total body size.
+
+    Entries expire after ttl seconds, as in the Redis backend. The data
+    version is per process too, so only use it with one worker (or with
+    writes confined to the same process).
+    """
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 64 * 1024 * 1024,
+                 max_entry_bytes: int = 2 * 1024 * 1024, ttl: float = 300, clock=time.monotonic):
+        super().__init__(max_entry_bytes)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        # key -> (expiry time on clock, entry)
+        self._entries: "OrderedDict[str, Tuple[float, CachedResponse]]" = OrderedDict()
+        self._bytes = 0
+        self._version = 0
+        self._bumped_at = 0.0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def version(self) -> int:
+        return self._version
+
+    def bump(self) -> int:
+        with self._lock:
+            self._version += 1
+            self._bumped_at = time.time()
+            # Every key embeds the old version, so nothing cached is reachable
+            self._entries.clear()
+            self._bytes = 0
+            return self._version
+
+    def bumped_at(self) -> float:
+        return self._bumped_at
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            expires, entry = self._entries.get(key, (0.0, None))
+            if entry is not None and expires <= self.clock():
+                self._entries.pop(key)
+                self._bytes -= len(entry.body)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key: str, entry: CachedResponse) -> None:
+        if len(entry.body) > self.max_entry_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[1].body)
+            self._entries[key] = (self.clock() + self.ttl, entry)
+            self._bytes += len(entry.body)
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.body)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class RedisResponseCache(ResponseCache):
+    """Cache and data version shared by every worker through Redis.
+
+    Entries expire after ttl seconds; Redis' own maxmemory policy bounds
+    the total size.
+    """
+
+    def __init__(self, url: Optional[str] = None, client=None, prefix: str = "wa:http:",
+                 ttl: float = 300, max_entry_bytes: int = 2 * 1024 * 1024):
+        super().__init__(max_entry_bytes)
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url or "redis://localhost:6379/0")
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def version(self) -> int:
+        return int(self.client.get(self.prefix + "version") or 0)
+
+    def bump(self) -> int:
+        pipe = self.client.pipeline()
+        pipe.incr(self.prefix + "version")
+        pipe.set(self.prefix + "bumped_at", time.time())
+        return pipe.execute()[0]
+
+    def bumped_at(self) -> float:
+        return float(self.client.get(self.prefix + "bumped_at") or 0)
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        body, meta = self.client.hmget(self.prefix + key, "body", "meta")
+        if body is None or meta is None:
+            return None
+        mimetype, etag, headers = json.loads(meta)
+        return CachedResponse(body, mimetype, etag, tuple(tuple(header) for header in headers))
+
+    def set(self, key: str, entry: CachedResponse) -> None:
+        if len(entry.body) > self.max_entry_bytes:
+            return
+        meta = json.dumps([entry.mimetype, entry.etag, entry.headers])
+        pipe = self.client.pipeline()
+        pipe.hset(self.prefix + key, mapping={"body": entry.body, "meta": meta})
+        pipe.expire(self.prefix + key, max(1, int(self.ttl)))
+        pipe.execute()
+
+def create_response_cache(config) -> Optional[ResponseCache]:
+    backend = (config.get("RESPONSE_CACHE_BACKEND") or "memory").lower()
+    max_entry_bytes = int(config.get("RESPONSE_CACHE_MAX_ENTRY_BYTES", 2 * 1024 * 1024))
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return MemoryResponseCache(
+            max_entries=int(config.get("RESPONSE_CACHE_MAX_ENTRIES", 1000)),
+            max_bytes=int(config.get("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+            max_entry_bytes=max_entry_bytes,
+            ttl=float(config.get("RESPONSE_CACHE_TTL_SECONDS", 300))
+        )
+    if backend == "redis":
+        return RedisResponseCache(
+            url=config.get("REDIS_URL"),
+            ttl=float(config.get("RESPONSE_CACHE_TTL_SECONDS", 300)),
+            max_entry_bytes=max_entry_bytes
+        )
+    raise ValueError(f"Unknown response cache backend: {backend}")
+
+def get_response_cache() -> Optional[ResponseCache]:
+    if not has_app_context():
+        return None
+    return current_app.extensions.get("response_cache")
+
+def init_response_cache(app) -> Optional[ResponseCache]:
+    cache = create_response_cache(app.config)
+    if cache is not None:
+        app.extensions["response_cache"] = cache
+    return cache
+
+def bump_data_version() -> None:
+    """Invalidate cached responses; called after member or samaj writes commit."""
+    cache = get_response_cache()
+    if cache is not None:
+        cache.bump()
+
+# ORM writes only mark the session; the version is bumped after the
+# commit, so a response rendered from uncommitted data is never cached
+# under the new version. Bulk inserts set session.info["data_changed"] themselves.
+def _mark_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info["data_changed"] = True
+
+for _model in (Samaj, Member):
+    for _event in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event, _mark_changed)
+
+@event.listens_for(Session, "after_commit")
+def _bump_after_commit(session):
+    if session.info.pop("data_changed", False):
+        bump_data_version()
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back(session):
+    session.info.pop("data_changed", None)
@@ -0,0 +1,67 @@
+# Author: SANJAY KR
+import threading
+import time
+from typing import Dict, Optional
+
+class RevocationList:
+    """Ids of logged-out tokens, each kept until the token would have
+    expired anyway. Lookups are a single hash probe."""
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+
+    def revoke(self, token_id: str, expires_at: float) -> None:
+        raise NotImplementedError
+
+    def is_revoked(self, token_id: str) -> bool:
+        raise NotImplementedError
+
+class MemoryRevocationList(RevocationList):
+    """Per-process list; a logout is only seen by the worker that handled it."""
+
+    def __init__(self, clock=time.time):
+        super().__init__(clock)
+        self._revoked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def revoke(self, token_id: str, expires_at: float) -> None:
+        now = self.clock()
+        with self._lock:
+            self._revoked[token_id] = expires_at
+            # Amortized purge: ids of expired tokens are useless
+            if len(self._revoked) % 256 == 0:
+                self._revoked = {key: exp for key, exp in self._revoked.items() if exp > now}
+
+    def is_revoked(self, token_id: str) -> bool:
+        expires_at = self._revoked.get(token_id)
+        return expires_at is not None and expires_at > self.clock()
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+class RedisRevocationList(RevocationList):
+    """List shared by every worker; keys expire with their tokens."""
+
+    def __init__(self, url: Optional[str] = None, client=None, prefix: str = "wa:revoked:", clock=time.time):
+        super().__init__(clock)
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url or "redis://localhost:6379/0")
+        self.client = client
+        self.prefix = prefix
+
+    def revoke(self, token_id: str, expires_at: float) -> None:
+        ttl = int(expires_at - self.clock()) + 1
+        if ttl > 0:
+            self.client.set(self.prefix + token_id, 1, ex=ttl)
+
+    def is_revoked(self, token_id: str) -> bool:
+        return bool(self.client.exists(self.prefix + token_id))
+
+def create_revocation_list(config) -> RevocationList:
+    backend = (config.get("TOKEN_REVOCATION_BACKEND") or "memory").lower()
+    if backend == "memory":
+        return MemoryRevocationList()
+    if backend == "redis":
+        return RedisRevocationList(url=config.get("REDIS_URL"))
+    raise ValueError(f"Unknown token revocation backend: {backend}")
@@ -0,0 +1,66 @@
+# Author: SANJAY KR
+import threading
+from typing import Dict, Iterable
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from ..models.base import insert_ignoring_duplicates
+from ..models.family import Samaj
+
+class SamajCache:
+    """Process-wide Samaj name -> id map.
+
+    Names missing from the cache are created with an insert-or-get in their
+    own short transaction, so the ids handed out always belong to committed
+    rows and concurrent first inserts of the same name cannot collide on
+    the unique constraint.
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def warm(self, session: Session) -> int:
+        ids = dict(session.execute(select(Samaj.name, Samaj.id)).all())
+        with self._lock:
+            self._ids = ids
+        return len(ids)
+
+    def invalidate(self, name: str = None) -> None:
+        with self._lock:
+            if name is None:
+                self._ids = {}
+            else:
+                self._ids.pop(name, None)
+
+    def resolve(self, session: Session, name: str) -> int:
+        return self.resolve_many(session, [name])[name]
+
+    def resolve_many(self, session: Session, names: Iterable[str]) -> Dict[str, int]:
+        names = set(names)
+        with self._lock:
+            found = {name: self._ids[name] for name in names if name in self._ids}
+            self.hits += len(found)
+            self.misses += len(names) - len(found)
+        missing = names - found.keys()
+        if missing:
+            created = self._insert_or_get(session, missing)
+            with self._lock:
+                self._ids.update(created)
+            found.update(created)
+        return found
+
+    def _insert_or_get(self, session: Session, names: set) -> Dict[str, int]:
+        with session.get_bind().begin() as conn:
+            insert_ignoring_duplicates(conn, Samaj, [{"name": name} for name in sorted(names)], ["name"])
+            return dict(conn.execute(select(Samaj.name, Samaj.id).where(Samaj.name.in_(names))).all())
+
+samaj_cache = SamajCache()
+
+@event.listens_for(Samaj, "after_update")
+@event.listens_for(Samaj, "after_delete")
+def _invalidate_changed_samaj(mapper, connection, target):
+    # Renames and deletes (e.g. from admin tools) drop every cached name,
+    # since the old name of a renamed row is no longer known here
+    samaj_cache.invalidate()
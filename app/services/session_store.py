@@ -0,0 +1,595 @@
+# Author: SANJAY KR
+import atexit
+import fcntl
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Sequence
+
+class Session:
+    """Compact in-flight conversation: the flow name and the answers given
+    so far, in step order.
+
+    The current step is always len(answers), so no separate counter or
+    per-field dict is kept per session. (Form sessions, see forms.py, keep
+    one dict of answers per reply instead.)
+    """
+
+    __slots__ = ("flow", "answers", "touched")
+
+    def __init__(self, flow: str = "registration", answers: Optional[List[Any]] = None, touched: float = 0.0):
+        self.flow = flow
+        self.answers = answers if answers is not None else []
+        self.touched = touched
+
+    @property
+    def step(self) -> int:
+        return len(self.answers)
+
+    def as_dict(self, fields: Sequence[str]) -> Dict[str, Any]:
+        return dict(zip(fields, self.answers))
+
+    def __repr__(self):
+        return f"<Session {self.flow} step={self.step}>"
+
+class SessionStore:
+    """Backend interface for in-flight conversation sessions.
+
+    Every method is a single atomic operation so several workers can share
+    one store. Sessions idle for longer than ttl seconds expire, and once
+    more than max_entries are live the least recently used are evicted.
+    Reading a session counts as using it.
+    A ttl or max_entries of 0 disables that limit.
+    """
+
+    def __init__(self, ttl: float = 0, max_entries: int = 0, clock=time.time):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+
+    def get(self, key: str) -> Optional[Session]:
+        """Return the live session for key and refresh its last touch time."""
+        raise NotImplementedError
+
+    def start(self, key: str, flow: str = "registration") -> Session:
+        """Create (or reset) the session for key at step 0 of flow."""
+        raise NotImplementedError
+
+    def advance(self, key: str, step: int, *values: Any) -> Optional[Session]:
+        """Record values as the answers for step, step + 1, ... and move past them.
+
+        Only succeeds if the session is still at step; returns the updated
+        session, or None if it is missing or another worker advanced it first.
+        """
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, int]:
+        """Return live, evictions and expirations counters."""
+        raise NotImplementedError
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+class MemorySessionStore(SessionStore):
+    """Per-process LRU table. Only safe with a single worker."""
+
+    def __init__(self, ttl: float = 0, max_entries: int = 0, clock=time.time):
+        super().__init__(ttl, max_entries, clock)
+        # Ordered from least to most recently touched
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        # Reentrant so subclasses can extend an operation under the same lock
+        self._lock = threading.RLock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def _expired(self, session: Session, now: float) -> bool:
+        return bool(self.ttl) and now - session.touched > self.ttl
+
+    def _sweep(self, now: float) -> None:
+        # Oldest sessions sit at the front, so stop at the first live one
+        while self._sessions:
+            key, session = next(iter(self._sessions.items()))
+            if not self._expired(session, now):
+                break
+            del self._sessions[key]
+            self.expirations += 1
+        if self.max_entries:
+            while len(self._sessions) > self.max_entries:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+
+    def _touch(self, key: str, session: Session, now: float) -> Session:
+        session.touched = now
+        self._sessions[key] = session
+        self._sessions.move_to_end(key)
+        self._sweep(now)
+        return Session(session.flow, list(session.answers), now)
+
+    def get(self, key: str) -> Optional[Session]:
+        now = self.clock()
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                return None
+            if self._expired(session, now):
+                del self._sessions[key]
+                self.expirations += 1
+                return None
+            # Refresh touched along with the position, which _sweep relies on
+            return self._touch(key, session, now)
+
+    def start(self, key: str, flow: str = "registration") -> Session:
+        now = self.clock()
+        with self._lock:
+            return self._touch(key, Session(flow), now)
+
+    def advance(self, key: str, step: int, *values: Any) -> Optional[Session]:
+        now = self.clock()
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None or session.step != step or self._expired(session, now):
+                return None
+            session.answers.extend(values)
+            return self._touch(key, session, now)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._sessions.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            self._sweep(self.clock())
+            return {
+                "live": len(self._sessions),
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
+
+class JournaledSessionStore(MemorySessionStore):
+    """Per-process LRU table that survives restarts. Only safe with a single worker.
+
+    The store holds an flock on <path>.lock while it is open, so a second
+    process (e.g. another gunicorn worker) refuses to open the same
+    journal instead of interleaving its records with ours.
+
+    Every start, advance, delete and read is appended to a journal file as one
+    short JSON line, in the same critical section as the change itself, and
+    handed to the OS straight away, so a process that exits or crashes
+    loses nothing. fsyncs are coalesced: a background thread syncs the file
+    every fsync_interval seconds if anything was written, so a power loss
+    costs at most that much. A new store replays the journal to rebuild the
+    sessions, then compacts it to a snapshot of the live ones; it is
+    compacted again once compact_every records have been appended and the
+    file holds more than twice as many records as there are live sessions.
+    """
+
+    def __init__(self, path: str, ttl: float = 0, max_entries: int = 0, clock=time.time,
+                 fsync_interval: float = 0.05, compact_every: int = 10000):
+        super().__init__(ttl, max_entries, clock)
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.compact_every = compact_every
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock_file = open(f"{path}.lock", "a")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._lock_file.close()
+            raise RuntimeError(
+                f"Session journal {path} is in use by another process; the journal backend "
+                "supports a single worker, use SESSION_BACKEND=sqlite or redis with several"
+            )
+        self._file = None
+        self._records = 0
+        self._appended = 0
+        self._dirty = False
+        # Serialises fsyncs with compaction, which swaps the file underneath
+        self._sync_lock = threading.Lock()
+        self.replayed = self._replay()
+        self._compact()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="session-journal", daemon=True)
+        self._thread.start()
+
+    def _replay(self) -> int:
+        if not os.path.exists(self.path):
+            return 0
+        applied = 0
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    op, key = record[0], record[1]
+                except (ValueError, IndexError, TypeError):
+                    # Torn final line from a crash mid-write
+                    continue
+                if op == "s":
+                    # [s, key, flow, answers, touched]
+                    self._sessions[key] = Session(record[2], list(record[3]), record[4])
+                    self._sessions.move_to_end(key)
+                elif op == "a":
+                    # [a, key, step, values, touched]
+                    session = self._sessions.get(key)
+                    if session is None or session.step != record[2]:
+                        continue
+                    session.answers.extend(record[3])
+                    session.touched = record[4]
+                    self._sessions.move_to_end(key)
+                elif op == "t":
+                    # [t, key, touched]
+                    session = self._sessions.get(key)
+                    if session is None:
+                        continue
+                    session.touched = record[2]
+                    self._sessions.move_to_end(key)
+                elif op == "d":
+                    self._sessions.pop(key, None)
+                applied += 1
+        self._sweep(self.clock())
+        return applied
+
+    def _compact(self) -> None:
+        """Rewrite the journal as one record per live session (call with the lock held)."""
+        temp = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp, "w") as f:
+            for key, session in self._sessions.items():
+                f.write(json.dumps(["s", key, session.flow, session.answers, session.touched]) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        if self._file is not None:
+            self._file.close()
+        os.replace(temp, self.path)
+        self._file = open(self.path, "a")
+        self._records = len(self._sessions)
+        self._appended = 0
+        self._dirty = False
+
+    def _append(self, record: List[Any]) -> None:
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+        self._records += 1
+        self._appended += 1
+        self._dirty = True
+
+    def get(self, key: str) -> Optional[Session]:
+        with self._lock:
+            session = super().get(key)
+            if session is not None:
+                self._append(["t", key, session.touched])
+            return session
+
+    def start(self, key: str, flow: str = "registration") -> Session:
+        with self._lock:
+            session = super().start(key, flow)
+            self._append(["s", key, flow, [], session.touched])
+            return session
+
+    def advance(self, key: str, step: int, *values: Any) -> Optional[Session]:
+        with self._lock:
+            session = super().advance(key, step, *values)
+            if session is not None:
+                self._append(["a", key, step, list(values), session.touched])
+            return session
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._sessions:
+                super().delete(key)
+                self._append(["d", key])
+
+    def sync(self) -> None:
+        """fsync what has been written, and compact the journal if it is due."""
+        with self._sync_lock:
+            with self._lock:
+                if self._appended >= self.compact_every and self._records > 2 * len(self._sessions):
+                    self._sweep(self.clock())
+                    self._compact()
+                    return
+                if not self._dirty:
+                    return
+                self._dirty = False
+                fileno = self._file.fileno()
+            # Outside the store lock: appends carry on while the disk catches up
+            os.fsync(fileno)
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.fsync_interval):
+            try:
+                self.sync()
+            except Exception:
+                # Retried on the next tick; the records are already with the OS
+                continue
+
+    def close(self) -> None:
+        self._stopping.set()
+        self._thread.join()
+        with self._sync_lock, self._lock:
+            if self._file is not None and not self._file.closed:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+            # Lets the next process open the journal
+            self._lock_file.close()
+
+class SQLiteSessionStore(SessionStore):
+    """File-backed store shared by every worker on the same host."""
+
+    def __init__(self, path: str, ttl: float = 0, max_entries: int = 0, clock=time.time):
+        super().__init__(ttl, max_entries, clock)
+        self.path = path
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "key TEXT PRIMARY KEY, flow TEXT NOT NULL, answers TEXT NOT NULL, touched REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_sessions_touched ON sessions (touched)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS session_stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+        )
+        conn.execute(
+            "INSERT OR IGNORE INTO session_stats (name, value) VALUES ('evictions', 0), ('expirations', 0)"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode; multi-statement operations open their own
+            # IMMEDIATE transaction so the write lock is taken up front.
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, conn: sqlite3.Connection, name: str, amount: int) -> None:
+        if amount:
+            conn.execute("UPDATE session_stats SET value = value + ? WHERE name = ?", (amount, name))
+
+    def _sweep(self, conn: sqlite3.Connection, now: float) -> None:
+        if self.ttl:
+            expired = conn.execute("DELETE FROM sessions WHERE touched < ?", (now - self.ttl,)).rowcount
+            self._count(conn, "expirations", expired)
+        if self.max_entries:
+            evicted = conn.execute(
+                "DELETE FROM sessions WHERE key IN ("
+                "SELECT key FROM sessions ORDER BY touched "
+                "LIMIT max(0, (SELECT count(*) FROM sessions) - ?))",
+                (self.max_entries,)
+            ).rowcount
+            self._count(conn, "evictions", evicted)
+
+    def get(self, key: str) -> Optional[Session]:
+        now = self.clock()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT flow, answers, touched FROM sessions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (self.ttl and now - row[2] > self.ttl):
+                conn.execute("ROLLBACK")
+                return None
+            conn.execute("UPDATE sessions SET touched = ? WHERE key = ?", (now, key))
+            conn.execute("COMMIT")
+            return Session(row[0], json.loads(row[1]), now)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def start(self, key: str, flow: str = "registration") -> Session:
+        now = self.clock()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (key, flow, answers, touched) VALUES (?, ?, '[]', ?)",
+                (key, flow, now)
+            )
+            self._sweep(conn, now)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return Session(flow, [], now)
+
+    def advance(self, key: str, step: int, *values: Any) -> Optional[Session]:
+        now = self.clock()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT flow, answers, touched FROM sessions WHERE key = ?", (key,)
+            ).fetchone()
+            answers = json.loads(row[1]) if row is not None else None
+            if answers is None or len(answers) != step or (self.ttl and now - row[2] > self.ttl):
+                conn.execute("ROLLBACK")
+                return None
+            answers.extend(values)
+            conn.execute(
+                "UPDATE sessions SET answers = ?, touched = ? WHERE key = ?",
+                (json.dumps(answers), now, key)
+            )
+            conn.execute("COMMIT")
+            return Session(row[0], answers, now)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def delete(self, key: str) -> None:
+        self._connect().execute("DELETE FROM sessions WHERE key = ?", (key,))
+
+    def stats(self) -> Dict[str, int]:
+        now = self.clock()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._sweep(conn, now)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        counters = dict(conn.execute("SELECT name, value FROM session_stats").fetchall())
+        counters["live"] = conn.execute("SELECT count(*) FROM sessions").fetchone()[0]
+        return counters
+
+# The scripts run server side so each operation is atomic across workers.
+# KEYS[1] is the session key, KEYS[2] the index of keys by last touch time
+# and KEYS[3] the counters hash.
+_SWEEP = """
+local expired = 0
+if tonumber(ARGV[2]) > 0 then
+  local stale = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', '(' .. (tonumber(ARGV[1]) - tonumber(ARGV[2])))
+  for _, key in ipairs(stale) do
+    redis.call('DEL', key)
+    redis.call('ZREM', KEYS[2], key)
+  end
+  expired = #stale
+end
+if expired > 0 then redis.call('HINCRBY', KEYS[3], 'expirations', expired) end
+local overflow = redis.call('ZCARD', KEYS[2]) - tonumber(ARGV[3])
+if tonumber(ARGV[3]) > 0 and overflow > 0 then
+  local victims = redis.call('ZRANGE', KEYS[2], 0, overflow - 1)
+  for _, key in ipairs(victims) do
+    redis.call('DEL', key)
+    redis.call('ZREM', KEYS[2], key)
+  end
+  redis.call('HINCRBY', KEYS[3], 'evictions', #victims)
+end
+"""
+
+_SAVE = """
+local function save(raw)
+  if tonumber(ARGV[2]) > 0 then
+    redis.call('SET', KEYS[1], raw, 'EX', math.ceil(tonumber(ARGV[2])))
+  else
+    redis.call('SET', KEYS[1], raw)
+  end
+  redis.call('ZADD', KEYS[2], ARGV[1], KEYS[1])
+end
+"""
+
+_START_SCRIPT = _SAVE + """
+save(cjson.encode({tonumber(ARGV[1]), ARGV[4]}))
+""" + _SWEEP
+
+_ADVANCE_SCRIPT = _SAVE + """
+local raw = redis.call('GET', KEYS[1])
+if not raw then return false end
+local session = cjson.decode(raw)
+if #session - 2 ~= tonumber(ARGV[4]) then return false end
+if tonumber(ARGV[2]) > 0 and tonumber(ARGV[1]) - session[1] > tonumber(ARGV[2]) then return false end
+session[1] = tonumber(ARGV[1])
+for _, value in ipairs(cjson.decode(ARGV[5])) do
+  session[#session + 1] = value
+end
+raw = cjson.encode(session)
+save(raw)
+return raw
+"""
+
+_GET_SCRIPT = _SAVE + """
+local raw = redis.call('GET', KEYS[1])
+if not raw then return false end
+local session = cjson.decode(raw)
+if tonumber(ARGV[2]) > 0 and tonumber(ARGV[1]) - session[1] > tonumber(ARGV[2]) then return false end
+session[1] = tonumber(ARGV[1])
+raw = cjson.encode(session)
+save(raw)
+return raw
+"""
+
+_STATS_SCRIPT = _SWEEP + """
+return {redis.call('ZCARD', KEYS[2]),
+        tonumber(redis.call('HGET', KEYS[3], 'evictions') or 0),
+        tonumber(redis.call('HGET', KEYS[3], 'expirations') or 0)}
+"""
+
+def _decode_session(raw) -> Session:
+    # Stored as [touched, flow, answer, answer, ...]; never an empty array,
+    # which Lua's cjson would turn into an object.
+    values = json.loads(raw)
+    return Session(values[1], values[2:], values[0])
+
+class RedisSessionStore(SessionStore):
+    """Store for any server speaking the Redis protocol.
+
+    Pass either a ready client (anything with the redis-py API, e.g. a local
+    fakeredis instance in tests) or a URL. Idle sessions are also given a
+    server-side key TTL so they are reclaimed without a sweep.
+    """
+
+    def __init__(self, url: Optional[str] = None, client=None, prefix: str = "wa:session:",
+                 ttl: float = 0, max_entries: int = 0, clock=time.time):
+        super().__init__(ttl, max_entries, clock)
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url or "redis://localhost:6379/0")
+        self.client = client
+        self.prefix = prefix
+        self._index = prefix + "_index"
+        self._counters = prefix + "_stats"
+        self._start = client.register_script(_START_SCRIPT)
+        self._advance = client.register_script(_ADVANCE_SCRIPT)
+        self._get = client.register_script(_GET_SCRIPT)
+        self._stats = client.register_script(_STATS_SCRIPT)
+
+    def _keys(self, key: str) -> List[str]:
+        return [self.prefix + key, self._index, self._counters]
+
+    def _args(self, *extra) -> List[Any]:
+        return [self.clock(), self.ttl, self.max_entries, *extra]
+
+    def get(self, key: str) -> Optional[Session]:
+        raw = self._get(keys=self._keys(key), args=self._args())
+        if not raw:
+            return None
+        return _decode_session(raw)
+
+    def start(self, key: str, flow: str = "registration") -> Session:
+        self._start(keys=self._keys(key), args=self._args(flow))
+        return Session(flow, [], self.clock())
+
+    def advance(self, key: str, step: int, *values: Any) -> Optional[Session]:
+        raw = self._advance(keys=self._keys(key), args=self._args(step, json.dumps(list(values))))
+        if not raw:
+            return None
+        return _decode_session(raw)
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+        self.client.zrem(self._index, self.prefix + key)
+
+    def stats(self) -> Dict[str, int]:
+        live, evictions, expirations = self._stats(keys=self._keys(""), args=self._args())
+        return {"live": live, "evictions": evictions, "expirations": expirations}
+
+def create_session_store(config) -> SessionStore:
+    backend = (config.get("SESSION_BACKEND") or "memory").lower()
+    limits = {
+        "ttl": float(config.get("SESSION_TTL_SECONDS", 0) or 0),
+        "max_entries": int(config.get("SESSION_MAX_ENTRIES", 0) or 0)
+    }
+    if backend == "memory":
+        return MemorySessionStore(**limits)
+    if backend == "journal":
+        store = JournaledSessionStore(
+            config.get("SESSION_JOURNAL_PATH", "spool/sessions.journal"),
+            fsync_interval=float(config.get("SESSION_JOURNAL_FSYNC_SECONDS", 0.05)),
+            compact_every=int(config.get("SESSION_JOURNAL_COMPACT_EVERY", 10000)),
+            **limits
+        )
+        atexit.register(store.close)
+        return store
+    if backend == "sqlite":
+        return SQLiteSessionStore(config.get("SESSION_SQLITE_PATH", "sessions.db"), **limits)
+    if backend == "redis":
+        return RedisSessionStore(url=config.get("REDIS_URL"), **limits)
+    raise ValueError(f"Unknown session backend: {backend}")
@@ -0,0 +1,40 @@
+# Author: SANJAY KR
+import re
+from typing import Dict, Optional, Tuple
+from requests.adapters import HTTPAdapter
+from twilio.http.http_client import TwilioHttpClient
+from twilio.http.response import Response
+
+class PooledTwilioHttpClient(TwilioHttpClient):
+    """Twilio HTTP client with a sized keep-alive connection pool.
+
+    All requests share one requests.Session, so sends reuse open TLS
+    connections instead of paying a handshake each time. pool_size should
+    be at least the number of threads sending concurrently; with
+    pool_block set, extra threads wait for a free connection rather than
+    opening throwaway ones. base_url replaces the scheme and host of every
+    Twilio API URL, e.g. to point at a local fake Twilio server.
+    """
+
+    def __init__(self, pool_size: int = 10, timeout: Optional[float] = 10.0,
+                 base_url: Optional[str] = None, max_retries: int = 0, pool_block: bool = True):
+        super().__init__(pool_connections=True, timeout=timeout)
+        self.pool_size = pool_size
+        self.base_url = base_url.rstrip("/") if base_url else None
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=max_retries,
+            pool_block=pool_block
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(self, method: str, url: str, params: Optional[Dict[str, object]] = None,
+                data: Optional[Dict[str, object]] = None, headers: Optional[Dict[str, str]] = None,
+                auth: Optional[Tuple[str, str]] = None, timeout: Optional[float] = None,
+                allow_redirects: bool = False) -> Response:
+        if self.base_url:
+            url = re.sub(r"^https?://[^/]+", self.base_url, url)
+        return super().request(method, url, params=params, data=data, headers=headers,
+                               auth=auth, timeout=timeout, allow_redirects=allow_redirects)
@@ -3,8 +3,15 @@ from twilio.rest import Client
 from twilio.base.exceptions import TwilioRestException
 from flask import current_app, has_app_context, Flask
 import os
+import threading
 from dotenv import load_dotenv
 from typing import Dict, Any, Tuple, Optional
+from .session_store import Session, SessionStore, MemorySessionStore, create_session_store
+from .outbound import OutboundQueue
+from .twilio_http import PooledTwilioHttpClient
+from .dedup import MessageDeduplicator, MemoryDeduplicator, create_deduplicator
+from .flows import FLOWS, FORM_TRIGGERS, TRIGGERS, REGISTRATION, Flow
+from .forms import form_corrections, form_flow, form_session_name, form_template, parse_form
 
 load_dotenv()
 
@@ -24,9 +31,37 @@ def get_whatsapp_service():
 
 class WhatsAppService:
     def __init__(self):
-        self.current_sessions: Dict[str, Dict[str, Any]] = {}
+        self._sessions: Optional[SessionStore] = None
+        # Config the store is created from on first use; a memory store without one
+        self._session_config = None
+        self._sessions_lock = threading.Lock()
+        self.outbox: Optional[OutboundQueue] = None
+        self.dedup: MessageDeduplicator = MemoryDeduplicator()
         self.client = None
         
+    @property
+    def sessions(self) -> SessionStore:
+        """The conversation session store, opened the first time a message needs it.
+
+        The journal backend takes an exclusive lock on its file, so it is not
+        opened when the app is only built, e.g. by a flask CLI command next
+        to the running server.
+        """
+        if self._sessions is None:
+            with self._sessions_lock:
+                if self._sessions is None:
+                    if self._session_config is None:
+                        self._sessions = MemorySessionStore()
+                    else:
+                        self._sessions = create_session_store(self._session_config)
+                        if has_app_context():
+                            current_app.logger.info(f"Using {type(self._sessions).__name__} for conversation sessions")
+        return self._sessions
+
+    @sessions.setter
+    def sessions(self, store: SessionStore) -> None:
+        self._sessions = store
+
     @classmethod
     def get_instance(cls):
         global _instance
@@ -47,7 +82,29 @@ class WhatsAppService:
                 app.logger.error("Twilio credentials not properly configured")
                 raise ValueError("Twilio credentials not properly configured")
                 
-            self.client = Client(account_sid, auth_token)
+            http_client = PooledTwilioHttpClient(
+                pool_size=app.config.get("TWILIO_HTTP_POOL_SIZE", 10),
+                timeout=app.config.get("TWILIO_HTTP_TIMEOUT", 10.0),
+                base_url=app.config.get("TWILIO_API_BASE_URL")
+            )
+            self.client = Client(account_sid, auth_token, http_client=http_client)
+            self._session_config = app.config
+            self.dedup = create_deduplicator(app.config)
+            
+            if app.config.get("OUTBOUND_ASYNC", True):
+                self.outbox = OutboundQueue(
+                    self.deliver,
+                    app=app,
+                    workers=app.config.get("OUTBOUND_WORKERS", 4),
+                    max_retries=app.config.get("OUTBOUND_MAX_RETRIES", 5),
+                    backoff=app.config.get("OUTBOUND_BACKOFF_SECONDS", 1.0),
+                    backoff_max=app.config.get("OUTBOUND_BACKOFF_MAX_SECONDS", 60.0),
+                    spool_dir=app.config.get("OUTBOUND_SPOOL_DIR"),
+                    maxsize=app.config.get("OUTBOUND_QUEUE_SIZE", 10000)
+                )
+                self.outbox.recover()
+                self.outbox.start()
+                app.logger.info(f"Started outbound queue with {self.outbox.workers} workers")
             
             # Store instance in app context
             if not hasattr(app, 'extensions'):
@@ -60,76 +117,81 @@ class WhatsAppService:
             app.logger.error(f"Failed to initialize WhatsApp service: {str(e)}")
             raise
 
-    def send_message(self, to: str, message: str) -> bool:
-        try:
-            if not self.client:
-                current_app.logger.error("Twilio client not initialized")
-                return False
-                
-            system_number = os.getenv("TWILIO_PHONE_NUMBER", "whatsapp:+14155238886")
+    def _recipient(self, to: str) -> Optional[str]:
+        system_number = os.getenv("TWILIO_PHONE_NUMBER", "whatsapp:+14155238886")
+        
+        # Clean up the destination number
+        to_number = to.strip().replace(" ", "").replace("whatsapp:", "")
+        if not to_number.startswith("+"):
+            to_number = "+" + to_number
             
-            # Clean up the destination number
-            to_number = to.strip().replace(" ", "").replace("whatsapp:", "")
-            if not to_number.startswith("+"):
-                to_number = "+" + to_number
-                
-            # Validate number format (must be E.164 format)
-            if not to_number.startswith("+") or not to_number[1:].isdigit():
-                current_app.logger.error(f"Invalid phone number format: {to_number}")
-                return False
-                
-            if to_number == system_number.replace("whatsapp:", ""):
-                current_app.logger.error(f"Cannot send message to system number: {to_number}")
-                return False
-                
+        # Validate number format (must be E.164 format)
+        if not to_number.startswith("+") or not to_number[1:].isdigit():
+            current_app.logger.error(f"Invalid phone number format: {to_number}")
+            return None
+            
+        if to_number == system_number.replace("whatsapp:", ""):
+            current_app.logger.error(f"Cannot send message to system number: {to_number}")
+            return None
+        return to_number
+
+    def deliver(self, to: str, message: str) -> bool:
+        """Send one message, as used by the outbound queue.
+
+        Returns False for messages that can never be delivered and raises on
+        transient errors (rate limiting, Twilio outages, network failures)
+        so the queue retries them.
+        """
+        if not self.client:
+            raise RuntimeError("Twilio client not initialized")
+        to_number = self._recipient(to)
+        if to_number is None:
+            return False
+        try:
             self.client.messages.create(
-                from_=system_number,
+                from_=os.getenv("TWILIO_PHONE_NUMBER", "whatsapp:+14155238886"),
                 body=message,
                 to=f"whatsapp:{to_number}"
             )
-            current_app.logger.info(f"Successfully sent message to {to_number}")
-            return True
         except TwilioRestException as e:
-            if "same To and From" in str(e):
-                current_app.logger.error(f"Cannot send message to system number: {to_number}")
+            if e.status == 429 or (e.status or 0) >= 500:
+                raise
+            current_app.logger.error(f"Twilio API error: {str(e)}")
+            return False
+        current_app.logger.info(f"Successfully sent message to {to_number}")
+        return True
+
+    def send_message(self, to: str, message: str) -> bool:
+        try:
+            if not self.client:
+                current_app.logger.error("Twilio client not initialized")
                 return False
+            return self.deliver(to, message)
+        except TwilioRestException as e:
             current_app.logger.error(f"Twilio API error: {str(e)}")
             return False
         except Exception as e:
             current_app.logger.error(f"Failed to send WhatsApp message: {str(e)}")
             return False
 
-    def validate_input(self, field: str, value: str) -> tuple[bool, str]:
+    def queue_message(self, to: str, message: str) -> bool:
+        """Hand a message to the background sender and return immediately.
+
+        Falls back to sending inline when no queue is running or it is full.
+        """
+        if self.outbox is not None:
+            if self.outbox.enqueue(to, message):
+                return True
+            current_app.logger.warning(f"Outbound queue full, sending to {to} inline")
+        return self.send_message(to, message)
+
+    def validate_input(self, field: str, value: str, flow: Flow = REGISTRATION) -> Tuple[bool, Any]:
+        """Return (True, value to store) or (False, error message) for one answer."""
         current_app.logger.debug(f"Validating field '{field}' with value '{value}'")
-        validations = {
-            "gender": lambda x: x.lower() in ["male", "female", "other"],
-            "age": lambda x: x.isdigit() and 0 <= int(x) <= 120,
-            "blood_group": lambda x: x.upper() in ["A+", "A-", "B+", "B-", "AB+", "AB-", "O+", "O-"],
-            "mobile_1": lambda x: x.isdigit() and len(x) == 10,
-            "mobile_2": lambda x: x.isdigit() and len(x) == 10 if x.lower() != "skip" else True,
-            "email": lambda x: "@" in x and "." in x.split("@")[1],
-            "birth_date": lambda x: len(x.split("/")) == 3,
-            "anniversary_date": lambda x: len(x.split("/")) == 3 if x.lower() != "skip" else True,
-            "emergency_contact": lambda x: x.isdigit() and len(x) == 10
-        }
-        
-        if field not in validations:
+        step = flow.index.get(field)
+        if step is None:
             return True, value
-            
-        is_valid = validations[field](value)
-        error_messages = {
-            "gender": "Please enter Male, Female, or Other",
-            "age": "Please enter a valid age between 0 and 120",
-            "blood_group": "Please enter a valid blood group (A+, A-, B+, B-, AB+, AB-, O+, O-)",
-            "mobile_1": "Please enter a valid 10-digit mobile number",
-            "mobile_2": "Please enter a valid 10-digit mobile number or type 'skip'",
-            "email": "Please enter a valid email address",
-            "birth_date": "Please enter date in DD/MM/YYYY format",
-            "anniversary_date": "Please enter date in DD/MM/YYYY format or type 'skip'",
-            "emergency_contact": "Please enter a valid 10-digit contact number"
-        }
-        
-        return is_valid, error_messages[field] if not is_valid else value
+        return flow.steps[step].parse(value)
 
     def handle_message(self, from_number: str, message: str) -> Tuple[str, bool]:
         try:
@@ -150,80 +212,86 @@ class WhatsAppService:
                 current_app.logger.error(f"Cannot process messages from system number: {phone_number}")
                 return "Cannot process messages from the system number.", False
                 
-            if message.lower() == "start":
-                self.current_sessions[phone_number] = {
-                    "step": 0,
-                    "data": {}
-                }
-                current_app.logger.info(f"Started new session for {phone_number}")
-                return "Welcome to Family & Samaj Data Collection Bot!\nPlease enter your Samaj name:", True
-                
-            if from_number not in self.current_sessions:
-                current_app.logger.warning(f"No active session for {from_number}")
-                return "Please send 'Start' to begin the data collection process.", True
+            message = message.strip()
+            flow = TRIGGERS.get(message.lower())
+            if flow is not None:
+                self.sessions.start(phone_number, flow.name)
+                current_app.logger.info(f"Started new {flow.name} session for {phone_number}")
+                return flow.first_prompt(), True
+            flow = FORM_TRIGGERS.get(message.lower())
+            if flow is not None:
+                self.sessions.start(phone_number, form_session_name(flow))
+                current_app.logger.info(f"Started new {flow.name} form for {phone_number}")
+                return form_template(flow), True
         except Exception as e:
             current_app.logger.error(f"Error processing message: {str(e)}")
             return "An error occurred. Please try again.", False
 
         try:
-            session = self.current_sessions[from_number]
-            step = session["step"]
-            data = session["data"]
+            session = self.sessions.get(phone_number)
+            form = form_flow(session.flow) if session is not None else None
+            if form is not None:
+                return self.handle_form(phone_number, form, session, message)
+            if session is None or session.flow not in FLOWS:
+                current_app.logger.warning(f"No active session for {phone_number}")
+                return "Please send 'Start' to begin the data collection process.", True
+            flow = FLOWS[session.flow]
+            step = session.step
         except Exception as e:
-            current_app.logger.error(f"Error accessing session data for {from_number}: {str(e)}")
+            current_app.logger.error(f"Error accessing session data for {phone_number}: {str(e)}")
             return "An error occurred. Please try again by sending 'Start'.", False
 
-        steps = {
-            0: ("samaj", "Please enter your full name:"),
-            1: ("name", "Please enter your gender (Male/Female/Other):"),
-            2: ("gender", "Please enter your age:"),
-            3: ("age", "Please enter your blood group:"),
-            4: ("blood_group", "Please enter your primary mobile number:"),
-            5: ("mobile_1", "Please enter your secondary mobile number (or type 'skip'):"),
-            6: ("mobile_2", "Please enter your education:"),
-            7: ("education", "Please enter your occupation:"),
-            8: ("occupation", "Please enter your marital status:"),
-            9: ("marital_status", "Please enter your address:"),
-            10: ("address", "Please enter your email:"),
-            11: ("email", "Please enter your birth date (DD/MM/YYYY):"),
-            12: ("birth_date", "Please enter your anniversary date (DD/MM/YYYY or type 'skip'):"),
-            13: ("anniversary_date", "Please enter your native place:"),
-            14: ("native_place", "Please enter your current city:"),
-            15: ("current_city", "Please enter languages known (comma-separated):"),
-            16: ("languages_known", "Please enter your skills (comma-separated):"),
-            17: ("skills", "Please enter your hobbies (comma-separated):"),
-            18: ("hobbies", "Please enter emergency contact number:"),
-            19: ("emergency_contact", "Please enter your relationship status:"),
-            20: ("relationship_status", "Please enter your family role:"),
-            21: ("family_role", "Please enter any medical conditions (or type 'skip'):"),
-            22: ("medical_conditions", "Please enter dietary preferences:"),
-            23: ("dietary_preferences", "Please enter social media handles (comma-separated or type 'skip'):"),
-            24: ("social_media_handles", "Please enter your profession category:"),
-            25: ("profession_category", "Please enter volunteer interests (comma-separated or type 'skip'):")
-        }
-
-        if step in steps:
-            field, next_prompt = steps[step]
-            is_valid, result = self.validate_input(field, message)
-            if not is_valid:
-                current_app.logger.warning(f"Invalid input for field '{field}' from {from_number}: {message}")
-                return result, True
-            
-            if message.lower() == "skip" and field == "mobile_2":
-                data[field] = None
-                current_app.logger.info(f"User {from_number} skipped optional field '{field}'")
-            else:
-                data[field] = result
-                current_app.logger.info(f"User {from_number} provided valid input for '{field}': {result}")
-            session["step"] = step + 1
-            current_app.logger.info(f"Advanced session for {from_number} to step {step + 1}")
-            return next_prompt, True
+        if step >= len(flow.steps):
+            # Finished; the controller saves the answers and clears the session
+            return flow.complete, True
 
-        try:
-            # Here we would typically save the data to the database
-            current_app.logger.info(f"Completed data collection for user {from_number}")
-            del self.current_sessions[from_number]
-            return "Thank you for providing your information! Your data has been saved.", True
-        except Exception as e:
-            current_app.logger.error(f"Failed to save user data: {str(e)}")
-            return "An error occurred while saving your information. Please try again later.", False
+        current = flow.steps[step]
+        is_valid, value = current.parse(message)
+        if not is_valid:
+            current_app.logger.warning(f"Invalid input for field '{current.field}' from {phone_number}: {message}")
+            return value, True
+        if value is None:
+            current_app.logger.info(f"User {phone_number} skipped optional field '{current.field}'")
+        else:
+            current_app.logger.info(f"User {phone_number} provided valid input for '{current.field}': {value}")
+
+        answers = session.answers + [value]
+        next_step = flow.next_step(step, answers)
+        # Steps passed over by ask_if rules are recorded as unanswered
+        values = [value] + [None] * (next_step - step - 1)
+        if self.sessions.advance(phone_number, step, *values) is None:
+            # Another worker handled a message for this session first
+            current_app.logger.warning(f"Session for {phone_number} moved past step {step} concurrently")
+            return "Your previous answer is still being processed. Please try again.", True
+        current_app.logger.info(f"Advanced session for {phone_number} to step {next_step}")
+        if next_step >= len(flow.steps):
+            current_app.logger.info(f"Completed data collection for user {phone_number}")
+            return flow.complete, True
+        return flow.steps[next_step].prompt, True
+
+    def handle_form(self, phone_number: str, flow: Flow, session: Session, message: str) -> Tuple[str, bool]:
+        """Take a filled-in form (or corrections to it) in one message."""
+        answers: Dict[str, Any] = {}
+        for reply in session.answers:
+            answers.update(reply)
+        _, errors = flow.parse_all(answers)
+        reply = parse_form(flow, message, list(errors))
+        if not reply:
+            return form_corrections(flow, errors), True
+        answers.update(reply)
+        values, errors = flow.parse_all(answers)
+        if errors:
+            current_app.logger.info(f"Form from {phone_number} still needs: {', '.join(errors)}")
+            if self.sessions.advance(phone_number, session.step, reply) is None:
+                current_app.logger.warning(f"Form session for {phone_number} changed concurrently")
+                return "Your previous answer is still being processed. Please try again.", True
+            return form_corrections(flow, errors), True
+
+        # Store the answers as a finished step-by-step session, which the
+        # controller saves and clears like any other completed flow
+        self.sessions.start(phone_number, flow.name)
+        if self.sessions.advance(phone_number, 0, *(values.get(field) for field in flow.fields)) is None:
+            current_app.logger.warning(f"Form session for {phone_number} changed concurrently")
+            return "Your previous answer is still being processed. Please try again.", True
+        current_app.logger.info(f"Completed {flow.name} form for user {phone_number}")
+        return flow.complete, True
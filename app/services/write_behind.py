@@ -0,0 +1,327 @@
+# Author: SANJAY KR
+import atexit
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+from flask import current_app, has_app_context
+from sqlalchemy import String, insert
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.orm import Session
+from .. import db
+from ..models.family import Member, Samaj
+from .samaj_cache import samaj_cache
+from .member_stats import record_members
+from .member_tags import tag_members
+from ..utils.process import hold_instance_lock, owned_by_dead_process
+from ..utils.dates import month_day, parse_date
+
+MEMBER_COLUMNS = tuple(
+    column.name for column in Member.__table__.columns if column.name not in ("id", "samaj_id")
+)
+
+# Longest value each answer may have, from the columns it is saved to
+MEMBER_LENGTHS = {
+    column.name: column.type.length for column in Member.__table__.columns
+    if isinstance(column.type, String) and column.type.length
+}
+MEMBER_LENGTHS["samaj"] = Samaj.__table__.c.name.type.length
+
+def member_errors(data: Dict[str, Any]) -> Dict[str, str]:
+    """Answers that cannot be saved as a Member row, with the reason per field."""
+    errors = {}
+    if not data.get("samaj"):
+        errors["samaj"] = "Missing samaj"
+    for field, length in MEMBER_LENGTHS.items():
+        value = data.get(field)
+        if value is not None and len(str(value)) > length:
+            errors[field] = f"Longer than {length} characters"
+    if data.get("age") is not None:
+        try:
+            int(data["age"])
+        except (TypeError, ValueError):
+            errors["age"] = "Not a whole number"
+    return errors
+
+def database_unavailable(e: Exception) -> bool:
+    """True if e says the database is unavailable, rather than that the rows are bad."""
+    return isinstance(e, (OperationalError, InterfaceError)) or (
+        isinstance(e, DBAPIError) and e.connection_invalidated
+    )
+
+def member_values(data: Dict[str, Any], samaj_id: int) -> Dict[str, Any]:
+    """Column values for a Member row built from completed registration answers."""
+    values = {column: data.get(column) for column in MEMBER_COLUMNS}
+    values["age"] = int(data["age"]) if data.get("age") is not None else None
+    for column in ("birth_date", "anniversary_date"):
+        values[column] = parse_date(data.get(column))
+        values[column.replace("_date", "_mmdd")] = month_day(values[column])
+    values["samaj_id"] = samaj_id
+    return values
+
+def insert_members(session: Session, records: List[Dict[str, Any]]) -> List[int]:
+    """Insert completed registrations in one multi-row statement; returns their ids.
+
+    Samaj names are resolved (and created) through the samaj cache. The
+    caller commits.
+    """
+    samaj_ids = samaj_cache.resolve_many(session, {record["samaj"] for record in records})
+    rows = [member_values(record, samaj_ids[record["samaj"]]) for record in records]
+    ids = session.execute(
+        insert(Member).returning(Member.id, sort_by_parameter_order=True), rows
+    ).scalars().all()
+    # Bulk inserts skip mapper events, so count and tag them here
+    connection = session.connection()
+    record_members(connection, rows)
+    tag_members(connection, [dict(row, id=member_id) for row, member_id in zip(rows, ids)])
+    # Invalidates cached admin responses once committed
+    session.info["data_changed"] = True
+    return ids
+
+def get_registration_writer() -> Optional["RegistrationWriter"]:
+    if not has_app_context():
+        return None
+    return current_app.extensions.get("registration_writer")
+
+class RegistrationWriter:
+    """Write-behind buffer for completed registrations.
+
+    submit() appends the answers to this process's journal file and returns
+    once they are fsynced, so a registration is durable as soon as submit()
+    returns. The fsync runs outside the buffer lock and covers every record
+    appended before it started, so concurrent submits share one disk flush
+    instead of queueing for one each. A background thread group-commits the
+    buffer to the database with one multi-row insert once batch_size records
+    are waiting or every interval seconds. Each batch is moved to its own file before it is inserted and
+    removed only after the commit, so journals and batches left behind by a
+    crashed process are inserted by the next process that starts. Delivery
+    is at-least-once: a crash between commit and cleanup can repeat a batch.
+
+    A batch the database rejects is inserted again one row at a time, so a
+    single bad row cannot hold up the rows behind it; rows that still fail
+    are appended to failed/<instance>-failed.jsonl with the error. Batches
+    that fail because the database is unavailable are kept and retried.
+    """
+
+    def __init__(self, app, batch_size: int = 100, interval: float = 2.0, spool_dir: str = "spool/registrations"):
+        self.app = app
+        self.batch_size = batch_size
+        self.interval = interval
+        self.spool_dir = spool_dir
+        os.makedirs(spool_dir, exist_ok=True)
+        # Spool files are named after this process start, which holds a lock
+        # under locks/ until it exits; see utils/process.py
+        self._lock_dir = os.path.join(spool_dir, "locks")
+        self.instance = hold_instance_lock(self._lock_dir)
+        self._journal_path = os.path.join(spool_dir, f"{self.instance}-journal.jsonl")
+        self._journal = open(self._journal_path, "a")
+        self._buffer: List[Dict[str, Any]] = []
+        # Batches waiting to be inserted, with the file that holds them
+        self._batches: List[Tuple[str, List[Dict[str, Any]]]] = []
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        # Journal records appended and known to be on disk, counted since start
+        self._appended = 0
+        self._synced = 0
+        # One fsync at a time; the submits waiting behind it are usually covered by it
+        self._sync_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self.written = 0
+        self.failed = 0
+
+    def submit(self, data: Dict[str, Any]) -> None:
+        line = json.dumps(data)
+        with self._cond:
+            self._journal.write(line + "\n")
+            self._journal.flush()
+            self._appended += 1
+            ticket = self._appended
+            self._buffer.append(data)
+            if len(self._buffer) >= self.batch_size:
+                self._cond.notify()
+        self._sync(ticket)
+
+    def _sync(self, ticket: int) -> None:
+        """Return once the first ticket journal records are on disk."""
+        with self._sync_lock:
+            with self._cond:
+                if self._synced >= ticket:
+                    return
+                target = self._appended
+                # A duplicate stays valid if _rotate closes the journal meanwhile
+                fd = os.dup(self._journal.fileno())
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            with self._cond:
+                self._synced = max(self._synced, target)
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._buffer) + sum(len(records) for _, records in self._batches)
+
+    def _read(self, path: str) -> List[Dict[str, Any]]:
+        records = []
+        with open(path) as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # Torn final line from a crash mid-write
+                    continue
+        return records
+
+    def recover(self) -> int:
+        """Queue journals and batches left behind by processes that have exited."""
+        recovered = 0
+        for name in sorted(os.listdir(self.spool_dir)):
+            if not name.endswith(".jsonl") or not owned_by_dead_process(self._lock_dir, name):
+                continue
+            claimed = os.path.join(self.spool_dir, f"{self.instance}-{uuid.uuid4().hex}.batch.jsonl")
+            try:
+                os.rename(os.path.join(self.spool_dir, name), claimed)
+            except FileNotFoundError:
+                continue
+            records = self._read(claimed)
+            with self._cond:
+                self._batches.append((claimed, records))
+            recovered += len(records)
+        if recovered:
+            self.app.logger.info(f"Recovered {recovered} unsaved registrations")
+        return recovered
+
+    def _rotate(self) -> None:
+        # Caller holds self._cond
+        if not self._buffer:
+            return
+        # Records not yet fsynced by _sync move to the batch file with it
+        os.fsync(self._journal.fileno())
+        self._synced = self._appended
+        self._journal.close()
+        batch_path = os.path.join(self.spool_dir, f"{self.instance}-{uuid.uuid4().hex}.batch.jsonl")
+        os.replace(self._journal_path, batch_path)
+        self._journal = open(self._journal_path, "a")
+        self._batches.append((batch_path, self._buffer))
+        self._buffer = []
+
+    def _insert(self, path: str, records: List[Dict[str, Any]]) -> int:
+        """Insert a batch, falling back to single rows; returns the rows inserted."""
+        with self.app.app_context():
+            try:
+                try:
+                    insert_members(db.session, records)
+                    db.session.commit()
+                    return len(records)
+                except Exception as e:
+                    db.session.rollback()
+                    if database_unavailable(e):
+                        raise
+                    self.app.logger.warning(
+                        f"Batch of {len(records)} registrations rejected, saving them one by one: {str(e)}"
+                    )
+                inserted = 0
+                while records:
+                    try:
+                        insert_members(db.session, records[:1])
+                        db.session.commit()
+                        inserted += 1
+                    except Exception as e:
+                        db.session.rollback()
+                        if database_unavailable(e):
+                            # Keep only the rows not yet handled for the retry
+                            self._rewrite(path, records)
+                            raise
+                        self._set_aside(records[0], e)
+                    del records[0]
+                return inserted
+            finally:
+                db.session.remove()
+
+    def _rewrite(self, path: str, records: List[Dict[str, Any]]) -> None:
+        temporary = path + ".tmp"
+        with open(temporary, "w") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+
+    def _set_aside(self, record: Dict[str, Any], error: Exception) -> None:
+        failed_dir = os.path.join(self.spool_dir, "failed")
+        os.makedirs(failed_dir, exist_ok=True)
+        path = os.path.join(failed_dir, f"{self.instance}-failed.jsonl")
+        with open(path, "a") as f:
+            f.write(json.dumps({"record": record, "error": str(error)}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.failed += 1
+        self.app.logger.error(f"Registration of {record.get('name')!r} could not be saved, moved to {path}: {str(error)}")
+
+    def flush(self) -> int:
+        """Insert everything submitted so far; returns the number of rows written."""
+        with self._flush_lock:
+            with self._cond:
+                self._rotate()
+                batches = list(self._batches)
+            written = 0
+            for batch in batches:
+                path, records = batch
+                if records:
+                    written += self._insert(path, records)
+                os.remove(path)
+                with self._cond:
+                    self._batches.remove(batch)
+            self.written += written
+            return written
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._stopping and len(self._buffer) < self.batch_size:
+                    self._cond.wait(self.interval)
+                stopping = self._stopping
+            try:
+                written = self.flush()
+                if written:
+                    self.app.logger.info(f"Saved {written} registrations")
+            except Exception as e:
+                self.app.logger.error(f"Failed to save registrations, will retry: {str(e)}")
+                if stopping:
+                    return
+                time.sleep(self.interval)
+            if stopping:
+                return
+
+    def start(self) -> "RegistrationWriter":
+        self._thread = threading.Thread(target=self._run, name="registration-writer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = 10) -> None:
+        """Flush what is buffered and stop the background thread."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+def init_registration_writer(app) -> Optional[RegistrationWriter]:
+    if not app.config.get("REGISTRATION_WRITE_BEHIND", True):
+        return None
+    writer = RegistrationWriter(
+        app,
+        batch_size=app.config.get("REGISTRATION_BATCH_SIZE", 100),
+        interval=app.config.get("REGISTRATION_FLUSH_SECONDS", 2.0),
+        spool_dir=app.config.get("REGISTRATION_SPOOL_DIR", "spool/registrations")
+    )
+    writer.recover()
+    writer.start()
+    atexit.register(writer.stop)
+    app.extensions["registration_writer"] = writer
+    app.logger.info("Started registration write-behind buffer")
+    return writer
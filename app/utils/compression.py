@@ -0,0 +1,22 @@
+# Author: SANJAY KR
+import gzip
+from flask import Response, request
+
+def gzip_response(response: Response, min_size: int = 1024) -> Response:
+    """after_request hook compressing large responses for clients that accept gzip."""
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code >= 300
+            or "Content-Encoding" in response.headers
+            or "gzip" not in request.headers.get("Accept-Encoding", "").lower()):
+        return response
+    data = response.get_data()
+    if len(data) < min_size:
+        return response
+    response.set_data(gzip.compress(data, compresslevel=5))
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        # Strong ETags are per representation, so the gzipped body gets its own
+        response.set_etag(f"{etag}-gzip")
+    response.headers["Content-Encoding"] = "gzip"
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
@@ -0,0 +1,46 @@
+# Author: SANJAY KR
+import re
+from datetime import date, datetime
+from typing import Any, Optional
+
+# The bot collects DD/MM/YYYY; older rows and sample data use ISO dates
+DATE_FORMATS = ("%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y", "%d.%m.%Y")
+
+# The same formats matched without strptime, which dominates bulk imports
+_DAY_FIRST = re.compile(r"(\d{1,2})([/.-])(\d{1,2})\2(\d{4})")
+_ISO = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})")
+
+def parse_date(value: Any) -> Optional[date]:
+    """Parse a member date in any accepted format; None if it is not a date."""
+    if value is None or isinstance(value, date):
+        return value.date() if isinstance(value, datetime) else value
+    value = str(value).strip()
+    match = _DAY_FIRST.fullmatch(value)
+    if match:
+        day, _, month, year = match.groups()
+    else:
+        match = _ISO.fullmatch(value)
+        if match:
+            year, month, day = match.groups()
+    if match:
+        try:
+            return date(int(year), int(month), int(day))
+        except ValueError:
+            return None
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+def month_day(value: Optional[date]) -> Optional[int]:
+    """Sortable MMDD number (e.g. 1018 for 18 October) for calendar lookups."""
+    return value.month * 100 + value.day if value is not None else None
+
+def age_on(birth_date: Optional[date], today: Optional[date] = None) -> Optional[int]:
+    """Completed years from birth_date to today; None without a birth date."""
+    if birth_date is None:
+        return None
+    today = today or date.today()
+    return today.year - birth_date.year - (month_day(today) < month_day(birth_date))
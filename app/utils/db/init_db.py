@@ -3,6 +3,7 @@ import json
 import os
 from app import create_app, db
 from app.models.family import Samaj, Member
+from app.migrations import stamp
 
 def init_db_with_sample_data():
     app = create_app()
@@ -10,6 +11,7 @@ def init_db_with_sample_data():
         # Clear existing data
         db.drop_all()
         db.create_all()
+        stamp(db.engine)
         
         # Load sample data
         with open(os.path.join(os.path.dirname(__file__), '../../../scripts/sample_data.json')) as f:
@@ -0,0 +1,22 @@
+# Author: SANJAY KR
+import unicodedata
+from urllib.parse import quote
+from werkzeug.http import dump_options_header
+
+def content_disposition(filename: str) -> str:
+    """Content-Disposition value offering filename as a download.
+
+    The name is quoted, so separators in it (e.g. from a samaj name) cannot
+    add parameters. A non-ASCII name is sent as an RFC 5987 filename*, with
+    an ASCII approximation in filename for older clients.
+    """
+    filename = "".join(ch for ch in filename if ch.isprintable())
+    try:
+        filename.encode("ascii")
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize("NFKD", filename).encode("ascii", "ignore").decode("ascii")
+        return dump_options_header("attachment", {
+            "filename": simple,
+            "filename*": f"UTF-8''{quote(filename, safe='!#$&+^`|')}"
+        })
+    return dump_options_header("attachment", {"filename": filename})
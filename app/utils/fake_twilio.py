@@ -0,0 +1,102 @@
+# Author: SANJAY KR
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+from urllib.parse import parse_qs
+
+_MESSAGES_PATH = re.compile(r"^/2010-04-01/Accounts/([^/]+)/Messages\.json$")
+
+class FakeTwilioHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep connections alive between requests
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        form = {key: values[0] for key, values in parse_qs(self.rfile.read(length).decode()).items()}
+        match = _MESSAGES_PATH.match(self.path.split("?")[0])
+        if not match:
+            self._reply(404, {"code": 20404, "message": "The requested resource was not found", "status": 404})
+            return
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if self.server.failure_rate and random.random() < self.server.failure_rate:
+            self._reply(503, {"code": 20503, "message": "Service unavailable", "status": 503})
+            return
+        now = formatdate(usegmt=True)
+        message = {
+            "sid": "SM" + uuid.uuid4().hex,
+            "account_sid": match.group(1),
+            "from": form.get("From"),
+            "to": form.get("To"),
+            "body": form.get("Body"),
+            "status": "queued",
+            "direction": "outbound-api",
+            "num_segments": "1",
+            "num_media": "0",
+            "api_version": "2010-04-01",
+            "date_created": now,
+            "date_updated": now,
+            "date_sent": None,
+            "error_code": None,
+            "error_message": None,
+            "price": None,
+            "price_unit": "USD",
+            "uri": f"/2010-04-01/Accounts/{match.group(1)}/Messages/SM.json"
+        }
+        with self.server.lock:
+            self.server.messages.append(message)
+        self._reply(201, message)
+
+class FakeTwilioServer(ThreadingHTTPServer):
+    """Local stand-in for the Twilio Messages API.
+
+    Accepts message creates on the real API path, records them in
+    .messages and can add artificial latency or random 503 failures, so
+    sending can be tested and benchmarked without network access.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, failure_rate: float = 0.0):
+        super().__init__((host, port), FakeTwilioHandler)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.lock = threading.Lock()
+        self.messages: List[Dict[str, Any]] = []
+        self.connections = 0
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeTwilioServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
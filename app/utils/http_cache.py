@@ -0,0 +1,58 @@
+# Author: SANJAY KR
+import hashlib
+import time
+from functools import wraps
+from typing import Callable
+from flask import Response, current_app, make_response, request
+from ..models.routing import read_from_primary
+from ..services.response_cache import CachedResponse, get_response_cache
+
+# Response headers replayed from the cache along with the body
+CACHED_HEADERS = ("X-Next-Cursor",)
+
+def _cache_key(version: int) -> str:
+    query = "&".join(f"{key}={value}" for key, value in sorted(request.args.items(multi=True)))
+    return f"{version}:{request.path}?{query}"
+
+def cached_response(view: Callable) -> Callable:
+    """Serve a GET view from the response cache with a strong ETag.
+
+    Clients sending a matching If-None-Match get 304 Not Modified. Only
+    successful, non-streamed responses are cached. For REPLICA_LAG_SECONDS
+    after a write the view reads from the primary, since a replica may not
+    have the write yet and its answer would be cached under the new version.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        cache = get_response_cache()
+        if cache is None or request.method != "GET":
+            return view(*args, **kwargs)
+        key = _cache_key(cache.version())
+        entry = cache.get(key)
+        if entry is None:
+            lag = current_app.config.get("REPLICA_LAG_SECONDS", 5)
+            if current_app.extensions.get("replica_router") is not None and time.time() - cache.bumped_at() < lag:
+                read_from_primary()
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.is_streamed:
+                return response
+            body = response.get_data()
+            entry = CachedResponse(
+                body=body,
+                mimetype=response.mimetype,
+                etag=hashlib.sha256(body).hexdigest()[:32],
+                headers=tuple((name, response.headers[name]) for name in CACHED_HEADERS if name in response.headers)
+            )
+            cache.set(key, entry)
+        # gzip_response marks compressed variants with a "-gzip" suffix
+        for etag in (entry.etag, f"{entry.etag}-gzip"):
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+                response.set_etag(etag)
+                return response
+        response = Response(entry.body, mimetype=entry.mimetype, headers=list(entry.headers))
+        response.set_etag(entry.etag)
+        # Let browsers keep a copy but revalidate it every time
+        response.headers["Cache-Control"] = "private, no-cache"
+        return response
+    return wrapper
@@ -0,0 +1,71 @@
+# Author: SANJAY KR
+"""Which process owns a spool file or a job.
+
+A pid is not enough: in a container the app runs as pid 1 after every
+restart, so a restarted process would take files left by its crashed
+predecessor for its own. Each process start instead gets a random instance
+id and holds an flock on <lock_dir>/<instance>.lock for as long as it runs;
+the kernel drops the lock when the process exits, however it exits.
+"""
+import fcntl
+import os
+import threading
+import uuid
+from typing import Dict, Optional, Tuple
+
+_lock = threading.Lock()
+# (pid, instance id): regenerated in a forked child, which is a new instance
+_instance: Optional[Tuple[int, str]] = None
+# Lock files held by this instance, kept open for the life of the process
+_held: Dict[str, int] = {}
+
+def instance_id() -> str:
+    """Random id of this process start; never contains "-"."""
+    global _instance
+    with _lock:
+        if _instance is None or _instance[0] != os.getpid():
+            _instance = (os.getpid(), uuid.uuid4().hex[:16])
+            _held.clear()
+        return _instance[1]
+
+def _lock_path(lock_dir: str, instance: str) -> str:
+    return os.path.join(lock_dir, f"{instance}.lock")
+
+def hold_instance_lock(lock_dir: str) -> str:
+    """Mark this instance as alive in lock_dir; returns the instance id."""
+    instance = instance_id()
+    path = _lock_path(lock_dir, instance)
+    with _lock:
+        if path not in _held:
+            os.makedirs(lock_dir, exist_ok=True)
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            _held[path] = fd
+    return instance
+
+def instance_alive(lock_dir: str, instance: str) -> bool:
+    """True if the instance still holds its lock in lock_dir."""
+    if instance == instance_id():
+        return True
+    path = _lock_path(lock_dir, instance)
+    try:
+        fd = os.open(path, os.O_RDWR)
+    except FileNotFoundError:
+        return False
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return True
+    finally:
+        os.close(fd)
+    # Nobody holds it: the instance has exited, so its lock file can go
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    return False
+
+def owned_by_dead_process(lock_dir: str, filename: str) -> bool:
+    """True for spool files named "<instance>-..." whose instance has exited."""
+    owner = filename.split("-", 1)[0]
+    return bool(owner) and not instance_alive(lock_dir, owner)
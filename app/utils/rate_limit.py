@@ -0,0 +1,28 @@
+# Author: SANJAY KR
+import threading
+import time
+
+class RateLimiter:
+    """Spaces calls to acquire() at most rate per second across threads."""
+
+    def __init__(self, rate: float, clock=time.monotonic, sleep=time.sleep):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.clock = clock
+        self.sleep = sleep
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = self.clock()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            self.sleep(slot - now)
+
+    def penalize(self, seconds: float) -> None:
+        """Push every following slot back, e.g. after the provider answers 429."""
+        with self._lock:
+            self._next = max(self._next, self.clock()) + seconds
@@ -11,17 +11,114 @@ class Config:
     
     # JWT Configuration
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "development-secret-key-do-not-use-in-production")
-    JWT_ALGORITHM = "HS256"
+    JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+    # Verified tokens are cached until they expire; logged-out ones are
+    # remembered per process (memory) or across workers (redis)
+    TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "1024"))
+    TOKEN_REVOCATION_BACKEND = os.getenv("TOKEN_REVOCATION_BACKEND", "memory")
     
     # Database Configuration
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL", "postgresql://postgres:postgres@db:5432/whatsapp_bot")
+    # One pool per process, shared by requests and background writers
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    # Comma-separated read replica URLs for admin reads and exports
+    DATABASE_REPLICA_URLS = os.getenv("DATABASE_REPLICA_URLS", "")
+    REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", "30"))
+    # Cached admin responses are rendered from the primary for this long after a write
+    REPLICA_LAG_SECONDS = float(os.getenv("REPLICA_LAG_SECONDS", "5"))
+    # Statement timeouts in milliseconds (PostgreSQL only, 0 disables)
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+    WEBHOOK_STATEMENT_TIMEOUT_MS = int(os.getenv("WEBHOOK_STATEMENT_TIMEOUT_MS", "5000"))
+    ADMIN_STATEMENT_TIMEOUT_MS = int(os.getenv("ADMIN_STATEMENT_TIMEOUT_MS", "30000"))
     
     # Twilio Configuration
     TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
     TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
     TWILIO_PHONE_NUMBER = "whatsapp:+14155238886"
+    # Connection pool for the Twilio API; the base URL can point at a local fake API
+    TWILIO_HTTP_POOL_SIZE = int(os.getenv("TWILIO_HTTP_POOL_SIZE", "10"))
+    TWILIO_HTTP_TIMEOUT = float(os.getenv("TWILIO_HTTP_TIMEOUT", "10"))
+    TWILIO_API_BASE_URL = os.getenv("TWILIO_API_BASE_URL")
+    # "rest" sends replies through the Twilio API, "twiml" returns them in the webhook response
+    WEBHOOK_REPLY_MODE = os.getenv("WEBHOOK_REPLY_MODE", "rest")
+    
+    # Session Store Configuration (journal, memory, sqlite or redis)
+    SESSION_BACKEND = os.getenv("SESSION_BACKEND", "journal")
+    SESSION_SQLITE_PATH = os.getenv("SESSION_SQLITE_PATH", "sessions.db")
+    # In-memory sessions replayed from this append-only file after a restart
+    SESSION_JOURNAL_PATH = os.getenv("SESSION_JOURNAL_PATH", "spool/sessions.journal")
+    SESSION_JOURNAL_FSYNC_SECONDS = float(os.getenv("SESSION_JOURNAL_FSYNC_SECONDS", "0.05"))
+    SESSION_JOURNAL_COMPACT_EVERY = int(os.getenv("SESSION_JOURNAL_COMPACT_EVERY", "10000"))
+    REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", "86400"))
+    SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "10000"))
+    
+    # Webhook Deduplication Configuration (memory or redis)
+    DEDUP_BACKEND = os.getenv("DEDUP_BACKEND", "memory")
+    DEDUP_TTL_SECONDS = int(os.getenv("DEDUP_TTL_SECONDS", "3600"))
+    DEDUP_MAX_ENTRIES = int(os.getenv("DEDUP_MAX_ENTRIES", "100000"))
+    
+    # Outbound Message Queue Configuration
+    OUTBOUND_ASYNC = os.getenv("OUTBOUND_ASYNC", "true").lower() == "true"
+    OUTBOUND_WORKERS = int(os.getenv("OUTBOUND_WORKERS", "4"))
+    OUTBOUND_MAX_RETRIES = int(os.getenv("OUTBOUND_MAX_RETRIES", "5"))
+    OUTBOUND_BACKOFF_SECONDS = float(os.getenv("OUTBOUND_BACKOFF_SECONDS", "1.0"))
+    OUTBOUND_BACKOFF_MAX_SECONDS = float(os.getenv("OUTBOUND_BACKOFF_MAX_SECONDS", "60"))
+    OUTBOUND_SPOOL_DIR = os.getenv("OUTBOUND_SPOOL_DIR", "spool/outbound")
+    OUTBOUND_QUEUE_SIZE = int(os.getenv("OUTBOUND_QUEUE_SIZE", "10000"))
+    
+    # Completed registrations are buffered and saved in batches
+    REGISTRATION_WRITE_BEHIND = os.getenv("REGISTRATION_WRITE_BEHIND", "true").lower() == "true"
+    REGISTRATION_BATCH_SIZE = int(os.getenv("REGISTRATION_BATCH_SIZE", "100"))
+    REGISTRATION_FLUSH_SECONDS = float(os.getenv("REGISTRATION_FLUSH_SECONDS", "2"))
+    REGISTRATION_SPOOL_DIR = os.getenv("REGISTRATION_SPOOL_DIR", "spool/registrations")
+    
+    # Schema migrations (see app/migrations) are applied when the app starts
+    MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "true").lower() == "true"
+    MIGRATION_BATCH_SIZE = int(os.getenv("MIGRATION_BATCH_SIZE", "1000"))
+    
+    # Admin broadcasts: concurrent senders and a ceiling on messages per second
+    BROADCAST_WORKERS = int(os.getenv("BROADCAST_WORKERS", "8"))
+    BROADCAST_RATE_PER_SECOND = float(os.getenv("BROADCAST_RATE_PER_SECOND", "10"))
+    BROADCAST_BATCH_SIZE = int(os.getenv("BROADCAST_BATCH_SIZE", "100"))
+    BROADCAST_MAX_RETRIES = int(os.getenv("BROADCAST_MAX_RETRIES", "3"))
+    # Country code (e.g. 91) for stored numbers without one; such numbers
+    # are skipped when it is not set
+    DEFAULT_COUNTRY_CODE = os.getenv("DEFAULT_COUNTRY_CODE", "")
+    # Lock files telling which processes on this host still run their broadcasts
+    BROADCAST_LOCK_DIR = os.getenv("BROADCAST_LOCK_DIR", "spool/broadcasts")
+    
+    # Daily greetings ({name} and {samaj} are filled in), sent by `flask send-greetings`
+    GREETING_BIRTHDAY_MESSAGE = os.getenv(
+        "GREETING_BIRTHDAY_MESSAGE", "Happy birthday, {name}! Warm wishes from everyone at {samaj}."
+    )
+    GREETING_ANNIVERSARY_MESSAGE = os.getenv(
+        "GREETING_ANNIVERSARY_MESSAGE", "Happy anniversary, {name}! Warm wishes from everyone at {samaj}."
+    )
+    GREETING_BATCH_SIZE = int(os.getenv("GREETING_BATCH_SIZE", "500"))
+    
+    # Bulk member import: validation processes (0 validates in the request thread),
+    # rows per validation chunk and per insert, and rejected rows listed in the report
+    IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "4"))
+    IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+    IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "5000"))
+    IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+    
+    # Admin response cache (memory, redis or none), invalidated by member/samaj writes
+    RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+    RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    RESPONSE_CACHE_MAX_ENTRY_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRY_BYTES", str(2 * 1024 * 1024)))
+    RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+    
+    # Blood donor search results are cached this many seconds
+    DONOR_CACHE_SECONDS = float(os.getenv("DONOR_CACHE_SECONDS", "30"))
     
     # Admin Configuration
     ADMIN_USERNAME = os.getenv("ADMIN_USERNAME", "admin")
@@ -0,0 +1,72 @@
+# Author: SANJAY KR
+"""Measure Twilio send throughput and latency against a local fake Twilio API.
+
+    python scripts/bench_twilio.py --messages 2000 --threads 8 --latency 0.05
+    python scripts/bench_twilio.py --serve --port 8099   # run the fake API only
+"""
+import argparse
+import statistics
+import threading
+import time
+from twilio.rest import Client
+from app.services.twilio_http import PooledTwilioHttpClient
+from app.utils.fake_twilio import FakeTwilioServer
+
+def run_benchmark(url: str, messages: int, threads: int, pool_size: int) -> None:
+    client = Client("AC" + "0" * 32, "token", http_client=PooledTwilioHttpClient(pool_size=pool_size, base_url=url))
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(count: int) -> None:
+        for i in range(count):
+            started = time.perf_counter()
+            client.messages.create(from_="whatsapp:+14155238886", to="whatsapp:+919876543210", body=f"Benchmark {i}")
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    per_thread = messages // threads
+    workers = [threading.Thread(target=worker, args=(per_thread,)) for _ in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"Sent {len(latencies)} messages in {elapsed:.2f}s ({len(latencies) / elapsed:.1f} msg/s)")
+    print(f"Latency p50 {statistics.median(latencies) * 1000:.1f}ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f}ms")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--pool-size", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.0, help="artificial API latency in seconds")
+    parser.add_argument("--url", help="benchmark an already running API instead of starting one")
+    parser.add_argument("--serve", action="store_true", help="only run the fake API")
+    parser.add_argument("--port", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.url:
+        run_benchmark(args.url, args.messages, args.threads, args.pool_size)
+        return
+
+    server = FakeTwilioServer(port=args.port, latency=args.latency).start()
+    if args.serve:
+        print(f"Fake Twilio API listening on {server.url}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.stop()
+        return
+    try:
+        run_benchmark(server.url, args.messages, args.threads, args.pool_size)
+        print(f"Server saw {server.connections} connections")
+    finally:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
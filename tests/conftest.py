@@ -2,6 +2,9 @@
 import pytest
 import os
 from dotenv import load_dotenv
+from flask import Flask
+from app import db
+from app.services.samaj_cache import samaj_cache
 
 load_dotenv()
 
@@ -12,3 +15,19 @@ def env_setup():
     os.environ['JWT_SECRET_KEY'] = 'test-secret-key'
     os.environ['ADMIN_USERNAME'] = 'admin'
     os.environ['ADMIN_PASSWORD'] = 'admin'
+
+@pytest.fixture
+def app(tmp_path):
+    """Bare Flask app on an empty SQLite database, with its context pushed.
+
+    Test modules that need data override it with a fixture named app that
+    takes this one and seeds it."""
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'test.db'}"
+    app.config["BROADCAST_LOCK_DIR"] = str(tmp_path / "locks")
+    db.init_app(app)
+    # Names cached by earlier tests point at rows of their own databases
+    samaj_cache.invalidate()
+    with app.app_context():
+        db.create_all()
+        yield app
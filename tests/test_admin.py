@@ -72,3 +72,4 @@ def test_export_csv(client, auth_headers):
     response = client.get('/api/v1/admin/export/csv', headers=auth_headers)
     assert response.status_code == 200
     assert response.headers['Content-Type'] == 'text/csv'
+    assert response.headers['Content-Disposition'] == 'attachment; filename=members_all.csv'
@@ -0,0 +1,174 @@
+# Author: SANJAY KR
+import csv
+import pytest
+from io import StringIO
+from flask import Flask
+from sqlalchemy import event
+from app import db
+from app.models.family import Samaj, Member
+from app.controllers.admin_controller import (
+    MEMBER_FIELDS, export_members_csv, get_member_row, get_members, get_samaj_summary,
+    list_member_rows, parse_member_fields
+)
+from app.utils.compression import gzip_response
+from app.utils.downloads import content_disposition
+
+@pytest.fixture
+def app(app):
+    jain, patel = Samaj(name="Jain"), Samaj(name="Patel")
+    db.session.add_all([jain, patel])
+    db.session.flush()
+    for i in range(25):
+        db.session.add(Member(
+            samaj_id=(jain if i % 2 else patel).id,
+            name=f"Member {i}",
+            gender="Female" if i % 3 else "Male",
+            age=20 + i,
+            blood_group=["O+", "A-", "B+"][i % 3],
+            current_city=["Mumbai", "Pune"][i % 2],
+            mobile_1=f"98765432{i:02d}"
+        ))
+    db.session.commit()
+    return app
+
+def test_export_streams_in_chunks(app):
+    """Test the CSV export is produced incrementally"""
+    chunks, filename = export_members_csv(db.session, chunk_size=10)
+    chunks = list(chunks)
+    assert filename == "members_all.csv"
+    # Header plus three chunks of rows
+    assert len(chunks) == 4
+    rows = list(csv.reader(StringIO(b"".join(chunks).decode("utf-8"))))
+    assert rows[0][:3] == ["Name", "Gender", "Age"]
+    assert len(rows) == 26
+    assert rows[1][0] == "Member 0"
+
+def test_export_filtered_by_samaj(app):
+    """Test the export only includes the requested samaj"""
+    chunks, filename = export_members_csv(db.session, "Jain")
+    rows = list(csv.reader(StringIO(b"".join(chunks).decode("utf-8"))))
+    assert filename == "members_Jain.csv"
+    assert len(rows) == 13
+
+def test_member_pages_follow_cursor(app):
+    """Test keyset pages cover every member exactly once"""
+    seen, after = [], None
+    while True:
+        page, after = list_member_rows(db.session, fields=("id", "name"), after=after, limit=10)
+        seen.extend(page)
+        if after is None:
+            break
+    assert len(seen) == 25
+    assert [row["id"] for row in seen] == sorted(row["id"] for row in seen)
+    assert set(seen[0]) == {"id", "name"}
+
+def test_member_page_filtered_by_samaj(app):
+    """Test the samaj filter applies to keyset pages"""
+    page, after = list_member_rows(db.session, "Jain", ("id", "current_city"), limit=100)
+    assert after is None
+    assert len(page) == 12
+    assert {row["current_city"] for row in page} == {"Pune"}
+
+def test_parse_member_fields():
+    """Test field projection parsing always keeps the id"""
+    assert parse_member_fields("name,age,name") == ("id", "name", "age")
+    assert parse_member_fields(None) == MEMBER_FIELDS
+    with pytest.raises(ValueError):
+        parse_member_fields("name,password")
+
+def test_get_member_row(app):
+    """Test a single member serializes without ORM state"""
+    row = get_member_row(db.session, 1)
+    assert row["name"] == "Member 0"
+    assert "_sa_instance_state" not in row
+    assert get_member_row(db.session, 999) is None
+
+def test_large_json_is_gzipped():
+    """Test large responses are compressed only when the client accepts gzip"""
+    import gzip
+    import json
+    app = Flask(__name__)
+    app.after_request(gzip_response)
+
+    @app.route("/big")
+    def big():
+        return json.dumps(["x" * 10] * 500)
+
+    client = app.test_client()
+    response = client.get("/big", headers={"Accept-Encoding": "gzip, deflate"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(response.data)) == ["x" * 10] * 500
+    assert "Content-Encoding" not in client.get("/big").headers
+
+def test_content_disposition_quotes_filename():
+    """Test download names taken from samaj names cannot inject parameters and may be non-ASCII"""
+    assert content_disposition('members_Jain; x="1".csv') == 'attachment; filename="members_Jain; x=\\"1\\".csv"'
+    assert content_disposition("members_Jain\r\nSet-Cookie: a.csv") == 'attachment; filename="members_JainSet-Cookie: a.csv"'
+    assert content_disposition("members_Café.csv") == (
+        "attachment; filename=members_Cafe.csv; filename*=UTF-8''members_Caf%C3%A9.csv"
+    )
+
+def test_samaj_summary(app):
+    """Test the samaj summary aggregates members in a single query"""
+    statements = []
+    event.listen(db.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    summary = get_samaj_summary(db.session)
+    assert len(statements) == 1
+    jain = next(row for row in summary if row["name"] == "Jain")
+    assert jain["members"] == 12
+    assert jain["gender"]["male"] + jain["gender"]["female"] + jain["gender"]["other"] == 12
+    assert jain["age_range"] == {"min": 21, "max": 43}
+
+def test_samaj_summary_counts_gender_letters(app):
+    """Test genders stored as M/F (as in the sample data) are counted as male/female"""
+    samaj = Samaj(name="Sample")
+    db.session.add(samaj)
+    db.session.flush()
+    for gender in ("M", "m", "Male", "F", "female ", "Other", None):
+        db.session.add(Member(samaj_id=samaj.id, name="Sample", gender=gender))
+    db.session.commit()
+    sample = next(row for row in get_samaj_summary(db.session) if row["name"] == "Sample")
+    assert sample["gender"] == {"male": 3, "female": 2, "other": 2}
+
+def test_member_samaj_loaded_with_members(app):
+    """Test listing members never lazy-loads their samaj row by row"""
+    statements = []
+    event.listen(db.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    members = get_members(db.session)
+    assert [repr(member) for member in members][0] == "<Member Member 0 of Patel>"
+    assert len(statements) == 1
+
+def test_age_served_from_birth_date(app):
+    """Test admin views give the age as of today where a birth date is known"""
+    from datetime import date
+    from app.utils.dates import age_on
+    today = date.today()
+    samaj = Samaj(name="Dated")
+    db.session.add(samaj)
+    db.session.flush()
+    # Ages given at registration years ago
+    new_year = Member(samaj_id=samaj.id, name="New Year", age=25, birth_date=date(today.year - 40, 1, 1))
+    year_end = Member(samaj_id=samaj.id, name="Year End", age=10, birth_date=date(today.year - 30, 12, 31))
+    undated = Member(samaj_id=samaj.id, name="Undated", age=50)
+    db.session.add_all([new_year, year_end, undated])
+    db.session.commit()
+    year_end_age = age_on(year_end.birth_date)
+    assert year_end_age == (30 if (today.month, today.day) == (12, 31) else 29)
+    assert new_year.current_age == 40
+
+    page, _ = list_member_rows(db.session, "Dated", ("id", "name", "age"))
+    assert {row["name"]: row["age"] for row in page} == {"New Year": 40, "Year End": year_end_age, "Undated": 50}
+    assert get_member_row(db.session, new_year.id)["age"] == 40
+    dated = next(row for row in get_samaj_summary(db.session) if row["name"] == "Dated")
+    assert dated["age_range"] == {"min": year_end_age, "max": 50}
+    chunks, _ = export_members_csv(db.session, "Dated")
+    rows = list(csv.reader(StringIO(b"".join(chunks).decode("utf-8"))))
+    assert {row[0]: row[2] for row in rows[1:]} == {"New Year": "40", "Year End": str(year_end_age), "Undated": "50"}
+
+def test_age_on():
+    """Test ages count completed years up to the day"""
+    from datetime import date
+    from app.utils.dates import age_on
+    assert age_on(date(1990, 6, 15), date(2026, 6, 14)) == 35
+    assert age_on(date(1990, 6, 15), date(2026, 6, 15)) == 36
+    assert age_on(None) is None
@@ -37,3 +37,14 @@ def test_login_missing_credentials(client):
     """Test login with missing credentials"""
     response = client.post('/api/v1/auth/token', data={})
     assert response.status_code == 400
+
+def test_logout_revokes_token(client):
+    """Test a token stops working after logout"""
+    token = client.post('/api/v1/auth/token', data={
+        'username': 'admin',
+        'password': 'admin'
+    }).json['access_token']
+    headers = {'Authorization': f'Bearer {token}'}
+    assert client.get('/api/v1/admin/samaj', headers=headers).status_code == 200
+    assert client.post('/api/v1/auth/logout', headers=headers).status_code == 200
+    assert client.get('/api/v1/admin/samaj', headers=headers).status_code == 401
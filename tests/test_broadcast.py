@@ -0,0 +1,166 @@
+# Author: SANJAY KR
+import fcntl
+import socket
+import threading
+import pytest
+from app import db
+from app.models.family import Samaj, Member
+from app.models.broadcast import Broadcast, BroadcastRecipient
+from app.services.broadcast import init_broadcasts, normalize_number, resume_when_serving
+from app.utils.rate_limit import RateLimiter
+
+class Sender:
+    def __init__(self, fail=()):
+        self.calls = []
+        self.fail = set(fail)
+        self.lock = threading.Lock()
+
+    def __call__(self, to, message):
+        with self.lock:
+            self.calls.append((to, message))
+        return to not in self.fail
+
+@pytest.fixture
+def app(app):
+    app.config.update(BROADCAST_BATCH_SIZE=4, BROADCAST_RATE_PER_SECOND=0, BROADCAST_WORKERS=3)
+    jain, patel = Samaj(name="Jain"), Samaj(name="Patel")
+    db.session.add_all([jain, patel])
+    db.session.flush()
+    for i in range(10):
+        db.session.add(Member(samaj_id=jain.id, name=f"Jain {i}", mobile_1=f"+9198765432{i % 8:02d}"))
+    db.session.add(Member(samaj_id=jain.id, name="No phone", mobile_1="n/a"))
+    db.session.add(Member(samaj_id=patel.id, name="Patel", mobile_1="919000000001"))
+    db.session.commit()
+    return app
+
+def run(app, sender, samaj_name=None):
+    runner = init_broadcasts(app, sender)
+    broadcast = runner.create("Diwali meet on Sunday", samaj_name)
+    assert runner.start(broadcast.id)
+    runner.join(broadcast.id, timeout=10)
+    return db.session.get(Broadcast, broadcast.id, populate_existing=True)
+
+def test_normalize_number():
+    """Test stored numbers are reduced to E.164"""
+    assert normalize_number(" 91 98765 43210") == "+919876543210"
+    assert normalize_number("whatsapp:+14155238886") == "+14155238886"
+    assert normalize_number("n/a") is None
+    assert normalize_number("0044 20 7946 0958") == "+442079460958"
+
+def test_local_numbers_need_a_default_country_code():
+    """Test numbers stored without a country code are not guessed"""
+    assert normalize_number("9876543210") is None
+    assert normalize_number("9876543210", "91") == "+919876543210"
+    assert normalize_number("09876543210", "+91") == "+919876543210"
+    assert normalize_number("919876543210", "1") == "+919876543210"
+
+def test_local_numbers_sent_with_default_country_code(app):
+    """Test local numbers are skipped, or sent with DEFAULT_COUNTRY_CODE when it is set"""
+    patel = db.session.query(Samaj).filter_by(name="Patel").one()
+    db.session.add(Member(samaj_id=patel.id, name="Local", mobile_1="9876543210"))
+    db.session.commit()
+    broadcast = run(app, Sender(), "Patel")
+    assert (broadcast.sent, broadcast.skipped) == (1, 1)
+    app.config["DEFAULT_COUNTRY_CODE"] = "91"
+    sender = Sender()
+    broadcast = run(app, sender, "Patel")
+    assert sorted(to for to, _ in sender.calls) == ["+919000000001", "+919876543210"]
+
+def test_broadcast_dedupes_and_filters(app):
+    """Test every distinct valid number in the samaj is messaged once"""
+    sender = Sender()
+    broadcast = run(app, sender, "Jain")
+    assert broadcast.status == "completed"
+    assert len(sender.calls) == 8
+    assert len({to for to, _ in sender.calls}) == 8
+    assert broadcast.sent == 8
+    assert broadcast.skipped == 3
+    assert "+919000000001" not in {to for to, _ in sender.calls}
+
+def test_failures_recorded(app):
+    """Test permanent failures are counted and marked on the recipient"""
+    broadcast = run(app, Sender(fail={"+919000000001"}))
+    assert (broadcast.sent, broadcast.failed) == (8, 1)
+    recipient = db.session.get(BroadcastRecipient, (broadcast.id, "+919000000001"))
+    assert recipient.status == "failed"
+
+def test_interrupted_broadcast_resumes(app):
+    """Test a job left running by a dead process continues after its checkpoint"""
+    sender = Sender()
+    broadcast = Broadcast(message="Resume me", status="running", owner=f"{socket.gethostname()}:0a1b2c3d4e5f6a7b",
+                          last_member_id=4, sent=4)
+    db.session.add(broadcast)
+    db.session.flush()
+    # Numbers of the first checkpointed batch were already sent
+    for i in range(4):
+        db.session.add(BroadcastRecipient(broadcast_id=broadcast.id, phone=f"+9198765432{i:02d}", status="sent"))
+    db.session.commit()
+    runner = init_broadcasts(app, sender)
+    assert runner.resume_interrupted() == [broadcast.id]
+    runner.join(broadcast.id, timeout=10)
+    broadcast = db.session.get(Broadcast, broadcast.id, populate_existing=True)
+    assert broadcast.status == "completed"
+    sent_to = sorted(to for to, _ in sender.calls)
+    assert sent_to == sorted([f"+9198765432{i:02d}" for i in range(4, 8)] + ["+919000000001"])
+    assert broadcast.sent == 9
+
+def test_live_owner_not_resumed(app, tmp_path):
+    """Test a job owned by a running process is left alone"""
+    broadcast = Broadcast(message="Busy", status="running", owner=f"{socket.gethostname()}:feedfacecafebeef")
+    db.session.add(broadcast)
+    db.session.commit()
+    runner = init_broadcasts(app, Sender())
+    with open(tmp_path / "locks" / "feedfacecafebeef.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        assert runner.resume_interrupted() == []
+
+def test_job_of_crashed_predecessor_resumed(app, tmp_path):
+    """Test a job is resumed when its owner's lock file is left over but no longer held"""
+    broadcast = Broadcast(message="Resume me", status="running", owner=f"{socket.gethostname()}:0123456789abcdef")
+    db.session.add(broadcast)
+    db.session.commit()
+    runner = init_broadcasts(app, Sender())
+    (tmp_path / "locks" / "0123456789abcdef.lock").touch()
+    assert runner.resume_interrupted() == [broadcast.id]
+    runner.join(broadcast.id, timeout=10)
+    assert not (tmp_path / "locks" / "0123456789abcdef.lock").exists()
+
+def test_resumed_only_when_serving(app, tmp_path):
+    """Test building the app (as CLI commands do) leaves interrupted jobs alone until a request is served"""
+    broadcast = Broadcast(message="Resume me", status="running", owner=f"{socket.gethostname()}:0123456789abcdef")
+    db.session.add(broadcast)
+    db.session.commit()
+    runner = init_broadcasts(app, Sender())
+    resume_when_serving(app, runner)
+    assert db.session.get(Broadcast, broadcast.id).owner.endswith(":0123456789abcdef")
+    client = app.test_client()
+    client.get("/")
+    runner.join(broadcast.id, timeout=10)
+    broadcast = db.session.get(Broadcast, broadcast.id, populate_existing=True)
+    assert broadcast.owner == runner.owner
+    assert broadcast.status == "completed"
+
+def test_cancelled_broadcast_stops(app):
+    """Test cancelling stops the job before its next batch"""
+    gate = threading.Event()
+    runner = init_broadcasts(app, lambda to, message: gate.wait(5))
+    broadcast = runner.create("Cancelled")
+    runner.start(broadcast.id)
+    assert runner.cancel(broadcast.id)
+    gate.set()
+    runner.join(broadcast.id, timeout=10)
+    broadcast = db.session.get(Broadcast, broadcast.id, populate_existing=True)
+    assert broadcast.status == "cancelled"
+    assert broadcast.sent <= 4
+
+def test_rate_limiter_spaces_calls():
+    """Test the limiter hands out one slot per interval and backs off on demand"""
+    now = [0.0]
+    slept = []
+    limiter = RateLimiter(10, clock=lambda: now[0], sleep=slept.append)
+    for _ in range(3):
+        limiter.acquire()
+    assert slept == pytest.approx([0.1, 0.2])
+    limiter.penalize(1.0)
+    limiter.acquire()
+    assert slept[-1] == pytest.approx(1.3)
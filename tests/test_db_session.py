@@ -0,0 +1,47 @@
+# Author: SANJAY KR
+from flask import Flask, g
+from app import db
+from app.models.base import engine_options, get_db, statement_timeout
+
+def test_engine_options_for_postgres():
+    """Test pool sizing, pre-ping and the default statement timeout"""
+    options = engine_options({
+        "SQLALCHEMY_DATABASE_URI": "postgresql://user@db/app",
+        "DB_POOL_SIZE": 20,
+        "DB_MAX_OVERFLOW": 0,
+        "DB_STATEMENT_TIMEOUT_MS": 15000
+    })
+    assert options["pool_size"] == 20
+    assert options["max_overflow"] == 0
+    assert options["pool_pre_ping"] is True
+    assert options["connect_args"] == {"options": "-c statement_timeout=15000"}
+
+def test_engine_options_for_sqlite():
+    """Test SQLite keeps its own pool and gets no server timeout"""
+    options = engine_options({"SQLALCHEMY_DATABASE_URI": "sqlite:///test.db", "DB_STATEMENT_TIMEOUT_MS": 100})
+    assert "pool_size" not in options
+    assert "connect_args" not in options
+
+def test_one_session_per_request_closed_on_teardown(tmp_path):
+    """Test views share the Flask-SQLAlchemy session and it is released afterwards"""
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'test.db'}"
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config)
+    app.config["VIEW_TIMEOUT_MS"] = 250
+    db.init_app(app)
+    seen = {}
+
+    @app.route("/")
+    @statement_timeout("VIEW_TIMEOUT_MS")
+    def view():
+        session = get_db()
+        seen["same"] = session is get_db() and session.get_bind() is db.engine
+        seen["timeout"] = g.statement_timeout
+        session.execute(db.text("SELECT 1"))
+        return "ok"
+
+    client = app.test_client()
+    assert client.get("/").data == b"ok"
+    assert seen == {"same": True, "timeout": 250}
+    with app.app_context():
+        assert db.engine.pool.checkedout() == 0
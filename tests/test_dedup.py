@@ -0,0 +1,46 @@
+# Author: SANJAY KR
+import pytest
+import fakeredis
+from app.services.dedup import MemoryDeduplicator, RedisDeduplicator
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture(params=["memory", "redis"])
+def dedup(request):
+    if request.param == "memory":
+        return MemoryDeduplicator(ttl=60)
+    return RedisDeduplicator(client=fakeredis.FakeRedis(), ttl=60)
+
+def test_duplicate_detected(dedup):
+    """Test the second delivery of a MessageSid is reported as seen"""
+    assert not dedup.seen("SM1")
+    assert dedup.seen("SM1")
+    assert not dedup.seen("SM2")
+
+def test_forget_allows_retry(dedup):
+    """Test a forgotten MessageSid is processed again"""
+    dedup.seen("SM1")
+    dedup.forget("SM1")
+    assert not dedup.seen("SM1")
+
+def test_memory_entries_expire():
+    """Test MessageSids are forgotten after the TTL"""
+    clock = FakeClock()
+    dedup = MemoryDeduplicator(ttl=60, clock=clock)
+    dedup.seen("SM1")
+    clock.now += 61
+    assert not dedup.seen("SM1")
+    assert len(dedup) == 1
+
+def test_memory_cache_is_bounded():
+    """Test the oldest MessageSids are dropped beyond the size limit"""
+    dedup = MemoryDeduplicator(max_entries=2)
+    for sid in ("SM1", "SM2", "SM3"):
+        dedup.seen(sid)
+    assert len(dedup) == 2
+    assert not dedup.seen("SM1")
@@ -0,0 +1,69 @@
+# Author: SANJAY KR
+import pytest
+from sqlalchemy import text
+from app import db
+from app.models.family import Samaj, Member
+from app.services.donors import find_donors, find_donors_cached, get_donor_cache
+from app.utils.ttl_cache import TTLCache
+
+@pytest.fixture
+def app(app):
+    samaj = Samaj(name="Jain")
+    db.session.add(samaj)
+    db.session.flush()
+    for i, (group, city) in enumerate([
+        ("O-", "Pune"), ("a+", " pune "), ("A+", "Mumbai"), ("O+", "PUNE"),
+        ("B+", "Pune"), ("A-", "Pune"), ("AB+", "Pune")
+    ]):
+        db.session.add(Member(samaj_id=samaj.id, name=f"Donor {i}", blood_group=group, current_city=city))
+    db.session.commit()
+    return app
+
+def test_exact_match_normalizes_text(app):
+    """Test blood group and city match regardless of case and spaces"""
+    donors = find_donors(db.session, "a+", "Pune", compatible=False)
+    assert [donor["name"] for donor in donors] == ["Donor 1"]
+    assert donors[0]["blood_group"] == "A+"
+    assert donors[0]["samaj"] == "Jain"
+
+def test_compatible_donors_best_match_first(app):
+    """Test compatible groups are included after exact matches"""
+    donors = find_donors(db.session, "A+", "pune")
+    assert [donor["blood_group"] for donor in donors] == ["A+", "A-", "O+", "O-"]
+    assert [donor["blood_group"] for donor in find_donors(db.session, "O-", "Pune")] == ["O-"]
+    assert len(find_donors(db.session, "A+", "Pune", limit=2)) == 2
+
+def test_plus_decoded_as_space(app):
+    """Test an unescaped + from a query string still matches"""
+    assert len(find_donors(db.session, "AB ", "Pune", compatible=False)) == 1
+    with pytest.raises(ValueError):
+        find_donors(db.session, "C+", "Pune")
+
+def test_lookup_uses_donor_index(app):
+    """Test the lookup query is answered from the composite index"""
+    plan = db.session.execute(text(
+        "EXPLAIN QUERY PLAN SELECT id FROM member "
+        "WHERE upper(trim(blood_group)) = 'A+' AND lower(trim(current_city)) = 'pune'"
+    )).all()
+    assert "ix_member_donor" in " ".join(str(row) for row in plan)
+
+def test_results_cached(app):
+    """Test repeated lookups are served from the cache until it expires"""
+    first = find_donors_cached(db.session, "B+", "Pune")
+    db.session.add(Member(samaj_id=1, name="Late donor", blood_group="B+", current_city="Pune"))
+    db.session.commit()
+    assert find_donors_cached(db.session, "b+", " pune") == first
+    get_donor_cache().clear()
+    assert len(find_donors_cached(db.session, "B+", "Pune")) == len(first) + 1
+
+def test_ttl_cache_expires():
+    """Test cache entries expire and the least recently used are evicted"""
+    now = [0.0]
+    cache = TTLCache(ttl=10, max_entries=2, clock=lambda: now[0])
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    now[0] = 11
+    assert cache.get("a") is None
@@ -0,0 +1,96 @@
+# Author: SANJAY KR
+import pytest
+from app.services.flows import FLOWS, TRIGGERS, REGISTRATION, compile_flow
+
+def test_registration_flow_compiled():
+    """Test the registration questionnaire is loaded and indexed"""
+    assert FLOWS["registration"] is REGISTRATION
+    assert TRIGGERS["start"] is REGISTRATION
+    assert len(REGISTRATION.steps) == 27
+    assert REGISTRATION.fields[0] == "samaj"
+    assert REGISTRATION.fields[-1] == "volunteer_interests"
+    assert REGISTRATION.index["email"] == REGISTRATION.fields.index("email")
+    assert REGISTRATION.first_prompt() == "Welcome to Family & Samaj Data Collection Bot!\nPlease enter your Samaj name:"
+
+@pytest.mark.parametrize("field,value,expected", [
+    ("gender", "female", (True, "female")),
+    ("gender", "unknown", (False, "Please enter Male, Female, or Other")),
+    ("age", "121", (False, "Please enter a valid age between 0 and 120")),
+    ("age", "30", (True, "30")),
+    ("blood_group", "ab+", (True, "ab+")),
+    ("mobile_1", "98765", (False, "Please enter a valid 10-digit mobile number")),
+    ("mobile_2", "SKIP", (True, None)),
+    ("email", "john@example", (False, "Please enter a valid email address")),
+    ("birth_date", "01/02/1990", (True, "01/02/1990")),
+    ("birth_date", "1990-2-1", (True, "1990-2-1")),
+    ("birth_date", "31.02.1990", (False, "Please enter date in DD/MM/YYYY format")),
+    ("birth_date", "01/02-1990", (False, "Please enter date in DD/MM/YYYY format")),
+    ("anniversary_date", "skip", (True, None)),
+    ("name", "John Doe", (True, "John Doe")),
+    ("marital_status", "x" * 21, (False, "Please keep your marital status to 20 characters or fewer")),
+    ("medical_conditions", "skip", (True, None)),
+])
+def test_registration_validation(field, value, expected):
+    """Test answers are validated with the registration rules"""
+    assert REGISTRATION.steps[REGISTRATION.index[field]].parse(value) == expected
+
+def test_flow_is_immutable():
+    """Test compiled flows cannot be modified"""
+    with pytest.raises((TypeError, AttributeError)):
+        REGISTRATION.index["extra"] = 99
+    with pytest.raises(AttributeError):
+        REGISTRATION.name = "other"
+
+def test_ask_if_skips_steps():
+    """Test conditional steps are passed over when their condition fails"""
+    flow = compile_flow({
+        "name": "profile",
+        "steps": [
+            {"field": "marital_status", "prompt": "Marital status?"},
+            {"field": "anniversary_date", "prompt": "Anniversary?", "ask_if": {"field": "marital_status", "in": ["Married"]}},
+            {"field": "city", "prompt": "City?"}
+        ]
+    })
+    assert flow.trigger == "profile"
+    assert flow.next_step(0, ["married"]) == 1
+    assert flow.next_step(0, ["Single"]) == 2
+    assert flow.form_trigger is None
+
+def test_parse_all_checks_every_answer():
+    """Test a whole set of answers is validated at once, honouring ask_if"""
+    flow = compile_flow({
+        "name": "profile",
+        "form_trigger": "Profile Form",
+        "steps": [
+            {"field": "marital_status", "prompt": "Marital status?"},
+            {"field": "anniversary_date", "prompt": "Anniversary?", "validate": {"type": "date"},
+             "ask_if": {"field": "marital_status", "in": ["Married"]}},
+            {"field": "city", "prompt": "City?"}
+        ]
+    })
+    assert flow.form_trigger == "profile form"
+    assert flow.parse_all({"marital_status": "Single", "anniversary_date": "x", "city": " Pune "}) == (
+        {"marital_status": "Single", "city": "Pune"}, {}
+    )
+    values, errors = flow.parse_all({"marital_status": "Married", "anniversary_date": "x"})
+    assert values == {"marital_status": "Married"}
+    assert errors == {"anniversary_date": "Please enter a valid anniversary date", "city": "Missing city"}
+
+def test_registration_lengths_fit_member_columns():
+    """Test no registration answer can be longer than the column it is saved to"""
+    from app.services.write_behind import MEMBER_LENGTHS
+    for step in REGISTRATION.steps:
+        if step.field in MEMBER_LENGTHS and step.check is None:
+            assert step.max_length is not None and step.max_length <= MEMBER_LENGTHS[step.field], step.field
+
+def test_invalid_definitions_rejected():
+    """Test mistakes in a flow definition fail at load time"""
+    with pytest.raises(ValueError):
+        compile_flow({"name": "bad", "steps": [{"field": "x", "prompt": "X?", "max_length": 0}]})
+    with pytest.raises(ValueError):
+        compile_flow({"name": "bad", "steps": [{"field": "x", "prompt": "X?", "validate": {"type": "nope"}}]})
+    with pytest.raises(ValueError):
+        compile_flow({"name": "bad", "steps": [
+            {"field": "x", "prompt": "X?", "ask_if": {"field": "y", "in": ["1"]}},
+            {"field": "y", "prompt": "Y?"}
+        ]})
@@ -0,0 +1,93 @@
+# Author: SANJAY KR
+import pytest
+from flask import Flask
+from app.services.flows import REGISTRATION
+from app.services.forms import form_template, parse_form
+from app.services.whatsapp_service import WhatsAppService
+
+PHONE = "+919876543210"
+
+FILLED = """1. Samaj: Jain
+2. Name: Asha Shah
+3. Female
+4. Age: 34
+5. Blood group: O+
+6. Mobile 1: 9876543210
+7. Mobile 2 (optional):
+Education: MBA
+Occupation: Engineer
+Marital status: Married
+Address: 12 MG Road
+Pune
+Email: asha@example.com
+Birth date: 18/10/1990
+Anniversary date (optional): 01/02/2015
+15. Surat
+Current city: Pune
+Languages known: Gujarati, Hindi
+Skills: Python
+Hobbies: Music
+Emergency contact: 9876500000
+Relationship status: Married
+Family role: Head
+Dietary preferences: Vegetarian
+Profession category: IT"""
+
+@pytest.fixture
+def service():
+    app = Flask(__name__)
+    service = WhatsAppService()
+    # handle_message only checks a client is configured; replies are not sent here
+    service.client = object()
+    with app.app_context():
+        yield service
+
+def test_template_lists_every_question():
+    """Test the form numbers every field and marks optional ones"""
+    template = form_template(REGISTRATION)
+    assert "\n1. Samaj: " in template
+    assert "\n7. Mobile 2 (optional): " in template
+    assert template.count("\n") >= len(REGISTRATION.steps)
+
+def test_parse_labels_numbers_and_continuations():
+    """Test answers are read by label, by number and across lines"""
+    answers = parse_form(REGISTRATION, FILLED)
+    assert answers["gender"] == "Female"
+    assert answers["native_place"] == "Surat"
+    assert answers["address"] == "12 MG Road, Pune"
+    assert answers["anniversary_date"] == "01/02/2015"
+    assert "mobile_2" not in answers
+    assert parse_form(REGISTRATION, "Male", ["gender"]) == {"gender": "Male"}
+    assert parse_form(REGISTRATION, "Male", ["gender", "age"]) == {}
+
+def test_form_completed_in_one_message(service):
+    """Test a fully filled form completes the registration in one reply"""
+    assert service.handle_message(PHONE, "Form")[0].startswith(REGISTRATION.welcome)
+    reply, ok = service.handle_message(PHONE, FILLED)
+    assert ok and reply == REGISTRATION.complete
+    session = service.sessions.get(PHONE)
+    assert session.flow == "registration" and session.step == len(REGISTRATION.steps)
+    data = session.as_dict(REGISTRATION.fields)
+    assert data["samaj"] == "Jain" and data["mobile_2"] is None and data["volunteer_interests"] is None
+
+def test_only_invalid_and_missing_fields_asked_again(service):
+    """Test corrections ask for just the fields still needed"""
+    service.handle_message(PHONE, "form")
+    partial = FILLED.replace("4. Age: 34", "4. Age: 200").replace("Email: asha@example.com\n", "")
+    reply, _ = service.handle_message(PHONE, partial)
+    assert "- Age: Please enter a valid age between 0 and 120" in reply
+    assert "- Email: Missing email" in reply
+    assert "\n4. Age: " in reply and "Samaj" not in reply
+
+    reply, _ = service.handle_message(PHONE, "12. asha@example.com")
+    assert reply == "Please enter a valid age between 0 and 120\nPlease enter your age:"
+    reply, _ = service.handle_message(PHONE, "34")
+    assert reply == REGISTRATION.complete
+    assert service.sessions.get(PHONE).as_dict(REGISTRATION.fields)["age"] == "34"
+
+def test_unrecognised_reply_repeats_request(service):
+    """Test a reply with no answers in it gets the outstanding questions again"""
+    service.handle_message(PHONE, "form")
+    reply, _ = service.handle_message(PHONE, "hello?")
+    assert "- Samaj: Missing samaj" in reply
+    assert service.sessions.get(PHONE).step == 0
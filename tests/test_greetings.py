@@ -0,0 +1,130 @@
+# Author: SANJAY KR
+from datetime import date
+import pytest
+from app import db
+from app.models.family import Samaj, Member
+from app.models.greeting import Greeting
+from app.services.broadcast import init_broadcasts
+from app.services.greetings import celebrated_on, send_greetings
+from config.settings import Config
+
+class Sender:
+    def __init__(self, fail=()):
+        self.calls = []
+        self.fail = set(fail)
+
+    def __call__(self, to, message):
+        self.calls.append((to, message))
+        return to not in self.fail
+
+@pytest.fixture
+def app(app):
+    app.config.update(BROADCAST_RATE_PER_SECOND=0, GREETING_BIRTHDAY_MESSAGE=Config.GREETING_BIRTHDAY_MESSAGE,
+                      GREETING_ANNIVERSARY_MESSAGE=Config.GREETING_ANNIVERSARY_MESSAGE)
+    samaj = Samaj(name="Jain")
+    db.session.add(samaj)
+    db.session.flush()
+    db.session.add_all([
+        Member(samaj_id=samaj.id, name="Asha", mobile_1="919800000001", birth_date="1990-10-18"),
+        Member(samaj_id=samaj.id, name="Ravi", mobile_1="919800000002", birth_date="1985-10-18",
+               anniversary_date="2010-10-18"),
+        Member(samaj_id=samaj.id, name="Leap", mobile_1="919800000003", birth_date="1996-02-29"),
+        Member(samaj_id=samaj.id, name="No phone", mobile_1="n/a", birth_date="2000-10-18"),
+        Member(samaj_id=samaj.id, name="Other day", mobile_1="919800000004", birth_date="1990-10-19")
+    ])
+    db.session.commit()
+    return app
+
+def test_celebrated_on_leap_day():
+    """Test 29 February birthdays are celebrated on the 28th outside leap years"""
+    assert celebrated_on(date(2025, 2, 28)) == [228, 229]
+    assert celebrated_on(date(2024, 2, 28)) == [228]
+    assert celebrated_on(date(2024, 2, 29)) == [229]
+
+def test_greetings_sent_once(app):
+    """Test the day's celebrants are greeted and a rerun sends nothing again"""
+    sender = Sender()
+    init_broadcasts(app, sender)
+    results = send_greetings(date(2026, 10, 18), batch_size=2)
+    assert results["birthday"] == {"sent": 2, "failed": 0, "skipped": 1}
+    assert results["anniversary"] == {"sent": 1, "failed": 0, "skipped": 0}
+    assert ("+919800000001", "Happy birthday, Asha! Warm wishes from everyone at Jain.") in sender.calls
+    assert ("+919800000002", "Happy anniversary, Ravi! Warm wishes from everyone at Jain.") in sender.calls
+
+    results = send_greetings(date(2026, 10, 18), batch_size=2)
+    assert results["birthday"] == {"sent": 0, "failed": 0, "skipped": 3}
+    assert len(sender.calls) == 3
+
+def test_failed_greetings_retried(app):
+    """Test a greeting that failed is sent by the next run"""
+    init_broadcasts(app, Sender(fail={"+919800000001"}))
+    assert send_greetings(date(2026, 10, 18))["birthday"]["failed"] == 1
+    sender = Sender()
+    init_broadcasts(app, sender)
+    assert send_greetings(date(2026, 10, 18))["birthday"]["sent"] == 1
+    assert [to for to, _ in sender.calls] == ["+919800000001"]
+    assert db.session.query(Greeting).filter_by(status="sent").count() == 3
+
+def test_leap_day_birthday_greeted(app):
+    """Test a 29 February birthday is greeted on 28 February of a common year"""
+    sender = Sender()
+    init_broadcasts(app, sender)
+    send_greetings(date(2027, 2, 28))
+    assert [to for to, _ in sender.calls] == ["+919800000003"]
+
+def test_local_numbers_greeted_with_default_country_code(app):
+    """Test a 10-digit number is skipped without DEFAULT_COUNTRY_CODE and greeted with it"""
+    member = db.session.query(Member).filter_by(name="No phone").one()
+    member.mobile_1 = "9800000005"
+    db.session.commit()
+    sender = Sender()
+    init_broadcasts(app, sender)
+    assert send_greetings(date(2026, 10, 18))["birthday"] == {"sent": 2, "failed": 0, "skipped": 1}
+    app.config["DEFAULT_COUNTRY_CODE"] = "91"
+    init_broadcasts(app, sender)
+    assert send_greetings(date(2026, 10, 18))["birthday"] == {"sent": 1, "failed": 0, "skipped": 2}
+    assert sender.calls[-1][0] == "+919800000005"
+
+def test_greetings_claimed_by_another_run_skipped(app):
+    """Test a run leaves alone greetings another run (running or crashed mid-send) has claimed"""
+    asha = db.session.query(Member).filter_by(name="Asha").one()
+    db.session.add(Greeting(member_id=asha.id, kind="birthday", day=date(2026, 10, 18), status="sending", owner="other"))
+    db.session.commit()
+    sender = Sender()
+    init_broadcasts(app, sender)
+    assert send_greetings(date(2026, 10, 18))["birthday"] == {"sent": 1, "failed": 0, "skipped": 2}
+    assert "+919800000001" not in [to for to, _ in sender.calls]
+    assert db.session.query(Greeting).filter_by(member_id=asha.id).one().owner == "other"
+
+def test_bad_template_rejected_before_claiming(app):
+    """Test a template with unknown placeholders stops the run before any greeting is claimed"""
+    app.config["GREETING_ANNIVERSARY_MESSAGE"] = "Happy anniversary, {name} {0}!"
+    init_broadcasts(app, Sender())
+    with pytest.raises(ValueError, match="GREETING_ANNIVERSARY_MESSAGE"):
+        send_greetings(date(2026, 10, 18))
+    assert db.session.query(Greeting).count() == 0
+    app.config["GREETING_ANNIVERSARY_MESSAGE"] = "Happy anniversary, {name}! {{Cheers}}"
+    assert send_greetings(date(2026, 10, 18))["anniversary"]["sent"] == 1
+
+def test_command_runs_next_to_the_server(tmp_path, monkeypatch):
+    """Test flask send-greetings works while the server holds the session journal"""
+    from app import create_app
+    from app.services.session_store import JournaledSessionStore
+    from app.services.whatsapp_service import WhatsAppService
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'app.db'}")
+    monkeypatch.setattr(Config, "SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path / 'app.db'}")
+    monkeypatch.setattr(Config, "BROADCAST_RATE_PER_SECOND", 0)
+    monkeypatch.setenv("TWILIO_ACCOUNT_SID", "AC00000000000000000000000000000000")
+    monkeypatch.setenv("TWILIO_AUTH_TOKEN", "test-token")
+    sender = Sender()
+    monkeypatch.setattr(WhatsAppService, "deliver", lambda self, to, message: sender(to, message))
+    # The running server's session store
+    server = JournaledSessionStore(str(tmp_path / "spool" / "sessions.journal"))
+    try:
+        app = create_app()
+        result = app.test_cli_runner().invoke(args=["send-greetings", "--date", "2026-10-18"])
+    finally:
+        server.close()
+    assert "Error" not in result.output
+    assert "birthday:" in result.output and "anniversary:" in result.output
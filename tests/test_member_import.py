@@ -0,0 +1,105 @@
+# Author: SANJAY KR
+import io
+import json
+from concurrent.futures import Future, ProcessPoolExecutor
+from app import db
+from app.models.family import Samaj, Member
+from app.services.flows import REGISTRATION
+from app.services.member_import import detect_format, import_members, read_lines, validate_record
+from app.services.member_stats import get_samaj_stats
+
+def record(**overrides):
+    values = {
+        "samaj": "Jain", "name": "Asha Shah", "gender": "Female", "age": "34", "blood_group": "O+",
+        "mobile_1": "9876543210", "mobile_2": "", "education": "MBA", "occupation": "Engineer",
+        "marital_status": "Married", "address": "12 MG Road", "email": "asha@example.com",
+        "birth_date": "1990-10-18", "anniversary_date": "2015-02-01", "native_place": "Surat",
+        "current_city": "Pune", "languages_known": "Gujarati, Hindi", "skills": "Python",
+        "hobbies": "Music", "emergency_contact": "9876500000", "relationship_status": "Married",
+        "family_role": "Head", "medical_conditions": "", "dietary_preferences": "Vegetarian",
+        "social_media_handles": "", "profession_category": "IT", "volunteer_interests": ""
+    }
+    values.update(overrides)
+    return values
+
+def to_csv(records):
+    columns = list(records[0])
+    lines = [",".join(column.replace("_", " ").title() for column in columns)]
+    lines += [",".join(f'"{row[column]}"' for column in columns) for row in records]
+    return io.BytesIO("\n".join(lines).encode())
+
+def test_validate_record_uses_flow_rules():
+    """Test rows are checked with the registration validators"""
+    values, errors = validate_record(REGISTRATION, record())
+    assert errors == {} and "mobile_2" not in values and values["gender"] == "Female"
+    values, errors = validate_record(REGISTRATION, record(age="200", email="", mobile_2="12"))
+    assert values is None
+    assert set(errors) == {"age", "email", "mobile_2"}
+    assert errors["email"] == "Missing email"
+
+def test_validate_record_checks_column_lengths():
+    """Test values too long for their member column are rejected with the row"""
+    values, errors = validate_record(REGISTRATION, record(family_role="x" * 51, samaj="s" * 101))
+    assert values is None
+    assert errors["family_role"].startswith("Please keep your family role")
+    assert errors["samaj"].startswith("Please keep your samaj")
+
+def test_rejected_batch_inserted_row_by_row(app):
+    """Test a row the database rejects is reported and the rest of its batch is inserted"""
+    class Checked:
+        """Hands out pre-validated rows, as if a worker had passed them"""
+        def submit(self, fn, flow_name, lines):
+            future = Future()
+            future.set_result([(number, values, {}) for number, values, _ in lines])
+            return future
+
+    lines = [(2, record(name="First"), None), (3, record(name="Bad age", age="thirty"), None),
+             (4, record(name="Last"), None)]
+    report = import_members(db.session, iter(lines), pool=Checked(), batch_size=10)
+    assert report["inserted"] == 2 and report["rejected"] == 1
+    assert report["errors"][0]["line"] == 3 and "thirty" in report["errors"][0]["errors"]["row"]
+    assert {name for name, in db.session.query(Member.name)} == {"First", "Last"}
+
+def test_read_lines_formats():
+    """Test CSV headers are normalised and bad NDJSON lines are reported"""
+    lines = list(read_lines(to_csv([record()]), "csv"))
+    assert lines[0][0] == 2 and lines[0][1]["blood_group"] == "O+"
+    stream = io.BytesIO(b'{"Name": "A", "Age": 3}\n\nnot json\n[1]\n')
+    assert [(number, problem) for number, _, problem in read_lines(stream, "ndjson")] == [
+        (1, None), (3, "Invalid JSON"), (4, "Expected a JSON object")
+    ]
+    assert detect_format("members.jsonl", None) == "ndjson"
+    assert detect_format(None, "text/csv; charset=utf-8") == "csv"
+
+def test_import_inserts_valid_rows_and_reports_errors(app):
+    """Test valid rows are inserted in batches with counts and the rest are reported by line"""
+    records = [record(name=f"Member {i}", samaj="Jain" if i % 2 else "Patel") for i in range(7)]
+    records[3]["blood_group"] = "Z+"
+    report = import_members(db.session, read_lines(to_csv(records), "csv"), chunk_size=2, batch_size=3,
+                            max_errors=10)
+    assert report["inserted"] == 6 and report["rejected"] == 1
+    assert report["errors"] == [{"line": 5, "errors": {"blood_group": REGISTRATION.steps[4].error}}]
+    assert db.session.query(Member).count() == 6
+    assert {samaj.name for samaj in db.session.query(Samaj)} == {"Jain", "Patel"}
+    member = db.session.query(Member).filter_by(name="Member 1").one()
+    assert member.birth_mmdd == 1018 and member.age == 34
+    stats = get_samaj_stats(db.session.connection(), "Jain")
+    assert stats["Jain"]["members"] == 2
+
+def test_import_default_samaj_and_capped_errors(app):
+    """Test samaj_name fills rows without a samaj and the error list is capped"""
+    lines = [json.dumps(record(samaj="")) for _ in range(2)] + [json.dumps(record(age="x"))] * 3
+    report = import_members(db.session, read_lines(io.BytesIO("\n".join(lines).encode()), "ndjson"),
+                            default_samaj="Oswal", max_errors=2)
+    assert report["inserted"] == 2 and report["rejected"] == 3
+    assert len(report["errors"]) == 2 and report["errors_truncated"]
+    assert db.session.query(Samaj).one().name == "Oswal"
+
+def test_import_with_process_pool(app):
+    """Test chunks validated in worker processes are inserted in file order"""
+    records = [record(name=f"Member {i}") for i in range(50)]
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        report = import_members(db.session, read_lines(to_csv(records), "csv"), pool=pool, chunk_size=7,
+                                queued_chunks=3)
+    assert report["inserted"] == 50
+    assert [name for name, in db.session.query(Member.name).order_by(Member.id)] == [f"Member {i}" for i in range(50)]
@@ -0,0 +1,80 @@
+# Author: SANJAY KR
+import pytest
+from sqlalchemy import event, insert
+from app import db
+from app.models.family import Samaj, Member
+from app.services.member_stats import get_samaj_stats, rebuild_stats, record_members
+
+@pytest.fixture
+def app(app):
+    db.session.add_all([Samaj(name="Jain"), Samaj(name="Patel")])
+    db.session.commit()
+    return app
+
+def add_member(samaj_id, **values):
+    member = Member(samaj_id=samaj_id, name="Test", **values)
+    db.session.add(member)
+    db.session.commit()
+    return member
+
+def stats():
+    return get_samaj_stats(db.session.connection())
+
+def test_insert_counts_member(app):
+    """Test an inserted member is counted in every dimension"""
+    add_member(1, gender="female", age=34, blood_group="o+", current_city="Pune", dietary_preferences="Vegetarian")
+    add_member(1, gender="Male", age=38, blood_group="O+")
+    jain = stats()["Jain"]
+    assert jain["members"] == 2
+    assert jain["blood_group"] == {"O+": 2}
+    assert jain["age"] == {"30-39": 2}
+    assert jain["gender"] == {"Female": 1, "Male": 1}
+    assert jain["city"] == {"Pune": 1, "Unknown": 1}
+    assert "Patel" not in stats()
+
+def test_update_moves_counts(app):
+    """Test updating a member moves it between buckets and samaj"""
+    member = add_member(1, age=29, blood_group="A-")
+    member.age = 30
+    member.samaj_id = 2
+    db.session.commit()
+    result = stats()
+    assert "Jain" not in result
+    assert result["Patel"]["age"] == {"30-39": 1}
+    assert result["Patel"]["blood_group"] == {"A-": 1}
+
+def test_delete_uncounts_member(app):
+    """Test deleting a member removes it from the summaries"""
+    member = add_member(2, blood_group="B+")
+    add_member(2, blood_group="AB+")
+    db.session.delete(member)
+    db.session.commit()
+    assert stats()["Patel"]["blood_group"] == {"AB+": 1}
+    assert stats()["Patel"]["members"] == 1
+
+def test_bulk_insert_with_record_members(app):
+    """Test bulk inserts are counted through record_members"""
+    rows = [{"samaj_id": 2, "name": f"M{i}", "age": 20 + i} for i in range(15)]
+    db.session.execute(insert(Member), rows)
+    record_members(db.session.connection(), rows)
+    db.session.commit()
+    assert stats()["Patel"]["age"] == {"20-29": 10, "30-39": 5}
+
+def test_rebuild_matches_incremental(app):
+    """Test a rebuild gives the same summaries as incremental upkeep"""
+    for i in range(12):
+        add_member(1 + i % 2, age=18 + i * 3, blood_group=["O+", "B-"][i % 2], dietary_preferences="Jain")
+    expected = stats()
+    db.session.commit()
+    with db.engine.begin() as connection:
+        assert rebuild_stats(connection, chunk_size=5) == 12
+    assert stats() == expected
+
+def test_stats_read_only_summaries(app):
+    """Test the stats query never touches the member table"""
+    add_member(1, age=40)
+    statements = []
+    event.listen(db.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    get_samaj_stats(db.session.connection(), "Jain")
+    assert len(statements) == 1
+    assert "member" not in statements[0].replace("samaj_stat", "")
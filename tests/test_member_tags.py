@@ -0,0 +1,74 @@
+# Author: SANJAY KR
+import pytest
+from sqlalchemy import delete, select
+from app import db
+from app.models.family import Samaj, Member
+from app.models.tags import Tag, MemberTag
+from app.services.member_tags import backfill_tags, parse_filters, search_members, split_tags
+
+@pytest.fixture
+def app(app):
+    samaj = Samaj(name="Jain")
+    db.session.add(samaj)
+    db.session.flush()
+    for name, languages, skills in [
+        ("Asha", "Gujarati, Hindi", "Teaching"),
+        ("Bina", "gujarati", "Writing, teaching"),
+        ("Chirag", "Hindi, English", "Teaching"),
+        ("Dev", "Marathi", "Computer")
+    ]:
+        db.session.add(Member(samaj_id=samaj.id, name=name, languages_known=languages, skills=skills))
+    db.session.commit()
+    return app
+
+def search(match="any", **filters):
+    return search_members(db.session.connection(), parse_filters(filters), match=match)
+
+def names(result):
+    return [member["name"] for member in result["members"]]
+
+def test_split_tags():
+    """Test comma-separated values are normalized into tag names"""
+    assert split_tags(" gujarati, Hindi ,, ") == {"Gujarati", "Hindi"}
+    assert split_tags(None) == set()
+
+def test_facets_are_anded(app):
+    """Test members must match every filtered facet"""
+    result = search(languages="Gujarati", skills="Teaching")
+    assert names(result) == ["Asha", "Bina"]
+    assert result["total"] == 2
+    assert result["facets"]["languages"] == {"Gujarati": 2, "Hindi": 1}
+
+def test_match_any_and_all(app):
+    """Test values within a facet are ORed or ANDed"""
+    assert names(search(languages="Gujarati,Hindi")) == ["Asha", "Bina", "Chirag"]
+    assert names(search("all", languages="Gujarati,Hindi")) == ["Asha"]
+    assert search(languages="Klingon")["total"] == 0
+    with pytest.raises(ValueError):
+        search("some", languages="Hindi")
+
+def test_counts_without_filters(app):
+    """Test facet counts cover every member when nothing is filtered"""
+    result = search()
+    assert result["total"] == 4
+    assert result["facets"]["skills"] == {"Teaching": 3, "Writing": 1, "Computer": 1}
+
+def test_update_and_delete_reindex(app):
+    """Test edited and deleted members are reindexed"""
+    dev = db.session.execute(select(Member).where(Member.name == "Dev")).scalar_one()
+    dev.languages_known = "Hindi"
+    db.session.commit()
+    assert names(search(languages="Hindi")) == ["Asha", "Chirag", "Dev"]
+    db.session.delete(dev)
+    db.session.commit()
+    assert names(search(languages="Hindi")) == ["Asha", "Chirag"]
+
+def test_backfill_rebuilds_index(app):
+    """Test the backfill recreates links for existing members"""
+    db.session.execute(delete(MemberTag))
+    db.session.commit()
+    assert search(skills="Teaching")["total"] == 0
+    with db.engine.begin() as connection:
+        assert backfill_tags(connection, chunk_size=3) == 11
+    assert search(skills="Teaching")["total"] == 3
+    assert db.session.query(Tag).count() == 7
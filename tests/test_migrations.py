@@ -0,0 +1,110 @@
+# Author: SANJAY KR
+import pytest
+from datetime import date
+from flask import Flask
+from sqlalchemy import create_engine, inspect, select
+from app import db
+from app.models.family import Member
+from app.migrations import HEAD, MIGRATIONS, applied_versions, migrate, pending, stamp
+
+# member as created before dates were typed and the summary tables existed
+LEGACY_SCHEMA = [
+    "CREATE TABLE samaj (id INTEGER PRIMARY KEY AUTOINCREMENT, name VARCHAR(100) NOT NULL UNIQUE)",
+    """CREATE TABLE member (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        samaj_id INTEGER NOT NULL REFERENCES samaj(id) ON DELETE CASCADE,
+        name VARCHAR(100) NOT NULL, gender VARCHAR(10), age INTEGER, blood_group VARCHAR(5),
+        mobile_1 VARCHAR(15), mobile_2 VARCHAR(15), education VARCHAR(100), occupation VARCHAR(100),
+        marital_status VARCHAR(20), address VARCHAR(200), email VARCHAR(100),
+        birth_date VARCHAR(10), anniversary_date VARCHAR(10), native_place VARCHAR(100),
+        current_city VARCHAR(100), languages_known VARCHAR(200), skills VARCHAR(200),
+        hobbies VARCHAR(200), emergency_contact VARCHAR(15), relationship_status VARCHAR(20),
+        family_role VARCHAR(50), medical_conditions VARCHAR(200), dietary_preferences VARCHAR(100),
+        social_media_handles VARCHAR(200), profession_category VARCHAR(100), volunteer_interests VARCHAR(200)
+    )"""
+]
+
+@pytest.fixture
+def legacy_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as connection:
+        for statement in LEGACY_SCHEMA:
+            connection.exec_driver_sql(statement)
+        connection.exec_driver_sql("INSERT INTO samaj (name) VALUES ('Jain')")
+        for i in range(7):
+            connection.exec_driver_sql(
+                "INSERT INTO member (samaj_id, name, birth_date, anniversary_date, skills) VALUES (1, ?, ?, ?, 'Teaching')",
+                (f"Member {i}", ["18/10/1990", "1985-03-02"][i % 2], "01/01/2010" if i == 3 else None)
+            )
+    yield engine
+    engine.dispose()
+
+def test_migrate_legacy_database(legacy_engine):
+    """Test a legacy database is converted in batches and fully indexed"""
+    messages = []
+    applied = migrate(legacy_engine, log=messages.append, batch_size=3)
+    assert [migration.version for migration in applied] == [1, 2, 3, 4, 5]
+    assert "Converted dates for 6 members" in messages
+
+    inspector = inspect(legacy_engine)
+    columns = {info["name"]: info["type"] for info in inspector.get_columns("member")}
+    assert "birth_date_typed" not in columns and "birth_date_text" not in columns
+    with legacy_engine.connect() as connection:
+        indexes = set(connection.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'member'"
+        ).scalars())
+    assert {"ix_member_samaj_id", "ix_member_mobile_1", "ix_member_email", "ix_member_birth_mmdd",
+            "ix_member_donor"} <= indexes
+    assert {"samaj_stat", "tag", "member_tag", "broadcast", "broadcast_recipient", "greeting"} <= set(inspector.get_table_names())
+
+    with legacy_engine.connect() as connection:
+        rows = connection.execute(
+            select(Member.birth_date, Member.birth_mmdd, Member.anniversary_date).order_by(Member.id)
+        ).all()
+    assert rows[0] == (date(1990, 10, 18), 1018, None)
+    assert rows[1][:2] == (date(1985, 3, 2), 302)
+    assert rows[3][2] == date(2010, 1, 1)
+    assert pending(legacy_engine) == []
+    assert migrate(legacy_engine) == []
+
+def test_unparseable_dates_are_kept(legacy_engine):
+    """Test text that is not a date survives in a *_text column"""
+    with legacy_engine.begin() as connection:
+        connection.exec_driver_sql("UPDATE member SET birth_date = 'soon' WHERE id = 2")
+    messages = []
+    migrate(legacy_engine, log=messages.append)
+    assert any("could not be parsed" in message for message in messages)
+    with legacy_engine.connect() as connection:
+        assert connection.exec_driver_sql("SELECT birth_date, birth_date_text FROM member WHERE id = 2").one() == (None, "soon")
+
+def test_fresh_database_is_stamped(tmp_path):
+    """Test create_all() plus stamp() needs no migrations"""
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'fresh.db'}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        stamp(db.engine)
+        assert applied_versions(db.engine) == {migration.version for migration in MIGRATIONS}
+        assert HEAD == MIGRATIONS[-1].version
+        assert migrate(db.engine) == []
+
+def test_orm_parses_dates(tmp_path):
+    """Test members accept dates in either format and keep MMDD in step"""
+    member = Member(name="A", birth_date="05/11/2001", anniversary_date="2020-02-29")
+    assert member.birth_date == date(2001, 11, 5)
+    assert member.birth_mmdd == 1105
+    assert member.anniversary_mmdd == 229
+    member.anniversary_date = None
+    assert member.anniversary_mmdd is None
+
+def test_greeting_owner_added(legacy_engine):
+    """Test a greeting table created before runs claimed greetings gains the owner column"""
+    migrate(legacy_engine, target=3)
+    with legacy_engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE greeting (member_id INTEGER NOT NULL, kind VARCHAR(12) NOT NULL, day DATE NOT NULL, "
+            "status VARCHAR(10) NOT NULL, updated_at DATETIME NOT NULL, PRIMARY KEY (member_id, kind, day))"
+        )
+    assert [migration.version for migration in migrate(legacy_engine)] == [4, 5]
+    assert "owner" in {column["name"] for column in inspect(legacy_engine).get_columns("greeting")}
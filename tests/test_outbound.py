@@ -0,0 +1,110 @@
+# Author: SANJAY KR
+import fcntl
+import json
+import os
+import threading
+from app.services.outbound import OutboundQueue
+
+class FlakySender:
+    """Fails the first few sends with a transient error"""
+    def __init__(self, failures=0, result=True):
+        self.failures = failures
+        self.result = result
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, to, body):
+        with self.lock:
+            self.calls.append((to, body))
+            if self.failures:
+                self.failures -= 1
+                raise ConnectionError("temporary outage")
+        return self.result
+
+def test_messages_sent_in_background():
+    """Test queued messages are delivered by the worker pool"""
+    sender = FlakySender()
+    queue = OutboundQueue(sender, workers=2).start()
+    for i in range(20):
+        assert queue.enqueue("+1234567890", f"message {i}")
+    assert queue.join(timeout=5)
+    queue.stop()
+    assert len(sender.calls) == 20
+    assert queue.sent == 20
+
+def test_transient_failures_retried():
+    """Test transient failures are retried with backoff"""
+    sender = FlakySender(failures=2)
+    queue = OutboundQueue(sender, workers=1, backoff=0.01).start()
+    queue.enqueue("+1234567890", "hello")
+    assert queue.join(timeout=5)
+    queue.stop()
+    assert len(sender.calls) == 3
+    assert queue.retried == 2
+    assert queue.sent == 1
+
+def test_gives_up_after_max_retries(tmp_path):
+    """Test a message that keeps failing is moved to the failed spool"""
+    sender = FlakySender(failures=10)
+    queue = OutboundQueue(sender, workers=1, backoff=0.001, max_retries=2, spool_dir=str(tmp_path)).start()
+    queue.enqueue("+1234567890", "hello")
+    assert queue.join(timeout=5)
+    queue.stop()
+    assert len(sender.calls) == 3
+    assert queue.failed == 1
+    assert len(os.listdir(tmp_path / "failed")) == 1
+
+def test_queue_is_bounded():
+    """Test enqueue refuses messages once the queue is full"""
+    queue = OutboundQueue(FlakySender(), maxsize=2)
+    assert queue.enqueue("+1234567890", "one")
+    assert queue.enqueue("+1234567890", "two")
+    assert not queue.enqueue("+1234567890", "three")
+
+def test_spool_written_outside_queue_lock(tmp_path, monkeypatch):
+    """Test other threads can use the queue while a message is being fsynced"""
+    queue = OutboundQueue(FlakySender(), spool_dir=str(tmp_path), maxsize=2)
+    write_spool = queue._write_spool
+    seen = []
+
+    def slow_write(message):
+        other = threading.Thread(target=lambda: seen.append(queue.pending()))
+        other.start()
+        other.join(timeout=1)
+        assert not other.is_alive()
+        write_spool(message)
+
+    monkeypatch.setattr(queue, "_write_spool", slow_write)
+    assert queue.enqueue("+1234567890", "one")
+    # The message being written already counts against the bound
+    assert seen == [1]
+    assert queue.pending() == 1
+    assert len([name for name in os.listdir(tmp_path) if name.endswith(".json")]) == 1
+
+def test_spooled_messages_survive_restart(tmp_path):
+    """Test messages left in the spool by a dead process are resent"""
+    queue = OutboundQueue(FlakySender(), spool_dir=str(tmp_path))
+    queue.enqueue("+1234567890", "pending reply")
+    # Pretend the spool was written by a process that has since exited
+    for name in os.listdir(tmp_path):
+        if name.endswith(".json"):
+            os.rename(tmp_path / name, tmp_path / ("999999999-" + name.split("-", 1)[1]))
+
+    sender = FlakySender()
+    restarted = OutboundQueue(sender, spool_dir=str(tmp_path))
+    assert restarted.recover() == 1
+    restarted.start()
+    assert restarted.join(timeout=5)
+    restarted.stop()
+    assert sender.calls == [("+1234567890", "pending reply")]
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".json")] == []
+
+def test_spool_of_live_instance_left_alone(tmp_path):
+    """Test messages of another running instance are not resent, even with a reused pid"""
+    (tmp_path / "locks").mkdir()
+    with open(tmp_path / "feedfacecafebeef-0001.json", "w") as f:
+        json.dump({"id": "feedfacecafebeef-0001.json", "to": "+1234567890", "body": "hi", "attempts": 0}, f)
+    with open(tmp_path / "locks" / "feedfacecafebeef.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        assert OutboundQueue(FlakySender(), spool_dir=str(tmp_path)).recover() == 0
+    assert OutboundQueue(FlakySender(), spool_dir=str(tmp_path)).recover() == 1
@@ -0,0 +1,138 @@
+# Author: SANJAY KR
+import gzip
+import fakeredis
+import pytest
+from flask import jsonify, request
+from app import db
+from app.models.family import Samaj
+from app.services.response_cache import (
+    CachedResponse, MemoryResponseCache, RedisResponseCache, init_response_cache
+)
+from app.models.routing import get_read_db
+from app.utils.compression import gzip_response
+from app.utils.http_cache import cached_response
+
+@pytest.fixture
+def app(app):
+    init_response_cache(app)
+    app.after_request(gzip_response)
+    app.queries = 0
+
+    @app.route("/samaj")
+    @cached_response
+    def samaj():
+        app.queries += 1
+        names = [samaj.name for samaj in db.session.query(Samaj).order_by(Samaj.id)]
+        return jsonify(names * request.args.get("repeat", 1, type=int))
+
+    db.session.add(Samaj(name="Jain"))
+    db.session.commit()
+    return app
+
+def test_repeat_requests_hit_cache(app):
+    """Test unchanged data is served from the cache with a strong ETag"""
+    client = app.test_client()
+    first = client.get("/samaj")
+    second = client.get("/samaj")
+    assert first.json == second.json == ["Jain"]
+    assert app.queries == 1
+    assert first.headers["ETag"] == second.headers["ETag"]
+    assert not first.headers["ETag"].startswith("W/")
+    client.get("/samaj?repeat=2")
+    assert app.queries == 2
+
+def test_if_none_match_returns_304(app):
+    """Test a matching If-None-Match gets 304 without re-running the view"""
+    client = app.test_client()
+    etag = client.get("/samaj").headers["ETag"]
+    response = client.get("/samaj", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+    assert app.queries == 1
+
+def test_writes_invalidate(app):
+    """Test committed member/samaj writes bump the data version"""
+    client = app.test_client()
+    etag = client.get("/samaj").headers["ETag"]
+    with app.app_context():
+        db.session.add(Samaj(name="Patel"))
+        db.session.commit()
+    response = client.get("/samaj", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json == ["Jain", "Patel"]
+    with app.app_context():
+        db.session.add(Samaj(name="Rolled back"))
+        db.session.flush()
+        db.session.rollback()
+    assert client.get("/samaj").status_code == 200
+    assert app.queries == 2
+
+def test_gzip_variant_revalidates(app):
+    """Test compressed responses get their own ETag and still revalidate"""
+    client = app.test_client()
+    response = client.get("/samaj?repeat=200", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(response.data).startswith(b'["Jain"')
+    etag = response.headers["ETag"]
+    assert etag.endswith('-gzip"')
+    again = client.get("/samaj?repeat=200", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert again.status_code == 304
+
+def test_memory_cache_limits():
+    """Test entries are evicted by count and total size"""
+    cache = MemoryResponseCache(max_entries=3, max_bytes=10, max_entry_bytes=6)
+    for key in "abc":
+        cache.set(key, CachedResponse(b"1234", "application/json", key, ()))
+    assert len(cache) == 2
+    assert cache.get("a") is None
+    cache.set("big", CachedResponse(b"1234567", "application/json", "big", ()))
+    assert cache.get("big") is None
+
+def test_memory_cache_entries_expire():
+    """Test memory entries expire after the TTL, as in Redis"""
+    now = [0.0]
+    cache = MemoryResponseCache(ttl=300, clock=lambda: now[0])
+    cache.set("a", CachedResponse(b"[]", "application/json", "a", ()))
+    now[0] = 299
+    assert cache.get("a") is not None
+    now[0] = 300
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+def test_recent_write_rendered_from_primary(app):
+    """Test responses cached right after a write are not read from a lagging replica"""
+    class Replica:
+        def connect(self, primary):
+            return primary.connect()
+
+    app.extensions["replica_router"] = Replica()
+
+    @app.route("/source")
+    @cached_response
+    def source():
+        return jsonify(primary=get_read_db() is db.session)
+
+    client = app.test_client()
+    app.config["REPLICA_LAG_SECONDS"] = 0
+    with app.app_context():
+        db.session.add(Samaj(name="Patel"))
+        db.session.commit()
+    assert client.get("/source").json == {"primary": False}
+    app.config["REPLICA_LAG_SECONDS"] = 5
+    with app.app_context():
+        db.session.add(Samaj(name="Shah"))
+        db.session.commit()
+    assert client.get("/source").json == {"primary": True}
+
+def test_redis_cache_shared_version():
+    """Test the Redis backend shares entries and the data version"""
+    client = fakeredis.FakeRedis()
+    first, second = RedisResponseCache(client=client), RedisResponseCache(client=client)
+    entry = CachedResponse(b"[]", "application/json", "abc", (("X-Next-Cursor", "5"),))
+    first.set("0:/members?", entry)
+    assert second.get("0:/members?") == entry
+    assert second.version() == 0
+    assert second.bumped_at() == 0
+    first.bump()
+    assert second.version() == 1
+    assert second.bumped_at() > 0
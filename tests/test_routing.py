@@ -0,0 +1,73 @@
+# Author: SANJAY KR
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine
+from app import db
+from app.models.family import Samaj
+from app.models.routing import ReplicaRouter, get_read_db, init_replicas
+from app.controllers.admin_controller import get_samaj_list
+
+@pytest.fixture
+def databases(tmp_path):
+    """A primary and two replicas, told apart by the samaj they hold"""
+    paths = {}
+    for name in ("primary", "replica1", "replica2"):
+        paths[name] = tmp_path / f"{name}.db"
+        engine = create_engine(f"sqlite:///{paths[name]}")
+        db.metadata.create_all(engine, tables=[Samaj.__table__])
+        with engine.begin() as connection:
+            connection.exec_driver_sql("INSERT INTO samaj (name) VALUES (?)", (name,))
+        engine.dispose()
+    return paths
+
+def make_app(paths, replicas):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{paths['primary']}"
+    app.config["DATABASE_REPLICA_URLS"] = ",".join(replicas)
+    db.init_app(app)
+    init_replicas(app)
+
+    @app.route("/read")
+    def read():
+        return get_samaj_list(get_read_db())[0].name
+
+    @app.route("/write")
+    def write():
+        db.session.add(Samaj(name="new"))
+        db.session.commit()
+        return "ok"
+    return app
+
+def test_reads_round_robin_across_replicas(databases):
+    """Test reads alternate between replicas and writes go to the primary"""
+    app = make_app(databases, [f"sqlite:///{databases['replica1']}", f"sqlite:///{databases['replica2']}"])
+    client = app.test_client()
+    served = {client.get("/read").data.decode() for _ in range(4)}
+    assert served == {"replica1", "replica2"}
+    client.get("/write")
+    with app.app_context():
+        assert db.session.query(Samaj).filter_by(name="new").count() == 1
+        for router_engine in app.extensions["replica_router"].engines:
+            assert router_engine.pool.checkedout() == 0
+
+def test_unreachable_replica_is_skipped(databases, tmp_path):
+    """Test a failing replica is skipped and reads fall back to the primary"""
+    broken = f"sqlite:///{tmp_path / 'missing' / 'replica.db'}"
+    app = make_app(databases, [broken, f"sqlite:///{databases['replica2']}"])
+    client = app.test_client()
+    assert [client.get("/read").data.decode() for _ in range(3)] == ["replica2"] * 3
+    assert app.extensions["replica_router"].healthy() == [f"sqlite:///{databases['replica2']}"]
+
+    now = [0.0]
+    router = ReplicaRouter([broken], retry_after=10, clock=lambda: now[0])
+    primary = create_engine(f"sqlite:///{databases['primary']}")
+    with router.connect(primary) as connection:
+        assert connection.engine is primary
+    assert router.healthy() == []
+    now[0] = 11
+    assert router.healthy() == [broken]
+
+def test_no_replicas_reads_primary(databases):
+    """Test reads use the request session when no replicas are configured"""
+    app = make_app(databases, [])
+    assert app.test_client().get("/read").data == b"primary"
@@ -0,0 +1,67 @@
+# Author: SANJAY KR
+import threading
+from sqlalchemy import event
+from app import db
+from app.models.family import Samaj
+from app.services.samaj_cache import SamajCache, samaj_cache
+
+def count_queries():
+    statements = []
+    event.listen(db.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+def test_resolve_creates_then_caches(app):
+    """Test a new samaj is created once and then resolved without queries"""
+    cache = SamajCache()
+    samaj_id = cache.resolve(db.session, "Test Samaj")
+    assert db.session.get(Samaj, samaj_id).name == "Test Samaj"
+    statements = count_queries()
+    assert cache.resolve(db.session, "Test Samaj") == samaj_id
+    assert statements == []
+
+def test_existing_names_skipped_without_on_conflict(app, monkeypatch):
+    """Test the savepoint fallback for databases without ON CONFLICT keeps existing rows"""
+    monkeypatch.setattr("app.models.base.dialect_insert", lambda executor, model: None)
+    db.session.add(Samaj(name="Jain"))
+    db.session.commit()
+    ids = SamajCache().resolve_many(db.session, ["Jain", "Patel"])
+    assert sorted(ids) == ["Jain", "Patel"]
+    assert db.session.query(Samaj).count() == 2
+
+def test_warm_loads_existing(app):
+    """Test warming the cache loads every samaj in one query"""
+    db.session.add_all([Samaj(name="Jain"), Samaj(name="Patel")])
+    db.session.commit()
+    cache = SamajCache()
+    assert cache.warm(db.session) == 2
+    statements = count_queries()
+    assert set(cache.resolve_many(db.session, ["Jain", "Patel"])) == {"Jain", "Patel"}
+    assert statements == []
+
+def test_concurrent_first_inserts(app):
+    """Test concurrent resolves of the same new name agree on one row"""
+    results, errors = [], []
+
+    def resolve():
+        try:
+            with app.app_context():
+                results.append(SamajCache().resolve(db.session, "Lohana"))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=resolve) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(set(results)) == 1
+    assert db.session.query(Samaj).filter(Samaj.name == "Lohana").count() == 1
+
+def test_deleting_samaj_invalidates(app):
+    """Test admin changes to a samaj drop the shared cache"""
+    samaj_id = samaj_cache.resolve(db.session, "Marwari")
+    db.session.delete(db.session.get(Samaj, samaj_id))
+    db.session.commit()
+    new_id = samaj_cache.resolve(db.session, "Marwari")
+    assert db.session.get(Samaj, new_id).name == "Marwari"
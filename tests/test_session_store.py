@@ -0,0 +1,238 @@
+# Author: SANJAY KR
+import os
+import threading
+import pytest
+import fakeredis
+from app.services.session_store import (
+    Session, MemorySessionStore, JournaledSessionStore, SQLiteSessionStore, RedisSessionStore
+)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture(params=["memory", "journal", "sqlite", "redis"])
+def make_store(request, tmp_path, clock):
+    def factory(**limits):
+        if request.param == "memory":
+            return MemorySessionStore(clock=clock, **limits)
+        if request.param == "journal":
+            return JournaledSessionStore(str(tmp_path / "sessions.journal"), clock=clock, **limits)
+        if request.param == "sqlite":
+            return SQLiteSessionStore(str(tmp_path / "sessions.db"), clock=clock, **limits)
+        return RedisSessionStore(client=fakeredis.FakeRedis(), clock=clock, **limits)
+    return factory
+
+@pytest.fixture
+def store(make_store):
+    return make_store()
+
+def test_start_and_get(store):
+    """Test a new session starts at step 0"""
+    assert store.get("+1234567890") is None
+    store.start("+1234567890")
+    assert store.get("+1234567890").step == 0
+    assert "+1234567890" in store
+
+def test_advance(store):
+    """Test advancing records the answer and the next step"""
+    store.start("+1234567890")
+    session = store.advance("+1234567890", 0, "Test Samaj")
+    assert session.step == 1
+    session = store.advance("+1234567890", 1, None)
+    assert session.step == 2
+    assert store.get("+1234567890").as_dict(["samaj", "mobile_2"]) == {"samaj": "Test Samaj", "mobile_2": None}
+
+def test_advance_rejects_stale_step(store):
+    """Test a second advance for the same step is rejected"""
+    store.start("+1234567890")
+    assert store.advance("+1234567890", 0, "First") is not None
+    assert store.advance("+1234567890", 0, "Second") is None
+    assert store.get("+1234567890").answers == ["First"]
+    assert store.advance("+1999999999", 0, "Nobody") is None
+
+def test_delete(store):
+    """Test deleting a session"""
+    store.start("+1234567890")
+    store.delete("+1234567890")
+    assert store.get("+1234567890") is None
+
+def test_idle_sessions_expire(make_store, clock):
+    """Test sessions idle past the TTL disappear and are counted"""
+    store = make_store(ttl=60)
+    store.start("+1111111111")
+    store.start("+2222222222")
+    clock.now += 30
+    store.advance("+2222222222", 0, "Test Samaj")
+    clock.now += 45
+    assert store.get("+1111111111") is None
+    assert store.get("+2222222222").step == 1
+    stats = store.stats()
+    assert stats["live"] == 1
+    assert stats["expirations"] == 1
+
+def test_read_refreshes_idle_time(make_store, clock):
+    """Test reading a session keeps it alive and expired sessions behind it are still swept"""
+    store = make_store(ttl=60)
+    store.start("+1111111111")
+    clock.now += 10
+    store.start("+2222222222")
+    clock.now += 10
+    assert store.get("+1111111111").step == 0
+    clock.now += 45
+    assert store.stats()["live"] == 2
+    clock.now += 10
+    assert store.get("+2222222222") is None
+    assert store.get("+1111111111") is not None
+    stats = store.stats()
+    assert stats["live"] == 1
+    assert stats["expirations"] == 1
+
+def test_least_recently_used_evicted(make_store, clock):
+    """Test the oldest sessions are evicted once the cap is reached"""
+    store = make_store(max_entries=2)
+    for number in ("+1111111111", "+2222222222"):
+        store.start(number)
+        clock.now += 1
+    store.advance("+1111111111", 0, "Test Samaj")
+    clock.now += 1
+    store.start("+3333333333")
+    assert store.get("+2222222222") is None
+    assert store.get("+1111111111") is not None
+    assert store.stats() == {"live": 2, "evictions": 1, "expirations": 0}
+
+def test_session_is_compact():
+    """Test sessions carry no per-instance dict"""
+    session = Session("registration", ["Test Samaj"])
+    assert not hasattr(session, "__dict__")
+    assert session.step == 1
+
+def test_sqlite_shared_between_instances(tmp_path):
+    """Test two workers sharing one SQLite file see the same session"""
+    path = str(tmp_path / "sessions.db")
+    first, second = SQLiteSessionStore(path), SQLiteSessionStore(path)
+    first.start("+1234567890")
+    assert second.advance("+1234567890", 0, "Test Samaj") is not None
+    assert first.get("+1234567890").step == 1
+
+def test_concurrent_advance_single_winner(tmp_path):
+    """Test only one of many concurrent advances for a step succeeds"""
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"))
+    store.start("+1234567890")
+    results = []
+    threads = [
+        threading.Thread(target=lambda i=i: results.append(store.advance("+1234567890", 0, str(i))))
+        for i in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sum(result is not None for result in results) == 1
+    assert store.get("+1234567890").step == 1
+
+def test_flow_and_multi_value_advance(store):
+    """Test sessions remember their flow and can record skipped steps at once"""
+    store.start("+1234567890", "survey")
+    session = store.advance("+1234567890", 0, "yes", None, None)
+    assert session.flow == "survey"
+    assert session.step == 3
+    assert store.get("+1234567890").answers == ["yes", None, None]
+
+def test_journal_replayed_after_restart(tmp_path, clock):
+    """Test a new process picks up sessions where the old one stopped"""
+    path = str(tmp_path / "spool" / "sessions.journal")
+    pid = os.fork()
+    if pid == 0:
+        store = JournaledSessionStore(path, clock=clock)
+        store.start("+1111111111")
+        store.start("+2222222222", "survey")
+        store.start("+3333333333")
+        store.delete("+3333333333")
+        clock.now += 30
+        store.advance("+1111111111", 0, "Test Samaj", "Asha")
+        store.get("+2222222222")
+        # No close(): appends reach the file even if the process dies
+        os._exit(0)
+    os.waitpid(pid, 0)
+    clock.now += 30
+    # Both sessions were last used 30s after they started
+    restarted = JournaledSessionStore(path, ttl=20, clock=clock)
+    assert restarted.replayed == 6
+    assert restarted.get("+1111111111").answers == ["Test Samaj", "Asha"]
+    assert restarted.get("+2222222222").flow == "survey"
+    assert restarted.get("+3333333333") is None
+    assert restarted.advance("+1111111111", 2, "Female").step == 3
+    restarted.close()
+
+def test_journal_in_use_refused(tmp_path, clock):
+    """Test a second worker cannot open a journal another process has open"""
+    path = str(tmp_path / "sessions.journal")
+    store = JournaledSessionStore(path, clock=clock)
+    with pytest.raises(RuntimeError, match="in use by another process"):
+        JournaledSessionStore(path, clock=clock)
+    store.close()
+    JournaledSessionStore(path, clock=clock).close()
+
+def test_journal_skips_torn_line(tmp_path, clock):
+    """Test a record cut short by a crash is ignored on replay"""
+    path = str(tmp_path / "sessions.journal")
+    store = JournaledSessionStore(path, clock=clock)
+    store.start("+1111111111")
+    store.close()
+    with open(path, "a") as f:
+        f.write('["a", "+1111111111", 0, ["Test')
+    restarted = JournaledSessionStore(path, clock=clock)
+    assert restarted.get("+1111111111").step == 0
+    restarted.close()
+
+def test_journal_compacted(tmp_path, clock):
+    """Test the journal is rewritten to the live sessions once it grows"""
+    path = str(tmp_path / "sessions.journal")
+    store = JournaledSessionStore(path, ttl=60, clock=clock, fsync_interval=3600, compact_every=10)
+    for i in range(6):
+        store.start(f"+100000000{i}")
+        store.advance(f"+100000000{i}", 0, "Test Samaj")
+    clock.now += 120
+    store.start("+2222222222")
+    store.sync()
+    with open(path) as f:
+        assert f.read().splitlines() == ['["s", "+2222222222", "registration", [], 1120.0]']
+    store.advance("+2222222222", 0, "Test Samaj")
+    store.close()
+    assert JournaledSessionStore(path, clock=clock).get("+2222222222").answers == ["Test Samaj"]
+
+def test_journal_fsyncs_are_coalesced(tmp_path, clock, monkeypatch):
+    """Test many appends between ticks cost a single fsync"""
+    store = JournaledSessionStore(str(tmp_path / "sessions.journal"), clock=clock, fsync_interval=3600)
+    synced = []
+    monkeypatch.setattr("app.services.session_store.os.fsync", synced.append)
+    for i in range(20):
+        store.start(f"+100000000{i:02d}")
+    store.sync()
+    store.sync()
+    assert len(synced) == 1
+
+def test_journal_opened_on_first_use(tmp_path, monkeypatch):
+    """Test building the service next to a running server does not touch the server's journal"""
+    from flask import Flask
+    from app.services.whatsapp_service import WhatsAppService
+    monkeypatch.setenv("TWILIO_ACCOUNT_SID", "AC00000000000000000000000000000000")
+    monkeypatch.setenv("TWILIO_AUTH_TOKEN", "test-token")
+    path = str(tmp_path / "sessions.journal")
+    app = Flask(__name__)
+    app.config.update(SESSION_BACKEND="journal", SESSION_JOURNAL_PATH=path, OUTBOUND_ASYNC=False)
+    server = JournaledSessionStore(path)
+    service = WhatsAppService().init_app(app)
+    with pytest.raises(RuntimeError, match="in use by another process"):
+        service.sessions.get("+1234567890")
+    server.close()
+    assert isinstance(service.sessions, JournaledSessionStore)
+    service.sessions.close()
@@ -0,0 +1,78 @@
+# Author: SANJAY KR
+import time
+from datetime import timedelta
+import fakeredis
+import pytest
+from flask import Flask, jsonify
+from app.controllers import auth_controller
+from app.controllers.auth_controller import create_access_token, get_token_cache, revoke_token, verify_token
+from app.routes.auth import auth_bp
+from app.services.revocation import MemoryRevocationList, RedisRevocationList
+from app.utils.auth import login_required
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config.update(JWT_SECRET_KEY="test-secret", JWT_ALGORITHM="HS256")
+    app.register_blueprint(auth_bp, url_prefix="/api/v1/auth")
+
+    @app.route("/private")
+    @login_required
+    def private():
+        return jsonify({"ok": True})
+
+    with app.app_context():
+        yield app
+
+def test_verified_tokens_skip_signature_check(app, monkeypatch):
+    """Test a token seen before is not decoded again"""
+    token = create_access_token({"sub": "admin"})
+    assert verify_token(token) == "admin"
+    calls = []
+    monkeypatch.setattr(auth_controller.jwt, "decode", lambda *args, **kwargs: calls.append(args))
+    assert verify_token(token) == "admin"
+    assert calls == []
+
+def test_cache_entry_expires_with_token(app):
+    """Test cached tokens expire at the token's exp"""
+    token = create_access_token({"sub": "admin"}, timedelta(seconds=2))
+    assert verify_token(token) == "admin"
+    _, _, expires_at = get_token_cache().get(token)
+    assert expires_at - time.time() <= 2
+    cache = get_token_cache()
+    cache.clock = lambda: expires_at
+    assert cache.get(token) is None
+
+def test_bad_tokens_rejected(app):
+    """Test tokens with a bad signature are not cached or accepted"""
+    token = create_access_token({"sub": "admin"})
+    assert verify_token(token[:-2] + "xx") is None
+    assert get_token_cache().get(token[:-2] + "xx") is None
+
+def test_logout_revokes_token(app):
+    """Test a logged-out token is rejected even though it is still cached"""
+    client = app.test_client()
+    token = create_access_token({"sub": "admin"})
+    other = create_access_token({"sub": "admin"})
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/private", headers=headers).status_code == 200
+    assert client.post("/api/v1/auth/logout", headers=headers).json == {"success": True}
+    assert client.get("/private", headers=headers).status_code == 401
+    assert client.get("/private", headers={"Authorization": f"Bearer {other}"}).status_code == 200
+    assert not revoke_token("not-a-token")
+
+def test_revocation_backends():
+    """Test revoked ids are forgotten once their token has expired"""
+    now = [1000.0]
+    memory = MemoryRevocationList(clock=lambda: now[0])
+    memory.revoke("abc", 1010)
+    assert memory.is_revoked("abc")
+    assert not memory.is_revoked("def")
+    now[0] = 1011
+    assert not memory.is_revoked("abc")
+
+    redis_list = RedisRevocationList(client=fakeredis.FakeRedis())
+    redis_list.revoke("abc", time.time() + 60)
+    assert redis_list.is_revoked("abc")
+    redis_list.revoke("old", time.time() - 60)
+    assert not redis_list.is_revoked("old")
@@ -0,0 +1,49 @@
+# Author: SANJAY KR
+import threading
+import pytest
+from twilio.rest import Client
+from twilio.base.exceptions import TwilioRestException
+from app.services.twilio_http import PooledTwilioHttpClient
+from app.utils.fake_twilio import FakeTwilioServer
+
+@pytest.fixture
+def server():
+    server = FakeTwilioServer().start()
+    yield server
+    server.stop()
+
+def make_client(server, pool_size=4):
+    http_client = PooledTwilioHttpClient(pool_size=pool_size, timeout=5, base_url=server.url)
+    return Client("AC" + "0" * 32, "token", http_client=http_client)
+
+def test_messages_reach_fake_server(server):
+    """Test sends are redirected to the configured base URL"""
+    client = make_client(server)
+    message = client.messages.create(from_="whatsapp:+14155238886", to="whatsapp:+919876543210", body="Hello")
+    assert message.sid.startswith("SM")
+    assert server.messages[0]["body"] == "Hello"
+    assert server.messages[0]["to"] == "whatsapp:+919876543210"
+
+def test_connections_are_reused(server):
+    """Test concurrent sends share a bounded pool of keep-alive connections"""
+    client = make_client(server, pool_size=2)
+
+    def send():
+        for _ in range(10):
+            client.messages.create(from_="whatsapp:+14155238886", to="whatsapp:+919876543210", body="Hi")
+
+    threads = [threading.Thread(target=send) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(server.messages) == 40
+    assert server.connections <= 2
+
+def test_server_errors_surface(server):
+    """Test injected failures raise Twilio errors with their status"""
+    server.failure_rate = 1.0
+    client = make_client(server)
+    with pytest.raises(TwilioRestException) as error:
+        client.messages.create(from_="whatsapp:+14155238886", to="whatsapp:+919876543210", body="Hi")
+    assert error.value.status == 503
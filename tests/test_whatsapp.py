@@ -50,3 +50,35 @@ def test_webhook_data_collection(client):
             'Body': message
         })
         assert response.status_code == expected_status
+
+def test_webhook_twiml_reply(app, client):
+    """Test the webhook answers inline with TwiML when configured"""
+    app.config['WEBHOOK_REPLY_MODE'] = 'twiml'
+    response = client.post('/api/v1/webhook', data={
+        'From': 'whatsapp:+1234567890',
+        'Body': 'start'
+    })
+    assert response.status_code == 200
+    assert response.mimetype == 'application/xml'
+    assert b'<Message>Welcome to Family &amp; Samaj Data Collection Bot!' in response.data
+
+def test_webhook_duplicate_ignored(client):
+    """Test a retried webhook with the same MessageSid is not processed twice"""
+    data = {'From': 'whatsapp:+1234567890', 'Body': 'start', 'MessageSid': 'SM0123456789'}
+    first = client.post('/api/v1/webhook', data=data)
+    assert first.status_code == 200
+    assert 'duplicate' not in first.json
+    second = client.post('/api/v1/webhook', data=data)
+    assert second.status_code == 200
+    assert second.json['duplicate'] == True
+
+def test_webhook_service_failure_handled(client, monkeypatch):
+    """Test a webhook with a MessageSid still gets the error reply if the service cannot start"""
+    def broken_service():
+        raise ValueError("Twilio credentials are not configured")
+    monkeypatch.setattr('app.routes.whatsapp.get_whatsapp_service', broken_service)
+    response = client.post('/api/v1/webhook', data={
+        'From': 'whatsapp:+1234567890', 'Body': 'start', 'MessageSid': 'SM0123456789'
+    })
+    assert response.status_code == 500
+    assert 'Twilio credentials' in response.json['error']
@@ -0,0 +1,150 @@
+# Author: SANJAY KR
+import json
+import os
+import time
+import pytest
+from app import db
+from app.models.family import Samaj, Member
+from app.services.write_behind import RegistrationWriter, member_errors
+
+def registration(name, samaj="Test Samaj"):
+    return {"samaj": samaj, "name": name, "gender": "Male", "age": "30", "blood_group": "O+",
+            "mobile_1": "9876543210", "mobile_2": None, "volunteer_interests": "Education"}
+
+def make_writer(app, tmp_path, **options):
+    return RegistrationWriter(app, spool_dir=str(tmp_path / "spool"), **options)
+
+def test_flush_writes_batch(app, tmp_path):
+    """Test buffered registrations are saved with one flush"""
+    writer = make_writer(app, tmp_path)
+    for i in range(5):
+        writer.submit(registration(f"Member {i}", samaj=f"Samaj {i % 2}"))
+    assert writer.pending() == 5
+    assert writer.flush() == 5
+    with app.app_context():
+        assert db.session.query(Member).count() == 5
+        assert db.session.query(Samaj).count() == 2
+        member = db.session.query(Member).filter(Member.name == "Member 0").first()
+        assert member.age == 30
+        assert member.volunteer_interests == "Education"
+    assert writer.pending() == 0
+    assert sorted(os.listdir(tmp_path / "spool")) == [f"{writer.instance}-journal.jsonl", "locks"]
+
+def test_background_flush_on_batch_size(app, tmp_path):
+    """Test the writer thread commits once a batch is full"""
+    writer = make_writer(app, tmp_path, batch_size=3, interval=60).start()
+    for i in range(3):
+        writer.submit(registration(f"Member {i}"))
+    deadline = time.monotonic() + 5
+    while writer.written < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    writer.stop()
+    assert writer.written == 3
+
+def test_unsaved_journal_recovered(app, tmp_path):
+    """Test registrations journaled by a crashed process are saved on restart"""
+    spool = tmp_path / "spool"
+    spool.mkdir()
+    with open(spool / "999999999-journal.jsonl", "w") as f:
+        f.write(json.dumps(registration("Survivor")) + "\n")
+        f.write('{"samaj": "Torn')
+    writer = make_writer(app, tmp_path)
+    assert writer.recover() == 1
+    assert writer.flush() == 1
+    with app.app_context():
+        assert db.session.query(Member).filter(Member.name == "Survivor").count() == 1
+
+def test_failed_batch_kept_for_retry(app, tmp_path):
+    """Test a batch that fails to insert is retried on the next flush"""
+    writer = make_writer(app, tmp_path)
+    writer.submit(registration("Member"))
+    with app.app_context():
+        db.drop_all()
+    with pytest.raises(Exception):
+        writer.flush()
+    assert writer.pending() == 1
+    with app.app_context():
+        db.create_all()
+    assert writer.flush() == 1
+
+def test_bad_row_does_not_block_batch(app, tmp_path):
+    """Test a row the database rejects is set aside and the rest of its batch is saved"""
+    spool = tmp_path / "spool"
+    spool.mkdir()
+    # Journaled before answers were checked against the columns
+    with open(spool / "999999999-journal.jsonl", "w") as f:
+        for record in (registration("First"), dict(registration("Bad age"), age="thirty"), registration("Last")):
+            f.write(json.dumps(record) + "\n")
+    writer = make_writer(app, tmp_path)
+    writer.submit(registration("Next batch"))
+    assert writer.recover() == 3
+    assert writer.flush() == 3
+    assert writer.failed == 1
+    assert writer.pending() == 0
+    with app.app_context():
+        assert {name for name, in db.session.query(Member.name)} == {"First", "Last", "Next batch"}
+    with open(spool / "failed" / f"{writer.instance}-failed.jsonl") as f:
+        failed = [json.loads(line) for line in f]
+    assert [entry["record"]["name"] for entry in failed] == ["Bad age"]
+    assert "thirty" in failed[0]["error"]
+
+def test_member_errors():
+    """Test answers are checked against the lengths of the columns they are saved to"""
+    assert member_errors(registration("Member")) == {}
+    errors = member_errors(dict(registration("Member"), gender="Transgender", marital_status="x" * 21, age="3o"))
+    assert errors == {"gender": "Longer than 10 characters", "marital_status": "Longer than 20 characters",
+                      "age": "Not a whole number"}
+    assert member_errors(dict(registration("Member"), samaj="")) == {"samaj": "Missing samaj"}
+
+def test_journal_of_previous_start_with_same_pid_recovered(app, tmp_path):
+    """Test a restart that reuses the crashed process's pid still recovers its journal"""
+    spool = tmp_path / "spool"
+    spool.mkdir()
+    # Written by an earlier start of this same pid (e.g. pid 1 in a container)
+    with open(spool / "0a1b2c3d4e5f6a7b-journal.jsonl", "w") as f:
+        f.write(json.dumps(registration("Before restart")) + "\n")
+    writer = make_writer(app, tmp_path)
+    writer.submit(registration("After restart"))
+    assert writer.recover() == 1
+    assert writer.flush() == 2
+    with app.app_context():
+        assert {name for name, in db.session.query(Member.name)} == {"Before restart", "After restart"}
+
+def test_live_instance_journal_left_alone(app, tmp_path):
+    """Test journals of another running instance are not taken over"""
+    import fcntl
+    spool = tmp_path / "spool"
+    (spool / "locks").mkdir(parents=True)
+    with open(spool / "feedfacecafebeef-journal.jsonl", "w") as f:
+        f.write(json.dumps(registration("Still buffered")) + "\n")
+    with open(spool / "locks" / "feedfacecafebeef.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        assert make_writer(app, tmp_path).recover() == 0
+    assert make_writer(app, tmp_path).recover() == 1
+
+def test_concurrent_submits_share_fsync(app, tmp_path, monkeypatch):
+    """Test submits are journaled while another submit fsyncs, and share the next fsync"""
+    import threading
+    writer = make_writer(app, tmp_path)
+    real_fsync = os.fsync
+    fsyncs = []
+
+    def slow_fsync(fd):
+        fsyncs.append(fd)
+        if len(fsyncs) == 1:
+            # Only possible if the fsync does not hold the buffer lock
+            deadline = time.monotonic() + 5
+            while writer.pending() < 5 and time.monotonic() < deadline:
+                time.sleep(0.001)
+        real_fsync(fd)
+
+    monkeypatch.setattr(os, "fsync", slow_fsync)
+    threads = [threading.Thread(target=writer.submit, args=(registration(f"Member {i}"),)) for i in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    monkeypatch.undo()
+    assert writer.pending() == 5
+    assert len(fsyncs) == 2
+    assert writer.flush() == 5